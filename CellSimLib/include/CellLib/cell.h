@@ -7,6 +7,14 @@ typedef struct {
     char new_cell;
 } cell_cycle_res;
 
+typedef struct {
+    char stage;
+    short age;
+    short repair;
+    double glu_efficiency;
+    double oxy_efficiency;
+} cell_state;
+
 class Cell {
 protected:
     short age;
@@ -14,10 +22,15 @@ protected:
     char stage;
 public:
     bool alive;
+    // Number of Cell objects currently allocated (counted when CELLSIM_STATS is enabled)
+    static long long live;
     Cell(char stage);
-    virtual ~Cell()=default;
+    Cell(const Cell& other); // Counted in live, like the cells of a cloned grid
+    virtual ~Cell();
     virtual cell_cycle_res cycle(double glucose, double oxygen, int count) = 0;
     virtual void radiate(double dose) = 0;
+    virtual cell_state get_state() const;
+    virtual void set_state(const cell_state& state);
     void sleep();
     void wake();
 };
@@ -29,6 +42,8 @@ public:
     //~HealthyCell();
     cell_cycle_res cycle(double glucose, double oxygen, int neigh_count) override;
     void radiate(double dose) override;
+    cell_state get_state() const override;
+    void set_state(const cell_state& state) override;
 private:
     double glu_efficiency;
     double oxy_efficiency;
@@ -51,9 +66,14 @@ public:
     //~CancerCell();
     cell_cycle_res cycle(double glucose, double oxygen, int neigh_count) override;
     void radiate(double dose) override;
+    cell_state get_state() const override;
+    void set_state(const cell_state& state) override;
 private:
     double glu_efficiency;
     double oxy_efficiency;
 };
 
+void seed_cell_generator(unsigned int seed);
+double draw_efficiency_factor();
+
 #endif //RADIO_RL_CELL_H
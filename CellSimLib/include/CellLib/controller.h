@@ -26,8 +26,8 @@ public:
     void go();
     int pixel_density(int x, int y, int z);
     int pixel_type(int x, int y, int z);
-    double *** currentGlucose();
-    double *** currentOxygen();
+    double * currentGlucose();
+    double * currentOxygen();
     // double tumor_radius();
     int xsize, ysize, zsize;
     int sources_num;
@@ -51,6 +51,13 @@ public:
     std::vector<int> get_cell_counts() const;
     // Deep-copy the given Grid into the controller's internal grid
     void set_grid(const Grid& g);
+    // Store the healthy tissue farther than `distance` from the tumor as densities (0 disables)
+    void set_hybrid(double distance);
+    // Keep the quiescent healthy cells as per-voxel aggregates
+    void set_quiescent_pooling(bool enabled);
+    // Per-phase timers, work counters and memory estimates (see stats.h)
+    SimStats get_stats() const;
+    void reset_stats();
 
 
 private:
@@ -63,6 +70,7 @@ private:
 
     int num_hour;
     std::vector<int> intervals;
+    PhaseTimers timers;
 };
 
 
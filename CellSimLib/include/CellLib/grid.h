@@ -2,7 +2,10 @@
 #define CELLULAR_LIB_GRID_H
 
 #include "cell.h"
+#include "stats.h"
 #include <array>
+#include <string>
+#include <vector>
 
 struct CellNode
 {
@@ -10,12 +13,41 @@ struct CellNode
     Cell * cell;
     CellNode *next;
     char type;
+    // Number of CellNode objects currently allocated (counted when CELLSIM_STATS is enabled)
+    static long long live;
+    CellNode() { CELLSIM_COUNT(live, 1); }
+    ~CellNode() { CELLSIM_COUNT(live, -1); }
+};
+
+// Fixed-size record describing one cell of a serialized Grid (see Grid::serialize)
+struct CellRecord
+{
+    double glu_efficiency;
+    double oxy_efficiency;
+    int voxel; // (z * xsize + x) * ysize + y
+    short age;
+    short repair;
+    char type;
+    char stage;
+    char padding[6];
+};
+
+// Aggregate of the quiescent healthy cells of a voxel (see Grid::set_quiescent_pooling)
+struct QuiescentPool
+{
+    int count;
+    int padding;
+    double factor_sum; // Sum of the efficiency factors (efficiency / average consumption) of the cells
+    double factor_sqsum; // Sum of their squares
 };
 
 struct OARZone{
     int x1, x2, y1, y2, z1, z2;
 };
 
+// Number of cancer cells above which the nutrient sources always move toward the tumor (see Grid::sourceMove)
+long long angiogenesis_reference(int xsize, int ysize, int zsize);
+
 
 class CellList{
 private:
@@ -66,6 +98,8 @@ class Grid {
 public:
     Grid(int xsize, int ysize, int zsize, int sources_num);
     Grid(int xsize, int ysize, int zsize, int sources_num, OARZone * oar);
+    Grid(int xsize, int ysize, int zsize, int sources_num,
+        const int* healthy_counts, const int* cancer_counts, const int* oar_counts);
     ~Grid() noexcept;
     void addCell(int x, int y, int z, Cell * cell, char type);
     void fill_sources(double glu, double oxy);
@@ -75,8 +109,9 @@ public:
     void irradiate(double dose, double radius, double center_x, double center_y, double center_z);
     int pixel_type(int x, int y, int z);
     int pixel_density(int x, int y, int z);
-    double *** currentGlucose();
-    double *** currentOxygen();
+    // Contiguous [z][x][y] arrays: voxel (x, y, z) is at index (z * xsize + x) * ysize + y
+    double * currentGlucose();
+    double * currentOxygen();
     double tumor_radius(int center_x, int center_y, int center_z);
     void compute_center();
     double get_center_x();
@@ -86,11 +121,34 @@ public:
     int getCancerCount(int x, int y, int z);
     int getOARCount(int x, int y, int z);
     void change_neigh_counts(int x, int y, int z, int val);
+    void compute_neigh_counts();
+    void set_nutrients(const double* glu, const double* oxy);
 
-    int*** getNeighCounts() const;
+    int* getNeighCounts() const;
     SourceList* getSources() const;
-    double*** getGlucose() const;
+    double* getGlucose() const;
     std::array<int, 2> getCellCounts() const { return cell_counts; }
+    std::string serialize() const;
+    static Grid* deserialize(const char* data, size_t size);
+
+    // Hybrid continuum/agent mode: healthy tissue far from the tumor is stored as per-voxel densities
+    void set_hybrid(double distance);
+    void update_hybrid_regions();
+    double get_hybrid_distance() const { return hybrid_distance; }
+    double getFieldCount() const { return field_count; }
+    double getFieldDensity(int x, int y, int z) const;
+    bool isFieldVoxel(int x, int y, int z) const;
+
+    // Quiescent healthy cells kept as per-voxel aggregates instead of individual cells
+    void set_quiescent_pooling(bool enabled);
+    bool get_quiescent_pooling() const { return !quiescent_pool.empty(); }
+    long long getPooledCount() const;
+    int getPooledCount(int x, int y, int z) const;
+
+    // Work counters (see stats.h), not copied with the grid
+    const WorkCounters& getCounters() const { return counters; }
+    void reset_counters();
+    long long memory_bytes() const;
     
     Grid(const Grid& other);
     Grid& operator=(const Grid& other);
@@ -111,15 +169,29 @@ private:
     int rand_cycle(int num);
     void addToGrid(CellList * newCells);
     int sourceMove(int x, int y, int z);
+    // Index of voxel (x, y, z) in the per-voxel arrays
+    size_t vox_(int x, int y, int z) const { return ((size_t) z * xsize + x) * ysize + y; }
+    bool is_field_(int idx) const { return !field_voxel.empty() && field_voxel[idx]; }
+    int voxel_size_(int x, int y, int z) const;
+    int min_candidates_(int x, int y, int z, int& curr_min, int * pos);
+    void promote_voxel_(int x, int y, int z);
+    void demote_voxel_(int x, int y, int z);
+    void promote_within_(double radius, double center_x, double center_y, double center_z);
+    void cycle_field_voxel_(int x, int y, int z, std::vector<int>& births);
+    void add_field_births_(std::vector<int>& births, CellList * toAdd);
+    int pooled_(int idx) const { return quiescent_pool.empty() ? 0 : quiescent_pool[idx].count; }
+    int cycle_pool_(int x, int y, int z, int density);
+    void expand_pool_(int x, int y, int z, char stage, int count);
     int xsize;
     int ysize;
     int zsize;
-    CellList *** cells;
-    double *** glucose;
-    double *** oxygen;
-    double *** glucose_helper;
-    double *** oxygen_helper;
-    int *** neigh_counts;
+    // Per-voxel arrays, each a single contiguous buffer in the [z][x][y] order (see vox_())
+    CellList * cells;
+    double * glucose;
+    double * oxygen;
+    double * glucose_helper;
+    double * oxygen_helper;
+    int * neigh_counts;
     SourceList * sources;
     OARZone * oar;
     double center_x;
@@ -128,6 +200,21 @@ private:
     int * rand_helper;
     // [healthy_count, cancer_count]
     std::array<int, 2> cell_counts;
+    // Hybrid mode: distance from the tumor center beyond which healthy voxels become densities (0 = disabled)
+    double hybrid_distance;
+    // Healthy cells of every field voxel ([z][x][y] order) and flag of the field voxels, empty when disabled
+    std::vector<double> field_density;
+    std::vector<char> field_voxel;
+    // Healthy cells of every field voxel per position in the cell cycle (FIELD_PHASES values per voxel, see
+    // cycle_field_voxel_()), empty when disabled
+    std::vector<double> field_phase;
+    // Sum of the nutrient efficiency factors of the cells of every field voxel, empty when disabled
+    std::vector<double> field_factor;
+    // Total healthy cells stored as densities
+    double field_count;
+    // Quiescent pool of every voxel ([z][x][y] order), empty when pooling is disabled
+    std::vector<QuiescentPool> quiescent_pool;
+    WorkCounters counters;
 
     void alloc_all_();
     void free_all_(); 
@@ -0,0 +1,69 @@
+#ifndef CELLULAR_LIB_STATS_H
+#define CELLULAR_LIB_STATS_H
+
+#include <chrono>
+
+// Per-phase timers and work counters of the simulation. They are compiled in by default, build with
+// -DCELLSIM_STATS=0 (CMake option CELLSIM_STATS=OFF) to remove them: the macros below become no-ops and
+// Controller::get_stats() only reports zeros.
+#ifndef CELLSIM_STATS
+#define CELLSIM_STATS 1
+#endif
+
+#if CELLSIM_STATS
+// Add the wall-clock (monotonic) duration of `expr` to `field`, in seconds
+#define CELLSIM_TIMED(field, expr) \
+    do { \
+        auto cellsim_start_ = std::chrono::steady_clock::now(); \
+        expr; \
+        (field) += std::chrono::duration<double>(std::chrono::steady_clock::now() - cellsim_start_).count(); \
+    } while (0)
+#define CELLSIM_COUNT(field, n) ((field) += (n))
+#else
+#define CELLSIM_TIMED(field, expr) \
+    do { \
+        expr; \
+    } while (0)
+#define CELLSIM_COUNT(field, n) ((void) 0)
+#endif
+
+// Time spent in every phase of Controller::go() and Controller::irradiate()
+struct PhaseTimers
+{
+    double fill_sources_s;
+    double cycle_cells_s;
+    double diffuse_s;
+    double compute_center_s; // Includes the daily update of the hybrid regions
+    double irradiate_s;
+    long long hours; // Calls to go()
+    long long irradiations; // Calls to irradiate()
+};
+
+// Work done by a Grid
+struct WorkCounters
+{
+    long long voxels_visited; // Non-empty voxels processed by cycle_cells()
+    long long voxels_irradiated; // Voxels reached by the radiation
+    long long cells_cycled; // Calls to Cell::cycle()
+    long long pooled_cycled; // Cells advanced as part of a quiescent pool
+    long long cells_born; // Agents created by cycle_cells()
+    long long cells_died; // Agents that died of starvation in cycle_cells()
+    long long cells_killed; // Agents killed by the radiation
+};
+
+// Snapshot returned by Controller::get_stats()
+struct SimStats
+{
+    bool enabled; // false when built with CELLSIM_STATS=0
+    PhaseTimers timers;
+    WorkCounters work;
+    // Live allocations in the whole process (all the grids, including the copies kept for resets)
+    long long live_cells;
+    long long live_nodes;
+    // Estimated memory: cells, list nodes and the per-voxel arrays of the controller's grid
+    long long cell_bytes;
+    long long node_bytes;
+    long long grid_bytes;
+};
+
+#endif
@@ -1,4 +1,5 @@
 #include "CellLib/cell.h"
+#include "CellLib/stats.h"
 #include <random>
 #include <iostream>
 #include <math.h>
@@ -28,10 +29,33 @@ default_random_engine generator(5);
 normal_distribution<double> norm_distribution (1.0, 0.3333333);
 uniform_real_distribution<double> uni_distribution(0.0, 1.0);
 
+/**
+ * Reseed the generator shared by all cells (nutrient efficiencies and radiation survival draws)
+ *
+ * The distributions are reset as well, the normal distribution keeps a cached value between two calls
+ *
+ * @param seed The new seed of the generator
+ */
+void seed_cell_generator(unsigned int seed){
+    generator.seed(seed);
+    norm_distribution.reset();
+    uni_distribution.reset();
+}
+
+/**
+ * Draw the nutrient efficiency factor of a new healthy or OAR cell (its consumption relative to the average one)
+ *
+ * @return A factor drawn from N(1, 1/3), clipped to [0, 2]
+ */
+double draw_efficiency_factor(){
+    return max(min(norm_distribution(generator), 2.0), 0.0);
+}
+
 int HealthyCell::count = 0;
 int CancerCell::count  = 0;
 int OARCell::count     = 0;
 int OARCell::worth     = 5;
+long long Cell::live   = 0;
 
 
 /**
@@ -39,7 +63,25 @@ int OARCell::worth     = 5;
  *
  * @param stage Current stage of the cell in the cell cycle
  */
-Cell::Cell(char stage):age(0), stage(stage), alive(true), repair(0)  {}
+Cell::Cell(char stage):age(0), stage(stage), alive(true), repair(0)  {
+    CELLSIM_COUNT(live, 1);
+}
+
+/**
+ * Copy constructor of the abstract class Cell (used when a grid is copied)
+ *
+ * @param other Cell to copy
+ */
+Cell::Cell(const Cell& other):age(other.age), repair(other.repair), stage(other.stage), alive(other.alive)  {
+    CELLSIM_COUNT(live, 1);
+}
+
+/**
+ * Destructor of the abstract class Cell
+ */
+Cell::~Cell() {
+    CELLSIM_COUNT(live, -1);
+}
 
 /**
  * Sets a cell's stage to "quiescent" and resets its time counter
@@ -60,6 +102,27 @@ void Cell::wake(){
     }
 }
 
+/**
+ * Return the internal state of the cell (used to save and restore grids)
+ *
+ * Cells without their own nutrient efficiencies (CancerCell draws them every hour) report 0
+ */
+cell_state Cell::get_state() const {
+    cell_state state = {stage, age, repair, 0.0, 0.0};
+    return state;
+}
+
+/**
+ * Restore the internal state of the cell from a previously saved cell_state
+ *
+ * @param state The state returned by get_state()
+ */
+void Cell::set_state(const cell_state& state) {
+    stage = state.stage;
+    age = state.age;
+    repair = state.repair;
+}
+
 /**
  * Constructor of the class HealthyCell, representing normal tissue in the tumor proliferation model
  *
@@ -67,13 +130,32 @@ void Cell::wake(){
  */
 HealthyCell::HealthyCell(char stage): Cell(stage) {
     count++;
-    double factor = max(min(norm_distribution(generator), 2.0), 0.0);
+    double factor = draw_efficiency_factor();
     glu_efficiency = factor * average_glucose_absorption;
     oxy_efficiency = factor * average_oxygen_consumption;
     alive = true;
 }
 
 
+/**
+ * Return the internal state of the cell, including its nutrient efficiencies
+ */
+cell_state HealthyCell::get_state() const {
+    cell_state state = {stage, age, repair, glu_efficiency, oxy_efficiency};
+    return state;
+}
+
+/**
+ * Restore the internal state of the cell, including its nutrient efficiencies
+ *
+ * @param state The state returned by get_state()
+ */
+void HealthyCell::set_state(const cell_state& state) {
+    Cell::set_state(state);
+    glu_efficiency = state.glu_efficiency;
+    oxy_efficiency = state.oxy_efficiency;
+}
+
 /**
  * Constructor of the class CancerCell, representing tumoral tissue in the tumor proliferation model
  *
@@ -91,12 +173,31 @@ CancerCell::CancerCell(char stage): Cell(stage) {
  */
 OARCell::OARCell(char stage) : Cell(stage) {
     count++;
-    double factor = max(min(norm_distribution(generator), 2.0), 0.0);
+    double factor = draw_efficiency_factor();
     glu_efficiency = factor * average_glucose_absorption;
     oxy_efficiency = factor * average_oxygen_consumption;
     alive = true;
 }
 
+/**
+ * Return the internal state of the cell, including its nutrient efficiencies
+ */
+cell_state OARCell::get_state() const {
+    cell_state state = {stage, age, repair, glu_efficiency, oxy_efficiency};
+    return state;
+}
+
+/**
+ * Restore the internal state of the cell, including its nutrient efficiencies
+ *
+ * @param state The state returned by get_state()
+ */
+void OARCell::set_state(const cell_state& state) {
+    Cell::set_state(state);
+    glu_efficiency = state.glu_efficiency;
+    oxy_efficiency = state.oxy_efficiency;
+}
+
 
 /**
  * Simulates one hour of the cell cycle for a healthy cell
@@ -35,7 +35,8 @@ Controller::Controller(int xsize, int ysize, int zsize, int sources_num,
    zsize(zsize),
    sources_num(sources_num),
    tick(0),
-   oar(nullptr)
+   oar(nullptr),
+   timers()
 {
     int*** noFilledGrid = nullptr;
     
@@ -237,12 +238,16 @@ void Controller::deallocateNoFilledGrid(int*** grid) {
  * Refill the sources, cycle all the cells, diffuse the nutrients on the grid
  */
 void Controller::go() {
-    grid -> fill_sources(130, 4500); //O'Neil, Jalalimanesh
-    grid -> cycle_cells();
-    grid -> diffuse(0.2);
+    CELLSIM_TIMED(timers.fill_sources_s, grid -> fill_sources(130, 4500)); //O'Neil, Jalalimanesh
+    CELLSIM_TIMED(timers.cycle_cells_s, grid -> cycle_cells());
+    CELLSIM_TIMED(timers.diffuse_s, grid -> diffuse(0.2));
     tick++;
+    CELLSIM_COUNT(timers.hours, 1);
     if(tick % 24 == 0){ // Once a day, recompute the current center of the tumor (used for angiogenesis)
-        grid -> compute_center();
+        CELLSIM_TIMED(timers.compute_center_s,
+            grid -> compute_center();
+            // In hybrid mode, follow the tumor with the boundary between agents and densities
+            grid -> update_hybrid_regions());
     }
 }
 
@@ -252,7 +257,36 @@ void Controller::go() {
  * @param dose The dose of radiation in grays
  */
 void Controller::irradiate(double dose){
-    grid -> irradiate(dose);
+    CELLSIM_TIMED(timers.irradiate_s, grid -> irradiate(dose));
+    CELLSIM_COUNT(timers.irradiations, 1);
+}
+
+/**
+ * Return the timers of the simulation phases, the work counters of the grid and the memory estimates
+ *
+ * The timers and counters accumulate until reset_stats() is called; the live allocation counters cover the
+ * whole process.
+ */
+SimStats Controller::get_stats() const {
+    SimStats stats = {};
+    stats.enabled = CELLSIM_STATS != 0;
+    stats.timers = timers;
+    stats.work = grid->getCounters();
+    stats.live_cells = Cell::live;
+    stats.live_nodes = CellNode::live;
+    // Cells are allocated as their largest subclass at most
+    stats.cell_bytes = Cell::live * (long long) std::max(sizeof(HealthyCell), sizeof(CancerCell));
+    stats.node_bytes = CellNode::live * (long long) sizeof(CellNode);
+    stats.grid_bytes = grid->memory_bytes();
+    return stats;
+}
+
+/**
+ * Reset the timers and the work counters (e.g. at the start of an episode)
+ */
+void Controller::reset_stats() {
+    timers = PhaseTimers();
+    grid->reset_counters();
 }
 
 
@@ -280,26 +314,51 @@ int Controller::pixel_type(int x, int y, int z) {
     return grid->pixel_type(x, y, z);
 }
 
-// Deep-copy the given Grid into the controller's internal grid
+/**
+ * Deep-copy the given Grid into the controller's internal grid
+ *
+ * The copy carries the cell counts tracked by the grid, which get_cell_counts() reports.
+ *
+ * @param g The grid to copy
+ */
 void Controller::set_grid(const Grid& g) {
     *grid = g; // use Grid copy assignment (deep copy)
 }
 
+/**
+ * Enable the hybrid continuum/agent mode of the grid (see Grid::set_hybrid)
+ *
+ * @param distance Distance from the tumor center beyond which healthy tissue is stored as densities,
+ *                 0 or less disables the mode
+ */
+void Controller::set_hybrid(double distance) {
+    grid->set_hybrid(distance);
+}
+
+/**
+ * Enable the pooling of the quiescent healthy cells of the grid (see Grid::set_quiescent_pooling)
+ *
+ * @param enabled Whether the quiescent cells are pooled
+ */
+void Controller::set_quiescent_pooling(bool enabled) {
+    grid->set_quiescent_pooling(enabled);
+}
+
 /**
  * Return the current glucose 3D array.
  *
- * @return A triple pointer representing the current glucose levels.
+ * @return The contiguous [z][x][y] array of the current glucose levels.
  */
-double *** Controller::currentGlucose() {
+double * Controller::currentGlucose() {
     return grid->currentGlucose();
 }
 
 /**
  * Return the current oxygen 3D array.
  *
- * @return A triple pointer representing the current oxygen levels.
+ * @return The contiguous [z][x][y] array of the current oxygen levels.
  */
-double *** Controller::currentOxygen() {
+double * Controller::currentOxygen() {
     return grid->currentOxygen();
 }
 
@@ -352,8 +411,8 @@ std::vector<int> Controller::get_intervals(int num_hour, int divisor) {
 
 void Controller::tempDataTab() {
     // Get the pointers to the glucose and oxygen matrices from the grid  
-    double*** glu = grid->currentGlucose();
-    double*** oxy = grid->currentOxygen();
+    double* glu = grid->currentGlucose();
+    double* oxy = grid->currentOxygen();
 
     // Iterate over all voxels in the grid  
     for (int z = 0; z < zsize; ++z) {
@@ -375,8 +434,9 @@ void Controller::tempDataTab() {
                 row.push_back(static_cast<double>(health)); // number of healthy cells  
                 row.push_back(static_cast<double>(cancer));  // number of cancerer cells  
                 row.push_back(static_cast<double>(oar)); // number of OAR cells  
-                row.push_back(glu[z][x][y]); // glucose level  
-                row.push_back(oxy[z][x][y]); // oxygen level  
+                size_t idx = ((size_t) z * xsize + x) * ysize + y;
+                row.push_back(glu[idx]); // glucose level  
+                row.push_back(oxy[idx]); // oxygen level  
                 row.push_back(static_cast<double>(grid->pixel_type(x, y, z))); // voxel type  
 
                 // Add the row to the temporary matrix  
@@ -458,7 +518,8 @@ void Controller::saveDataTab(const std::string &path, const std::vector<std::str
  */
 void Controller::tempCellCounts() {
 
-    std::vector<int> row = { tick, HealthyCell::count, CancerCell::count, OARCell::count };
+    std::vector<int> counts = get_cell_counts();
+    std::vector<int> row = { tick, counts[0], counts[1], OARCell::count };
     // Adds the new row to the matrix
     tempCounts.push_back(row);
 }
@@ -587,13 +648,16 @@ void Controller::printIntervals(int divisor, int* intervals){
 
 /**
  * Get the number of healthy and cancer cells in the simulation.
- * Global static counters. For the non-global
- *  grid-attached counter, see the cell_counts attribute.
- * @return Array composed of HealthyCell::count and CancerCell::count
+ * The counts are the ones tracked by the grid (its cell_counts attribute), not the global static counters
+ * (HealthyCell::count, ...), which are shared by every controller of the process.
+ * In hybrid mode the healthy count includes the cells stored as densities (rounded to the nearest integer).
+ *
+ * @return Array composed of the healthy and cancer counts of the grid
  */
 std::vector<int> Controller::get_cell_counts() const {
+    std::array<int, 2> counts = grid->getCellCounts();
     return {
-        HealthyCell::count,
-        CancerCell::count
+        counts[0] + (int) lround(grid->getFieldCount()),
+        counts[1]
     };
 }
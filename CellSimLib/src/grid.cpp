@@ -8,6 +8,10 @@
 
 #include <cstring>    // (opzionale) std::memcpy
 
+#include <vector>     // Temporary buffers of compute_neigh_counts()
+#include <stdexcept>  // std::invalid_argument for malformed serialized grids
+#include <climits>    // INT_MAX, limit of the voxel positions encoded as int
+
 
 using namespace std;
 
@@ -18,6 +22,8 @@ using namespace std;
  * CellLists are linked lists of CellNodes that are on each pixel of the Grid
  *
  */
+long long CellNode::live = 0;
+
 CellList::CellList():head(nullptr), tail(nullptr), size(0), oar_count(0), ccell_count(0) {}
 
 /**
@@ -413,37 +419,21 @@ void SourceList::add(int x, int y, int z) {
  * @param sources_num The number of nutrient sources that should be added to the grid
  * 
  */
-Grid::Grid(int xsize, int ysize, int zsize, int sources_num):xsize(xsize), ysize(ysize), zsize(zsize), oar(nullptr){
-    // Dynamic allocation of the 3D arrays following the convention [z][x][y]
-    cells = new CellList**[zsize];
-    glucose = new double**[zsize];
-    glucose_helper = new double**[zsize];
-    oxygen = new double**[zsize];
-    oxygen_helper = new double**[zsize];
-    neigh_counts = new int**[zsize];
+Grid::Grid(int xsize, int ysize, int zsize, int sources_num)
+    :xsize(xsize), ysize(ysize), zsize(zsize), oar(nullptr), hybrid_distance(0.0), field_count(0.0), counters(){
+    // Voxel positions are encoded as int ((z * xsize + x) * ysize + y) by the neighbor searches and the
+    // serialized cells, the array indices themselves are size_t
+    if (xsize <= 0 || ysize <= 0 || zsize <= 0 || (long long) xsize * ysize * zsize > INT_MAX)
+        throw std::invalid_argument("Grid dimensions must be positive and hold at most INT_MAX voxels");
+
+    // Dynamic allocation of the contiguous arrays following the convention [z][x][y]
+    alloc_all_();
     cell_counts = {0, 0};
 
-    for(int k = 0; k < zsize; k++) { // z layers
-        cells[k] = new CellList*[xsize];
-        glucose[k] = new double*[xsize];
-        glucose_helper[k] = new double*[xsize];
-        oxygen[k] = new double*[xsize];
-        oxygen_helper[k] = new double*[xsize];
-        neigh_counts[k] = new int*[xsize];
-
-        for(int i = 0; i < xsize; i++) { // Rows (x)
-            cells[k][i] = new CellList[ysize];
-            glucose[k][i] = new double[ysize];
-            glucose_helper[k][i] = new double[ysize];
-            oxygen[k][i] = new double[ysize];
-            oxygen_helper[k][i] = new double[ysize];
-            neigh_counts[k][i] = new int[ysize](); // Initialization to 0 using "()"
-
-            // Initialization of glucose and oxygen values
-            std::fill_n(glucose[k][i], ysize, 100.0); // 1E-6 mg O'Neil
-            std::fill_n(oxygen[k][i], ysize, 1000.0); // 1 E-6 ml Jalalimanesh
-        }
-    }
+    // Initialization of glucose and oxygen values
+    size_t voxels = (size_t) xsize * ysize * zsize;
+    std::fill_n(glucose, voxels, 100.0); // 1E-6 mg O'Neil
+    std::fill_n(oxygen, voxels, 1000.0); // 1 E-6 ml Jalalimanesh
 
     // Adding offset to the matrix edges
     for (int k = 0; k < zsize; k++) {
@@ -461,8 +451,7 @@ Grid::Grid(int xsize, int ysize, int zsize, int sources_num):xsize(xsize), ysize
                 // Calculating value as: valore = n_max - neighbors = 27 - prod
                 int value = 27 - prod;
                 
-                // Since every element is initialized to 0, we can simply assign:
-                neigh_counts[k][i][j] = value;
+                neigh_counts[vox_(i, j, k)] = value;
             }
         }
     }
@@ -496,6 +485,71 @@ Grid::Grid(int xsize, int ysize, int zsize, int sources_num, OARZone * oar_zone)
     oar = oar_zone;
 }
 
+/**
+ * Constructor of Grid from per-voxel occupancy counts
+ *
+ * Bulk alternative to calling addCell() once per cell: the voxel lists are filled directly and the neighbor
+ * counters are computed once at the end with compute_neigh_counts(), instead of 26 updates per added cell.
+ * The count arrays are contiguous and follow the [z][x][y] convention of the grid, i.e. the value of voxel
+ * (x, y, z) is stored at index (z * xsize + x) * ysize + y.
+ *
+ * Initial stages are chosen randomly as in Controller::fill_grid():
+ * - For HealthyCell: one of '1', 's', '2', 'm', 'q'
+ * - For CancerCell: one of '1', 's', '2', 'm'
+ * OARCells start in Gap 1, like the ones created in cycle_cells().
+ *
+ * The global counters (HealthyCell::count, ...) are left untouched, so that a grid can be built while another
+ * simulation is running. The cells are counted in the per-grid cell_counts instead, which
+ * Controller::get_cell_counts() reads once the grid is loaded with Controller::set_grid().
+ *
+ * @param xsize The number of rows of the grid
+ * @param ysize The number of columns of the grid
+ * @param zsize The number of layers of the grid
+ * @param sources_num The number of nutrient sources that should be added to the grid at random positions
+ * @param healthy_counts Number of healthy cells of each voxel
+ * @param cancer_counts Number of cancer cells of each voxel
+ * @param oar_counts Number of OAR cells of each voxel (can be nullptr)
+ */
+Grid::Grid(int xsize, int ysize, int zsize, int sources_num,
+    const int* healthy_counts, const int* cancer_counts, const int* oar_counts)
+    : Grid(xsize, ysize, zsize, sources_num)
+{
+    char healthy_stages[5] = {'1', 's', '2', 'm', 'q'};
+    char cancer_stages[4]  = {'1', 's', '2', 'm'};
+
+    // Snapshot the global counters, the Cell constructors increment them
+    int healthy_global = HealthyCell::count;
+    int cancer_global = CancerCell::count;
+    int oar_global = OARCell::count;
+
+    for (int k = 0; k < zsize; k++) {
+        for (int i = 0; i < xsize; i++) {
+            for (int j = 0; j < ysize; j++) {
+                int idx = (k * xsize + i) * ysize + j;
+                for (int c = 0; c < cancer_counts[idx]; c++) {
+                    cells[idx].add(new CancerCell(cancer_stages[rand() % 4]), 'c', i, j, k);
+                }
+                for (int h = 0; h < healthy_counts[idx]; h++) {
+                    cells[idx].add(new HealthyCell(healthy_stages[rand() % 5]), 'h', i, j, k);
+                }
+                if (oar_counts) {
+                    for (int o = 0; o < oar_counts[idx]; o++) {
+                        cells[idx].add(new OARCell('1'), 'o', i, j, k);
+                    }
+                }
+                cell_counts[0] += healthy_counts[idx];
+                cell_counts[1] += cancer_counts[idx];
+            }
+        }
+    }
+
+    HealthyCell::count = healthy_global;
+    CancerCell::count = cancer_global;
+    OARCell::count = oar_global;
+
+    compute_neigh_counts();
+}
+
 /**
  * Destructor of Grid
  *
@@ -548,7 +602,8 @@ Grid::Grid(const Grid& other)
       cells(nullptr), glucose(nullptr), oxygen(nullptr),
       glucose_helper(nullptr), oxygen_helper(nullptr),
       neigh_counts(nullptr), sources(nullptr), oar(nullptr),
-      center_x(0), center_y(0), center_z(0), rand_helper(nullptr) {
+      center_x(0), center_y(0), center_z(0), rand_helper(nullptr),
+      hybrid_distance(0.0), field_count(0.0), counters() {
     copy_from_(other);
 }
 
@@ -570,61 +625,30 @@ Grid& Grid::operator=(const Grid& other) {
 /**
  * Allocates all dynamic arrays of the Grid
  *
- * Initializes 3D arrays for cells, glucose, oxygen, and neighbor counts.
+ * Every per-voxel array (cells, glucose, oxygen, their helpers and neighbor counts) is a single contiguous
+ * buffer in the [z][x][y] order: voxel (x, y, z) is at index vox_(x, y, z) = (z * xsize + x) * ysize + y.
+ * The neighbor counters start at 0.
  */
 void Grid::alloc_all_() {
-    cells = new CellList**[zsize];
-    glucose = new double**[zsize];
-    glucose_helper = new double**[zsize];
-    oxygen = new double**[zsize];
-    oxygen_helper = new double**[zsize];
-    neigh_counts = new int**[zsize];
-
-    for (int k = 0; k < zsize; ++k) {
-        cells[k] = new CellList*[xsize];
-        glucose[k] = new double*[xsize];
-        glucose_helper[k] = new double*[xsize];
-        oxygen[k] = new double*[xsize];
-        oxygen_helper[k] = new double*[xsize];
-        neigh_counts[k] = new int*[xsize];
-
-        for (int i = 0; i < xsize; ++i) {
-            cells[k][i] = new CellList[ysize];
-            glucose[k][i] = new double[ysize];
-            glucose_helper[k][i] = new double[ysize];
-            oxygen[k][i] = new double[ysize];
-            oxygen_helper[k][i] = new double[ysize];
-            neigh_counts[k][i] = new int[ysize];
-        }
-    }
+    size_t voxels = (size_t) xsize * ysize * zsize;
+    cells = new CellList[voxels];
+    glucose = new double[voxels];
+    glucose_helper = new double[voxels];
+    oxygen = new double[voxels];
+    oxygen_helper = new double[voxels];
+    neigh_counts = new int[voxels](); // Initialization to 0 using "()"
 }
 
 /**
  * Frees all dynamic arrays of the Grid
  *
- * Deallocates 3D arrays and sets pointers to nullptr.
+ * Deallocates the arrays and sets pointers to nullptr.
  */
 void Grid::free_all_() {
     if (!cells) {
         return;
     }
 
-    for (int k = 0; k < zsize; ++k) {
-        for (int i = 0; i < xsize; ++i) {
-            delete[] cells[k][i];
-            delete[] glucose[k][i];
-            delete[] glucose_helper[k][i];
-            delete[] oxygen[k][i];
-            delete[] oxygen_helper[k][i];
-            delete[] neigh_counts[k][i];
-        }
-        delete[] cells[k];
-        delete[] glucose[k];
-        delete[] glucose_helper[k];
-        delete[] oxygen[k];
-        delete[] oxygen_helper[k];
-        delete[] neigh_counts[k];
-    }
     delete[] cells;
     delete[] glucose;
     delete[] glucose_helper;
@@ -654,24 +678,353 @@ void Grid::copy_from_(const Grid& other) {
     center_y = other.center_y;
     center_z = other.center_z;
     cell_counts = other.cell_counts;
+    hybrid_distance = other.hybrid_distance;
+    field_density = other.field_density;
+    field_voxel = other.field_voxel;
+    field_phase = other.field_phase;
+    field_factor = other.field_factor;
+    field_count = other.field_count;
+    quiescent_pool = other.quiescent_pool;
 
     alloc_all_();
 
-    for (int k = 0; k < zsize; ++k) {
-        for (int i = 0; i < xsize; ++i) {
-            for (int j = 0; j < ysize; ++j) {
-                cells[k][i][j] = other.cells[k][i][j];
-                glucose[k][i][j] = other.glucose[k][i][j];
-                glucose_helper[k][i][j] = other.glucose_helper[k][i][j];
-                oxygen[k][i][j] = other.oxygen[k][i][j];
-                oxygen_helper[k][i][j] = other.oxygen_helper[k][i][j];
-                neigh_counts[k][i][j] = other.neigh_counts[k][i][j];
+    // Same layout: the nutrient and neighbor arrays are copied in bulk, the lists one by one (deep copy)
+    size_t voxels = (size_t) xsize * ysize * zsize;
+    std::copy(other.cells, other.cells + voxels, cells);
+    std::memcpy(glucose, other.glucose, voxels * sizeof(double));
+    std::memcpy(glucose_helper, other.glucose_helper, voxels * sizeof(double));
+    std::memcpy(oxygen, other.oxygen, voxels * sizeof(double));
+    std::memcpy(oxygen_helper, other.oxygen_helper, voxels * sizeof(double));
+    std::memcpy(neigh_counts, other.neigh_counts, voxels * sizeof(int));
+
+    sources = other.sources ? new SourceList(*other.sources) : nullptr;
+    rand_helper = nullptr;
+}
+
+// Header of a serialized Grid, followed by the sources (3 ints each), the glucose and oxygen matrices
+// (xsize * ysize * zsize doubles each, [z][x][y] order), the neighbor counters (one int per voxel)
+// and one CellRecord per cell
+struct GridHeader {
+    char magic[4];
+    int xsize, ysize, zsize;
+    int healthy_count, cancer_count;
+    int sources_num;
+    int padding;
+    long long cells_num;
+    double center_x, center_y, center_z;
+};
+
+static const char GRID_MAGIC[4] = {'C', 'S', 'G', '1'};
+
+// Average glucose absorption of a healthy cell (cell.cpp), the efficiency factor of a cell is its
+// glucose efficiency divided by this value
+static const double POOL_GLUCOSE_ABSORPTION = 0.36;
+
+// Optional trailer of a serialized hybrid Grid, followed by the field densities (one double per voxel),
+// the field flags (one char per voxel), the cycle cohorts of the field (FIELD_PHASES doubles per voxel) and the
+// sums of the efficiency factors of the field cells (one double per voxel)
+struct HybridHeader {
+    char magic[4];
+    int padding;
+    double hybrid_distance;
+    double field_count;
+};
+
+static const char HYBRID_MAGIC[4] = {'H', 'Y', 'B', '2'};
+
+// Cycle cohorts of a field voxel: quiescence, then one per hour of the 24 hour cycle of HealthyCell
+// (gap 1: 11 hours, synthesis: 8, gap 2: 4, mitosis: 1)
+static const int FIELD_PHASES = 25;
+static const int FIELD_GAP1_HOURS = 11;
+static const int FIELD_S_HOURS = 8;
+static const int FIELD_G2_HOURS = 4;
+
+// Cohort of a healthy cell of the given stage and age (age = hours already spent in the stage)
+static int field_phase_of(char stage, int age) {
+    switch (stage) {
+        case '1':
+            return 1 + std::min(std::max(age, 0), FIELD_GAP1_HOURS - 1);
+        case 's':
+            return 1 + FIELD_GAP1_HOURS + std::min(std::max(age, 0), FIELD_S_HOURS - 1);
+        case '2':
+            return 1 + FIELD_GAP1_HOURS + FIELD_S_HOURS + std::min(std::max(age, 0), FIELD_G2_HOURS - 1);
+        case 'm':
+            return FIELD_PHASES - 1;
+        default:
+            return 0;
+    }
+}
+
+// Stage and age of the cells of a cohort (inverse of field_phase_of())
+static void field_stage_of(int phase, char &stage, int &age) {
+    int hour = phase - 1;
+    if (phase == 0) {
+        stage = 'q';
+        age = 0;
+    } else if (hour < FIELD_GAP1_HOURS) {
+        stage = '1';
+        age = hour;
+    } else if (hour < FIELD_GAP1_HOURS + FIELD_S_HOURS) {
+        stage = 's';
+        age = hour - FIELD_GAP1_HOURS;
+    } else if (hour < FIELD_GAP1_HOURS + FIELD_S_HOURS + FIELD_G2_HOURS) {
+        stage = '2';
+        age = hour - FIELD_GAP1_HOURS - FIELD_S_HOURS;
+    } else {
+        stage = 'm';
+        age = 0;
+    }
+}
+
+// Optional trailer of a Grid with quiescent pooling, followed by one QuiescentPool per voxel
+struct PoolHeader {
+    char magic[4];
+    int padding;
+};
+
+static const char POOL_MAGIC[4] = {'Q', 'P', 'L', '1'};
+
+/**
+ * Serialize the Grid into a binary string
+ *
+ * Stores dimensions, counters, tumor center, sources, nutrients and the full state of every cell
+ * (stage, age, repair time and nutrient efficiencies), in voxel order. The neighbor counters are stored as
+ * they are: cells born in cycle_cells() do not update them, so recomputing them would change the dynamics
+ * of the restored grid. The OAR zone is not stored.
+ *
+ * @return The serialized grid
+ */
+std::string Grid::serialize() const {
+    long long cells_num = 0;
+    for (int k = 0; k < zsize; k++)
+        for (int i = 0; i < xsize; i++)
+            for (int j = 0; j < ysize; j++)
+                cells_num += cells[vox_(i, j, k)].size;
+
+    GridHeader header = {};
+    std::copy(GRID_MAGIC, GRID_MAGIC + 4, header.magic);
+    header.xsize = xsize;
+    header.ysize = ysize;
+    header.zsize = zsize;
+    header.healthy_count = cell_counts[0];
+    header.cancer_count = cell_counts[1];
+    header.sources_num = sources ? sources->size : 0;
+    header.cells_num = cells_num;
+    header.center_x = center_x;
+    header.center_y = center_y;
+    header.center_z = center_z;
+
+    size_t voxels = (size_t) xsize * ysize * zsize;
+    std::string out;
+    out.reserve(sizeof(GridHeader) + header.sources_num * 3 * sizeof(int)
+        + 2 * voxels * sizeof(double) + voxels * sizeof(int) + cells_num * sizeof(CellRecord));
+    out.append(reinterpret_cast<const char*>(&header), sizeof(GridHeader));
+
+    Source * source = sources ? sources->head : nullptr;
+    while (source) {
+        int pos[3] = {source->x, source->y, source->z};
+        out.append(reinterpret_cast<const char*>(pos), sizeof(pos));
+        source = source->next;
+    }
+
+    // Same [z][x][y] layout as the arrays of the grid
+    out.append(reinterpret_cast<const char*>(glucose), voxels * sizeof(double));
+    out.append(reinterpret_cast<const char*>(oxygen), voxels * sizeof(double));
+    out.append(reinterpret_cast<const char*>(neigh_counts), voxels * sizeof(int));
+
+    for (int k = 0; k < zsize; k++) {
+        for (int i = 0; i < xsize; i++) {
+            for (int j = 0; j < ysize; j++) {
+                CellNode * current = cells[vox_(i, j, k)].head;
+                while (current) {
+                    cell_state state = current->cell->get_state();
+                    CellRecord record = {};
+                    record.glu_efficiency = state.glu_efficiency;
+                    record.oxy_efficiency = state.oxy_efficiency;
+                    record.voxel = (k * xsize + i) * ysize + j;
+                    record.age = state.age;
+                    record.repair = state.repair;
+                    record.type = current->type;
+                    record.stage = state.stage;
+                    out.append(reinterpret_cast<const char*>(&record), sizeof(CellRecord));
+                    current = current->next;
+                }
             }
         }
     }
 
-    sources = other.sources ? new SourceList(*other.sources) : nullptr;
-    rand_helper = nullptr;
+    if (!field_voxel.empty()) {
+        HybridHeader hybrid = {};
+        std::copy(HYBRID_MAGIC, HYBRID_MAGIC + 4, hybrid.magic);
+        hybrid.hybrid_distance = hybrid_distance;
+        hybrid.field_count = field_count;
+        out.append(reinterpret_cast<const char*>(&hybrid), sizeof(HybridHeader));
+        out.append(reinterpret_cast<const char*>(field_density.data()), voxels * sizeof(double));
+        out.append(field_voxel.data(), voxels);
+        out.append(reinterpret_cast<const char*>(field_phase.data()), voxels * FIELD_PHASES * sizeof(double));
+        out.append(reinterpret_cast<const char*>(field_factor.data()), voxels * sizeof(double));
+    }
+    if (!quiescent_pool.empty()) {
+        PoolHeader pool = {};
+        std::copy(POOL_MAGIC, POOL_MAGIC + 4, pool.magic);
+        out.append(reinterpret_cast<const char*>(&pool), sizeof(PoolHeader));
+        out.append(reinterpret_cast<const char*>(quiescent_pool.data()), voxels * sizeof(QuiescentPool));
+    }
+    return out;
+}
+
+/**
+ * Rebuild a Grid from the output of serialize()
+ *
+ * As for the array constructor, the global cell counters are left untouched.
+ *
+ * @param data Pointer to the serialized grid
+ * @param size Size in bytes of the serialized grid
+ * @return A new Grid, owned by the caller
+ */
+Grid* Grid::deserialize(const char* data, size_t size) {
+    GridHeader header;
+    if (size < sizeof(GridHeader))
+        throw std::invalid_argument("Serialized grid is truncated");
+    std::memcpy(&header, data, sizeof(GridHeader));
+    if (!std::equal(GRID_MAGIC, GRID_MAGIC + 4, header.magic))
+        throw std::invalid_argument("Data is not a serialized grid");
+
+    size_t voxels = (size_t) header.xsize * header.ysize * header.zsize;
+    size_t expected = sizeof(GridHeader) + header.sources_num * 3 * sizeof(int)
+        + 2 * voxels * sizeof(double) + voxels * sizeof(int) + header.cells_num * sizeof(CellRecord);
+    if (size < expected)
+        throw std::invalid_argument("Serialized grid has an unexpected size");
+
+    // Optional trailers after the cells: field densities (hybrid mode) and quiescent pools
+    HybridHeader hybrid_header = {};
+    const char * field = nullptr;
+    const char * phases = nullptr;
+    const char * pools = nullptr;
+    size_t trailer = expected;
+    while (trailer < size) {
+        size_t remaining = size - trailer;
+        size_t needed = 0;
+        if (remaining >= 4 && std::equal(HYBRID_MAGIC, HYBRID_MAGIC + 4, data + trailer)) {
+            needed = sizeof(HybridHeader) + voxels * (2 * sizeof(double) + 1 + FIELD_PHASES * sizeof(double));
+            if (remaining >= needed) {
+                std::memcpy(&hybrid_header, data + trailer, sizeof(HybridHeader));
+                field = data + trailer + sizeof(HybridHeader);
+                phases = field + voxels * (sizeof(double) + 1);
+            }
+        } else if (remaining >= 4 && std::equal(POOL_MAGIC, POOL_MAGIC + 4, data + trailer)) {
+            needed = sizeof(PoolHeader) + voxels * sizeof(QuiescentPool);
+            if (remaining >= needed)
+                pools = data + trailer + sizeof(PoolHeader);
+        }
+        if (needed == 0 || remaining < needed)
+            throw std::invalid_argument("Serialized grid has an unexpected size");
+        trailer += needed;
+    }
+
+    Grid * grid = new Grid(header.xsize, header.ysize, header.zsize, 0);
+    const char * cursor = data + sizeof(GridHeader);
+
+    for (int s = 0; s < header.sources_num; s++) {
+        int pos[3];
+        std::memcpy(pos, cursor, sizeof(pos));
+        grid->sources->add(pos[0], pos[1], pos[2]);
+        cursor += sizeof(pos);
+    }
+
+    // Copy through an aligned buffer, the data pointer has no alignment guarantee
+    std::vector<double> nutrients(2 * voxels);
+    std::memcpy(nutrients.data(), cursor, 2 * voxels * sizeof(double));
+    grid->set_nutrients(nutrients.data(), nutrients.data() + voxels);
+    cursor += 2 * voxels * sizeof(double);
+
+    std::memcpy(grid->neigh_counts, cursor, voxels * sizeof(int));
+    cursor += voxels * sizeof(int);
+
+    int healthy_global = HealthyCell::count;
+    int cancer_global = CancerCell::count;
+    int oar_global = OARCell::count;
+
+    std::vector<CellRecord> records(header.cells_num);
+    std::memcpy(records.data(), cursor, header.cells_num * sizeof(CellRecord));
+    for (const CellRecord& record : records) {
+        if (record.voxel < 0 || (size_t) record.voxel >= voxels) {
+            delete grid;
+            throw std::invalid_argument("Serialized grid contains a cell outside of the grid");
+        }
+    }
+
+    // The records of a voxel are contiguous and follow the order of its CellList. Cancer cells are
+    // pushed at the head of the list, so they are added in reverse order to get back the same list
+    long long first = 0;
+    while (first < header.cells_num) {
+        long long last = first;
+        while (last < header.cells_num && records[last].voxel == records[first].voxel)
+            last++;
+        std::vector<const CellRecord*> order;
+        for (long long c = first; c < last; c++)
+            if (records[c].type != 'c')
+                order.push_back(&records[c]);
+        for (long long c = last - 1; c >= first; c--)
+            if (records[c].type == 'c')
+                order.push_back(&records[c]);
+
+        for (const CellRecord * record : order) {
+            Cell * cell = nullptr;
+            switch (record->type) {
+                case 'h':
+                    cell = new HealthyCell(record->stage);
+                    break;
+                case 'c':
+                    cell = new CancerCell(record->stage);
+                    break;
+                case 'o':
+                    cell = new OARCell(record->stage);
+                    break;
+                default:
+                    HealthyCell::count = healthy_global;
+                    CancerCell::count = cancer_global;
+                    OARCell::count = oar_global;
+                    delete grid;
+                    throw std::invalid_argument("Serialized grid contains an unknown cell type");
+            }
+            cell->set_state({record->stage, record->age, record->repair,
+                record->glu_efficiency, record->oxy_efficiency});
+
+            int k = record->voxel / (header.xsize * header.ysize);
+            int rem = record->voxel % (header.xsize * header.ysize);
+            int i = rem / header.ysize;
+            int j = rem % header.ysize;
+            grid->cells[grid->vox_(i, j, k)].add(cell, record->type, i, j, k);
+        }
+        first = last;
+    }
+
+    HealthyCell::count = healthy_global;
+    CancerCell::count = cancer_global;
+    OARCell::count = oar_global;
+
+    grid->cell_counts = {header.healthy_count, header.cancer_count};
+    grid->center_x = header.center_x;
+    grid->center_y = header.center_y;
+    grid->center_z = header.center_z;
+
+    if (field) {
+        grid->hybrid_distance = hybrid_header.hybrid_distance;
+        grid->field_count = hybrid_header.field_count;
+        grid->field_density.resize(voxels);
+        grid->field_voxel.assign(field + voxels * sizeof(double), field + voxels * (sizeof(double) + 1));
+        std::memcpy(grid->field_density.data(), field, voxels * sizeof(double));
+        grid->field_phase.resize(voxels * FIELD_PHASES);
+        std::memcpy(grid->field_phase.data(), phases, voxels * FIELD_PHASES * sizeof(double));
+        grid->field_factor.resize(voxels);
+        std::memcpy(grid->field_factor.data(), phases + voxels * FIELD_PHASES * sizeof(double), voxels * sizeof(double));
+    }
+    if (pools) {
+        grid->quiescent_pool.resize(voxels);
+        std::memcpy(grid->quiescent_pool.data(), pools, voxels * sizeof(QuiescentPool));
+    }
+    return grid;
 }
 
 /**
@@ -708,12 +1061,90 @@ void Grid::change_neigh_counts(int x, int y, int z, int val) {
                     continue;
 
                 // Update the counter for the adjacent voxel
-                neigh_counts[nz][nx][ny] += val;
+                neigh_counts[vox_(nx, ny, nz)] += val;
             }
         }
     }
 }
 
+/**
+ * Recompute the whole neigh_counts matrix from the current content of the voxels
+ *
+ * Equivalent to calling change_neigh_counts(x, y, z, 1) once per cell, but done with a single 3x3x3 box sum.
+ * The box filter is separable, so it is applied as three 1D passes (along y, x and z), then the cells of the
+ * central voxel are removed and the border offset (missing neighbors are counted as occupied) is added.
+ */
+void Grid::compute_neigh_counts() {
+    int layer = xsize * ysize;
+    vector<int> sum_a(zsize * layer);
+    vector<int> sum_b(zsize * layer);
+
+    // Pass along y: sum_a = voxel size + sizes of the y neighbors
+    for (int k = 0; k < zsize; k++) {
+        for (int i = 0; i < xsize; i++) {
+            for (int j = 0; j < ysize; j++) {
+                int s = cells[vox_(i, j, k)].size;
+                if (j > 0)
+                    s += cells[vox_(i, j - 1, k)].size;
+                if (j < ysize - 1)
+                    s += cells[vox_(i, j + 1, k)].size;
+                sum_a[k * layer + i * ysize + j] = s;
+            }
+        }
+    }
+
+    // Pass along x
+    for (int k = 0; k < zsize; k++) {
+        for (int i = 0; i < xsize; i++) {
+            for (int j = 0; j < ysize; j++) {
+                int idx = k * layer + i * ysize + j;
+                int s = sum_a[idx];
+                if (i > 0)
+                    s += sum_a[idx - ysize];
+                if (i < xsize - 1)
+                    s += sum_a[idx + ysize];
+                sum_b[idx] = s;
+            }
+        }
+    }
+
+    // Pass along z, then remove the central voxel and add the border offset
+    for (int k = 0; k < zsize; k++) {
+        for (int i = 0; i < xsize; i++) {
+            for (int j = 0; j < ysize; j++) {
+                int idx = k * layer + i * ysize + j;
+                int s = sum_b[idx];
+                if (k > 0)
+                    s += sum_b[idx - layer];
+                if (k < zsize - 1)
+                    s += sum_b[idx + layer];
+
+                int poss_z = (k == 0 || k == zsize - 1) ? 2 : 3;
+                int poss_x = (i == 0 || i == xsize - 1) ? 2 : 3;
+                int poss_y = (j == 0 || j == ysize - 1) ? 2 : 3;
+                neigh_counts[vox_(i, j, k)] = (27 - poss_z * poss_x * poss_y) + s - cells[vox_(i, j, k)].size;
+            }
+        }
+    }
+}
+
+/**
+ * Overwrite the glucose and oxygen matrices
+ *
+ * The arrays are contiguous and follow the [z][x][y] convention of the grid. A nullptr leaves the
+ * corresponding nutrient unchanged.
+ *
+ * @param glu The new glucose amount of each voxel
+ * @param oxy The new oxygen amount of each voxel
+ */
+void Grid::set_nutrients(const double* glu, const double* oxy) {
+    size_t voxels = (size_t) xsize * ysize * zsize;
+    if (glu)
+        std::copy(glu, glu + voxels, glucose);
+    if (oxy)
+        std::copy(oxy, oxy + voxels, oxygen);
+}
+
 
 /**
  * Add a cell to a position on the grid
@@ -725,7 +1156,7 @@ void Grid::change_neigh_counts(int x, int y, int z, int val) {
  * @param type The type of the Cell
  */
 void Grid::addCell(int x, int y, int z, Cell *cell, char type) {
-    cells[z][x][y].add(cell, type,x, y, z);
+    cells[vox_(x, y, z)].add(cell, type,x, y, z);
     change_neigh_counts(x, y, z, 1);
     if (type == 'h')
         cell_counts[0]++;
@@ -743,8 +1174,8 @@ void Grid::fill_sources(double glu, double oxy) {
     Source * current = sources->head;
     while (current) { 
         // Add nutrients in the current voxel
-        glucose[current->z][current->x][current->y] += glu;
-        oxygen[current->z][current->x][current->y] += oxy;
+        glucose[vox_(current->x, current->y, current->z)] += glu;
+        oxygen[vox_(current->x, current->y, current->z)] += oxy;
         
         // The source moves on average once per day
         if ((rand() % 24) < 1) {
@@ -763,10 +1194,28 @@ void Grid::fill_sources(double glu, double oxy) {
     }
 }
 
+// Number of cancer cells above which the sources always move toward the tumor, for a 21x21x21 grid
+static const double ANGIOGENESIS_CELLS = 50000.0;
+static const double ANGIOGENESIS_VOXELS = 21.0 * 21.0 * 21.0;
+
+/**
+ * Number of cancer cells above which the nutrient sources always move toward the tumor
+ *
+ * The reference grows with the volume of the grid (50000 on the 21x21x21 grid), so that the attraction
+ * depends on the share of the grid taken by the tumor and does not saturate on large grids. Also used by
+ * the coarse model (rein/env/coarse.py) through the Python bindings.
+ */
+long long angiogenesis_reference(int xsize, int ysize, int zsize) {
+    return std::max(1LL, llround(ANGIOGENESIS_CELLS * xsize * ysize * zsize / ANGIOGENESIS_VOXELS));
+}
+
 int Grid::sourceMove(int x, int y, int z) {
 
-    // Movement toward the center of the tumor
-    if (rand() % 50000 < CancerCell::count) {
+    // Movement toward the center of the tumor, with probability (cancer cells of the grid) / reference
+    long long reference = angiogenesis_reference(xsize, ysize, zsize);
+    bool toward = reference <= RAND_MAX ? rand() % reference < cell_counts[1]
+                                        : (double) rand() / RAND_MAX * reference < cell_counts[1];
+    if (toward) {
         // cout << "center_x = " << center_x << endl;
         // cout << "center_y = " << center_y << endl;
         // cout << "center_z = " << center_z << endl;
@@ -870,10 +1319,10 @@ void Grid::compute_center(){
     for (int k = 0; k < zsize; k++){
         for (int i = 0; i < xsize; i++){
             for (int j = 0; j < ysize; j++){
-                count += cells[k][i][j].ccell_count;
-                center_x += cells[k][i][j].ccell_count * i;
-                center_y += cells[k][i][j].ccell_count * j;
-                center_z += cells[k][i][j].ccell_count * k;
+                count += cells[vox_(i, j, k)].ccell_count;
+                center_x += cells[vox_(i, j, k)].ccell_count * i;
+                center_y += cells[vox_(i, j, k)].ccell_count * j;
+                center_z += cells[vox_(i, j, k)].ccell_count * k;
             }
         }
     }
@@ -906,34 +1355,60 @@ double Grid::get_center_z(){
 void Grid::cycle_cells() {
     // Creating a temporary list to accumulate the new cells  
     CellList *toAdd = new CellList();
+    // Healthy cells born into (or from) field voxels
+    std::vector<int> field_births(field_voxel.empty() ? 0 : field_voxel.size(), 0);
     
     // Iterate over all voxels  
     for (int k = 0; k < zsize; k++) {
         for (int i = 0; i < xsize; i++) {
             for (int j = 0; j < ysize; j++) {
-                // Snapshot per-type counts before updates/deletions
-                int init_c = cells[k][i][j].ccell_count;
-                int init_o = cells[k][i][j].oar_count;
-                int init_sz = cells[k][i][j].size;
-                int init_h = init_sz - init_c - init_o;
-                CellNode *current = cells[k][i][j].head;
+                int idx = (k * xsize + i) * ysize + j;
+                // Field voxels have no agents, their density is updated as a whole
+                if (is_field_(idx)) {
+                    cycle_field_voxel_(i, j, k, field_births);
+                    continue;
+                }
+                // Nothing happens in the empty voxels
+                if (cells[idx].size == 0 && pooled_(idx) == 0)
+                    continue;
+                CELLSIM_COUNT(counters.voxels_visited, 1);
+                // Snapshot per-type counts before updates/deletions (pooled cells are healthy)
+                int init_c = cells[idx].ccell_count;
+                int init_o = cells[idx].oar_count;
+                int init_sz = cells[idx].size;
+                int init_h = init_sz - init_c - init_o + pooled_(idx);
+                int density = neigh_counts[idx] + cells[idx].size + pooled_(idx);
+                // Cells that become quiescent during this hour, moved to the pool after it has been advanced
+                QuiescentPool entering = {0, 0, 0.0, 0.0};
+                // The pool takes the place of the quiescent cells in the list, after the cancer cells
+                bool pool_cycled = pooled_(idx) == 0;
+                int pool_wakes = 0;
+                CellNode *current = cells[idx].head;
                 while (current) {
+                    if (!pool_cycled && current->type != 'c') {
+                        pool_wakes = cycle_pool_(i, j, k, density);
+                        pool_cycled = true;
+                    }
                     // Advance the cycle of the current cell  
                     // Note: the density parameter is given by the neighbor counter plus the number of cells in the voxel  
                     cell_cycle_res result = current->cell->cycle(
-                        glucose[k][i][j],
-                        oxygen[k][i][j],
-                        neigh_counts[k][i][j] + cells[k][i][j].size
+                        glucose[idx],
+                        oxygen[idx],
+                        density
                     );
+                    CELLSIM_COUNT(counters.cells_cycled, 1);
                     
                     // Update glucose and oxygen based on consumption  
-                    glucose[k][i][j] -= result.glucose;
-                    oxygen[k][i][j] -= result.oxygen;
+                    glucose[idx] -= result.glucose;
+                    oxygen[idx] -= result.oxygen;
                     
                     // New cells are created based on result.new_cell  
                     if (result.new_cell == 'h') { // New healthy cell
                         int downhill = rand_min(i, j, k, 5);
-                        if (downhill >= 0) {
+                        if (downhill >= 0 && is_field_(downhill)) {
+                            // Born into the far tissue: it joins the density of the voxel
+                            field_births[downhill]++;
+                        } else if (downhill >= 0) {
                             // Decode the new position (newX, newY, newZ)  
                             int newZ = downhill / (xsize * ysize);
                             int rem = downhill % (xsize * ysize);
@@ -973,22 +1448,51 @@ void Grid::cycle_cells() {
                         wake_surrounding_oar(i, j, k);
                     }
                     
+                    // Quiescent healthy cells without radiation damage leave the list for the pool of the voxel
+                    // (marked as dead, so that deleteDeadAndSort() removes them without changing the counters)
+                    if (!quiescent_pool.empty() && current->type == 'h' && current->cell->alive) {
+                        cell_state state = current->cell->get_state();
+                        if (state.stage == 'q' && state.repair == 0) {
+                            double factor = state.glu_efficiency / POOL_GLUCOSE_ABSORPTION;
+                            entering.count++;
+                            entering.factor_sum += factor;
+                            entering.factor_sqsum += factor * factor;
+                            current->cell->alive = false;
+                        }
+                    }
+                    
                     current = current->next;
                 }
                 // Save the initial number of cells in the voxel to update the neighbor counters  
-                int init_count = cells[k][i][j].size;
-                cells[k][i][j].deleteDeadAndSort();
-                change_neigh_counts(i, j, k, cells[k][i][j].size - init_count);
+                int init_count = cells[idx].size + pooled_(idx);
+                if (!pool_cycled)
+                    pool_wakes = cycle_pool_(i, j, k, density);
+                // Woken cells are expanded after the loop, so that they are not cycled twice
+                if (pool_wakes)
+                    expand_pool_(i, j, k, '1', pool_wakes);
+                if (entering.count) {
+                    QuiescentPool & pool = quiescent_pool[idx];
+                    pool.count += entering.count;
+                    pool.factor_sum += entering.factor_sum;
+                    pool.factor_sqsum += entering.factor_sqsum;
+                }
+                cells[idx].deleteDeadAndSort();
+                int change = cells[idx].size + pooled_(idx) - init_count;
+                if (change)
+                    change_neigh_counts(i, j, k, change);
+                CELLSIM_COUNT(counters.cells_died, init_count - cells[idx].size - pooled_(idx));
                 // Update global per-Grid counts for deaths in this voxel
-                int new_c = cells[k][i][j].ccell_count;
-                int new_o = cells[k][i][j].oar_count;
-                int new_sz = cells[k][i][j].size;
-                int new_h = new_sz - new_c - new_o;
+                int new_c = cells[idx].ccell_count;
+                int new_o = cells[idx].oar_count;
+                int new_sz = cells[idx].size;
+                int new_h = new_sz - new_c - new_o + pooled_(idx);
                 cell_counts[0] += (new_h - init_h);
                 cell_counts[1] += (new_c - init_c);
             }
         }
     }
+    if (!field_births.empty())
+        add_field_births_(field_births, toAdd);
     // Add all the new cells accumulated in the toAdd list to the 3D grid  
     addToGrid(toAdd);
 }
@@ -1003,9 +1507,13 @@ void Grid::addToGrid(CellList * newCells) {
     while (current) {
         // Save pointer to the next node before reassigning current
         CellNode * next = current->next;
+        // A cancer cell reaching the far tissue turns the densities of its voxel into agents
+        if (current->type == 'c' && is_field_((current->z * xsize + current->x) * ysize + current->y))
+            promote_voxel_(current->x, current->y, current->z);
         // Insert the current node into the correct voxel's CellList using its (x, y, z) coordinates.
         // Note: The pointer (current) is "moved" by the add() method from the newCells list to the voxel's list.
-        cells[current->z][current->x][current->y].add(current, current->type);
+        cells[vox_(current->x, current->y, current->z)].add(current, current->type);
+        CELLSIM_COUNT(counters.cells_born, 1);
         // Update global per-Grid counts for new-born cells being added
         if (current->type == 'h')
             cell_counts[0]++;
@@ -1034,10 +1542,25 @@ void Grid::addToGrid(CellList * newCells) {
  *         (using the formula: z * (xsize * ysize) + x * ysize + y), or -1 if no suitable voxel is found.
  */
 int Grid::rand_min(int x, int y, int z, int max) {
-    int counter = 0;
     int curr_min = 100000;
     int pos[26]; // Al massimo 26 vicini in 3D
+    int counter = min_candidates_(x, y, z, curr_min, pos);
+
+    if (curr_min < max)
+        return pos[rand() % counter];
+    else
+        return -1;
+}
 
+/**
+ * Collect the neighbors of (x, y, z) with the minimum number of cells (field densities included).
+ *
+ * @param curr_min Set to the minimum number of cells found
+ * @param pos Array receiving the encoded positions of the candidates
+ * @return The number of candidates
+ */
+int Grid::min_candidates_(int x, int y, int z, int &curr_min, int *pos) {
+    int counter = 0;
     // Itera su tutti i voxel adiacenti (dx, dy, dz) escluso il centro
     for (int dz = -1; dz <= 1; dz++) {
         for (int dx = -1; dx <= 1; dx++) {
@@ -1048,11 +1571,7 @@ int Grid::rand_min(int x, int y, int z, int max) {
             }
         }
     }
-
-    if (curr_min < max)
-        return pos[rand() % counter];
-    else
-        return -1;
+    return counter;
 }
 
 /**
@@ -1078,11 +1597,12 @@ void Grid::min_helper(int x, int y, int z, int &curr_min, int *pos, int &counter
     if (x >= 0 && x < xsize &&
         y >= 0 && y < ysize &&
         z >= 0 && z < zsize) {
-        if (cells[z][x][y].size < curr_min) {
+        int size = voxel_size_(x, y, z);
+        if (size < curr_min) {
             pos[0] = z * xsize * ysize + x * ysize + y;
             counter = 1;
-            curr_min = cells[z][x][y].size;
-        } else if (cells[z][x][y].size == curr_min) {
+            curr_min = size;
+        } else if (size == curr_min) {
             pos[counter] = z * xsize * ysize + x * ysize + y;
             counter++;
         }
@@ -1134,12 +1654,12 @@ void Grid::missing_oar_helper(int x, int y, int z, int &curr_min, int *pos, int
     if (oar && x >= oar->x1 && x < oar->x2 &&
               y >= oar->y1 && y < oar->y2 &&
               z >= oar->z1 && z < oar->z2 &&
-              cells[z][x][y].oar_count == 0) {
-        if (cells[z][x][y].size < curr_min) {
+              cells[vox_(x, y, z)].oar_count == 0) {
+        if (cells[vox_(x, y, z)].size < curr_min) {
             pos[0] = z * xsize * ysize + x * ysize + y;
             counter = 1;
-            curr_min = cells[z][x][y].size;
-        } else if (cells[z][x][y].size == curr_min) {
+            curr_min = cells[vox_(x, y, z)].size;
+        } else if (cells[vox_(x, y, z)].size == curr_min) {
             pos[counter] = z * xsize * ysize + x * ysize + y;
             counter++;
         }
@@ -1179,8 +1699,48 @@ void Grid::wake_helper(int x, int y, int z) {
     if (oar && x >= oar->x1 && x < oar->x2 &&
               y >= oar->y1 && y < oar->y2 &&
               z >= oar->z1 && z < oar->z2) {
-        cells[z][x][y].wake_oar();
+        cells[vox_(x, y, z)].wake_oar();
+    }
+}
+
+/**
+ * Diffused amount of one voxel
+ *
+ * The voxel retains (1 - diff_factor) of its amount and receives diff_factor / 26 of the amount of each of its
+ * up to 26 adjacent neighbors.
+ */
+static inline double diffused_value(const double *src, int k, int i, int j, int xsize, int ysize, int zsize,
+                                    double diff_factor) {
+    const double *center = src + ((size_t) k * xsize + i) * ysize + j;
+    // Voxels away from the faces have all their 26 neighbors: no bounds check
+    bool interior = k > 0 && k < zsize - 1 && i > 0 && i < xsize - 1 && j > 0 && j < ysize - 1;
+
+    // Each voxel retains a portion of its original value.
+    double value = (1.0 - diff_factor) * *center;
+
+    // Diffuse to all 26 neighboring voxels.
+    for (int dz = -1; dz <= 1; dz++) {
+        for (int dx = -1; dx <= 1; dx++) {
+            for (int dy = -1; dy <= 1; dy++) {
+                // Skip the central voxel.
+                if (dz == 0 && dx == 0 && dy == 0)
+                    continue;
+
+                int nk = k + dz;
+                int ni = i + dx;
+                int nj = j + dy;
+
+                // Check that neighbor indices are within bounds.
+                if (interior || (nk >= 0 && nk < zsize &&
+                                 ni >= 0 && ni < xsize &&
+                                 nj >= 0 && nj < ysize)) {
+                    // Add the diffused portion from the neighbor.
+                    value += (diff_factor / 26.0) * center[((std::ptrdiff_t) dz * xsize + dx) * ysize + dy];
+                }
+            }
+        }
     }
+    return value;
 }
 
 /**
@@ -1190,44 +1750,41 @@ void Grid::wake_helper(int x, int y, int z) {
  * with a fraction determined by diff_factor. Each voxel retains (1 - diff_factor) of its
  * original amount and diffuses the remaining diff_factor equally among its up to 26 adjacent neighbors.
  *
- * @param src The 3D array with the initial amounts.
- * @param dest The 3D array where the diffused amounts will be stored.
+ * @param src The contiguous [z][x][y] array with the initial amounts.
+ * @param dest The contiguous [z][x][y] array where the diffused amounts will be stored.
  * @param xsize The number of rows (x-dimension) in the arrays.
  * @param ysize The number of columns (y-dimension) in the arrays.
  * @param zsize The number of layers (z-dimension) in the arrays.
  * @param diff_factor The fraction of each voxel's value to be diffused to its neighbors.
  */
-void diffuse_helper(double ***src, double ***dest, int xsize, int ysize, int zsize, double diff_factor) {
-    // Iterate over every voxel in the 3D grid.
+void diffuse_helper(const double *src, double *dest, int xsize, int ysize, int zsize, double diff_factor) {
+    // Iterate over every voxel in the 3D grid, in memory order.
     for (int k = 0; k < zsize; k++) {
         for (int i = 0; i < xsize; i++) {
-            for (int j = 0; j < ysize; j++) {
-                // Each voxel retains a portion of its original value.
-                dest[k][i][j] = (1.0 - diff_factor) * src[k][i][j];
-                
-                // Diffuse to all 26 neighboring voxels.
-                for (int dz = -1; dz <= 1; dz++) {
-                    for (int dx = -1; dx <= 1; dx++) {
-                        for (int dy = -1; dy <= 1; dy++) {
-                            // Skip the central voxel.
-                            if (dz == 0 && dx == 0 && dy == 0)
-                                continue;
-                            
-                            int nk = k + dz;
-                            int ni = i + dx;
-                            int nj = j + dy;
-                            
-                            // Check that neighbor indices are within bounds.
-                            if (nk >= 0 && nk < zsize &&
-                                ni >= 0 && ni < xsize &&
-                                nj >= 0 && nj < ysize) {
-                                // Add the diffused portion from the neighbor.
-                                dest[k][i][j] += (diff_factor / 26.0) * src[nk][ni][nj];
-                            }
-                        }
-                    }
+            double * __restrict__ row = dest + ((size_t) k * xsize + i) * ysize;
+            if (k == 0 || k == zsize - 1 || i == 0 || i == xsize - 1 || ysize < 3) {
+                for (int j = 0; j < ysize; j++)
+                    row[j] = diffused_value(src, k, i, j, xsize, ysize, zsize, diff_factor);
+                continue;
+            }
+            // Interior row: the 9 neighbor rows are contiguous, the same sum as diffused_value() in the same
+            // order (identical results) but without bounds checks, so that the loop over j is vectorized
+            const double *rows[9];
+            for (int dz = -1; dz <= 1; dz++)
+                for (int dx = -1; dx <= 1; dx++)
+                    rows[(dz + 1) * 3 + dx + 1] = src + ((size_t) (k + dz) * xsize + i + dx) * ysize;
+            row[0] = diffused_value(src, k, i, 0, xsize, ysize, zsize, diff_factor);
+            for (int j = 1; j < ysize - 1; j++) {
+                double value = (1.0 - diff_factor) * rows[4][j];
+                for (int r = 0; r < 9; r++) {
+                    value += (diff_factor / 26.0) * rows[r][j - 1];
+                    if (r != 4) // Skip the central voxel
+                        value += (diff_factor / 26.0) * rows[r][j];
+                    value += (diff_factor / 26.0) * rows[r][j + 1];
                 }
+                row[j] = value;
             }
+            row[ysize - 1] = diffused_value(src, k, i, ysize - 1, xsize, ysize, zsize, diff_factor);
         }
     }
 }
@@ -1246,7 +1803,7 @@ void diffuse_helper(double ***src, double ***dest, int xsize, int ysize, int zsi
 void Grid::diffuse(double diff_factor) {
     // Diffuse the glucose
     diffuse_helper(glucose, glucose_helper, xsize, ysize, zsize, diff_factor);
-    double ***temp = glucose;
+    double *temp = glucose;
     glucose = glucose_helper;
     glucose_helper = temp;
     
@@ -1261,7 +1818,9 @@ void Grid::diffuse(double diff_factor) {
  * Compute the weighted sum of cell types for the CellList on position x, y, z
  */
 int Grid::pixel_density(int x, int y, int z){
-    return cells[z][x][y].CellTypeSum();
+    int sum = cells[vox_(x, y, z)].CellTypeSum();
+    // Pooled quiescent cells count as healthy cells
+    return sum >= 0 ? sum + getPooledCount(x, y, z) : sum;
 }
 
 /**
@@ -1270,8 +1829,8 @@ int Grid::pixel_density(int x, int y, int z){
  * @return 0 if there are no cells on this position, -1 if there is a cancer cell, 1 for a healthy cell and 2 for an OAR cell
  */
 int Grid::pixel_type(int x, int y, int z){
-    if (cells[z][x][y].head){
-        char t = cells[z][x][y].head -> type;
+    if (cells[vox_(x, y, z)].head){
+        char t = cells[vox_(x, y, z)].head -> type;
         if (t == 'c'){
             return -1; 
         } else if (t == 'h'){
@@ -1280,21 +1839,21 @@ int Grid::pixel_type(int x, int y, int z){
             return 2;
         }
     } else {
-        return 0;
+        return getPooledCount(x, y, z) > 0 ? 1 : 0;
     }
 }
 
 /**
  * Return the current glucose array
  */
-double *** Grid::currentGlucose(){
+double * Grid::currentGlucose(){
     return glucose;
 }
 
 /**
  * Return the current oxygen array
  */
-double *** Grid::currentOxygen(){
+double * Grid::currentOxygen(){
     return oxygen;
 }
 
@@ -1304,21 +1863,22 @@ double *** Grid::currentOxygen(){
 int Grid::getHealthyCount(int x, int y, int z) {
 // Healthy cells are obtained by subtracting the number of cancerous cells (ccell_count)
 // and the number of OAR cells (oar_count) from the total number of cells (size)
-    return cells[z][x][y].size - cells[z][x][y].ccell_count - cells[z][x][y].oar_count;
+    return cells[vox_(x, y, z)].size - cells[vox_(x, y, z)].ccell_count - cells[vox_(x, y, z)].oar_count
+        + getPooledCount(x, y, z) + (int) lround(getFieldDensity(x, y, z));
 }
 
 /**
  * Return the number of cancer cells of a voxel
  */
 int Grid::getCancerCount(int x, int y, int z) {
-    return cells[z][x][y].ccell_count;
+    return cells[vox_(x, y, z)].ccell_count;
 }
 
 /**
  * Return the number of oar cells of a voxel
  */
 int Grid::getOARCount(int x, int y, int z) {
-    return cells[z][x][y].oar_count;
+    return cells[vox_(x, y, z)].oar_count;
 }
 
 /**
@@ -1373,6 +1933,10 @@ void Grid::irradiate(double dose, double radius, double center_x, double center_
     if (dose == 0)
         return;
 
+    // The far tissue reached by the radiation is converted back to agents first
+    if (!field_voxel.empty())
+        promote_within_(3 * radius, center_x, center_y, center_z);
+
     // Calculate the multiplier to normalize the dose 
     double multiplicator = get_multiplicator(dose, radius);
     // Model parameters for dose calculation (fixed values, can be modified)
@@ -1385,28 +1949,34 @@ void Grid::irradiate(double dose, double radius, double center_x, double center_
             for (int j = 0; j < ysize; j++) {
                 // Calculate the distance from the center
                 double dist = distance(i, j, k, center_x, center_y, center_z);
-                if (cells[k][i][j].size && dist < 3 * radius){ //If there are cells on the pixel
+                int idx = (k * xsize + i) * ysize + j;
+                // Pooled quiescent cells are expanded back to individual cells before being irradiated
+                if (pooled_(idx) && dist < 3 * radius)
+                    expand_pool_(i, j, k, 'q', pooled_(idx));
+                if (cells[vox_(i, j, k)].size && dist < 3 * radius){ //If there are cells on the pixel
                     // Snapshot per-type counts before radiation-induced deletions
-                    int init_c = cells[k][i][j].ccell_count;
-                    int init_o = cells[k][i][j].oar_count;
-                    int init_sz = cells[k][i][j].size;
+                    int init_c = cells[vox_(i, j, k)].ccell_count;
+                    int init_o = cells[vox_(i, j, k)].oar_count;
+                    int init_sz = cells[vox_(i, j, k)].size;
                     int init_h = init_sz - init_c - init_o;
 
-                    CellNode * current = cells[k][i][j].head;
+                    CellNode * current = cells[vox_(i, j, k)].head;
                     while (current){
                         // Include the effect of hypoxia, Powathil formula
-                        double omf = (oxygen[k][i][j] / 100.0 * oer_m + k_m) / (oxygen[k][i][j] / 100.0 + k_m) / oer_m;
+                        double omf = (oxygen[vox_(i, j, k)] / 100.0 * oer_m + k_m) / (oxygen[vox_(i, j, k)] / 100.0 + k_m) / oer_m;
                         current -> cell -> radiate(scale(radius, dist, multiplicator) * omf);
 
                         current = current -> next;
                     }
-                    int init_count = cells[k][i][j].size;
-                    cells[k][i][j].deleteDeadAndSort();
-                    change_neigh_counts(i, j, k, cells[k][i][j].size - init_count);
+                    int init_count = cells[vox_(i, j, k)].size;
+                    cells[vox_(i, j, k)].deleteDeadAndSort();
+                    change_neigh_counts(i, j, k, cells[vox_(i, j, k)].size - init_count);
+                    CELLSIM_COUNT(counters.voxels_irradiated, 1);
+                    CELLSIM_COUNT(counters.cells_killed, init_count - cells[vox_(i, j, k)].size);
                     // Update global per-Grid counts for deaths in this voxel
-                    int new_c = cells[k][i][j].ccell_count;
-                    int new_o = cells[k][i][j].oar_count;
-                    int new_sz = cells[k][i][j].size;
+                    int new_c = cells[vox_(i, j, k)].ccell_count;
+                    int new_o = cells[vox_(i, j, k)].oar_count;
+                    int new_sz = cells[vox_(i, j, k)].size;
                     int new_h = new_sz - new_c - new_o;
                     cell_counts[0] += (new_h - init_h);
                     cell_counts[1] += (new_c - init_c);
@@ -1426,7 +1996,7 @@ void Grid::irradiate(double dose, double radius, double center_x, double center_
  */
 
 double Grid::tumor_radius(int center_x, int center_y, int center_z) {
-    if (CancerCell::count == 0) {
+    if (cell_counts[1] == 0) {
         return -1.0;
     }
     double dist = -1.0;
@@ -1435,7 +2005,7 @@ double Grid::tumor_radius(int center_x, int center_y, int center_z) {
         for (int i = 0; i < xsize; i++) {
             for (int j = 0; j < ysize; j++) {
                 // If the voxel contains at least one cell and the first cell is cancerous
-                if (cells[k][i][j].size > 0 && cells[k][i][j].head->type == 'c') {
+                if (cells[vox_(i, j, k)].size > 0 && cells[vox_(i, j, k)].head->type == 'c') {
                     int dist_x = i - center_x;
                     int dist_y = j - center_y;
                     int dist_z = k - center_z;
@@ -1464,7 +2034,7 @@ void Grid::irradiate(double dose){
  * Since neigh_count is private (in the .h file) this method
  * allows external access to this matrix.
  */ 
- int*** Grid::getNeighCounts() const {
+ int* Grid::getNeighCounts() const {
     return neigh_counts;
 }
 
@@ -1481,6 +2051,447 @@ SourceList* Grid::getSources() const {
  * Since glucose is private (in the .h file) this method allows 
  * external access to the glucose matrix.
  */
-double*** Grid::getGlucose() const {
+double* Grid::getGlucose() const {
     return glucose;
 }
+
+/**
+ * Enable (or disable) the hybrid continuum/agent mode
+ *
+ * Healthy tissue far from the tumor dominates the number of cells and the cost of cycle_cells(), but it is
+ * rarely reached by the radiation. In hybrid mode the voxels farther than `distance` from the tumor center are
+ * stored as healthy-cell densities ("field voxels") evolved by cycle_field_voxel_(), and turned back into
+ * HealthyCell agents when the tumor or the radiation gets close (see update_hybrid_regions(), irradiate() and
+ * addToGrid()). The counts returned by Controller::get_cell_counts() include the field cells.
+ *
+ * @param distance Distance (in voxels) from the tumor center beyond which healthy voxels become densities,
+ *                 0 or less converts every field voxel back to agents and disables the mode
+ */
+void Grid::set_hybrid(double distance) {
+    if (distance <= 0) {
+        for (int k = 0; k < zsize && !field_voxel.empty(); k++)
+            for (int i = 0; i < xsize; i++)
+                for (int j = 0; j < ysize; j++)
+                    if (is_field_((k * xsize + i) * ysize + j))
+                        promote_voxel_(i, j, k);
+        hybrid_distance = 0.0;
+        field_density.clear();
+        field_voxel.clear();
+        field_phase.clear();
+        field_factor.clear();
+        field_count = 0.0;
+        return;
+    }
+    hybrid_distance = distance;
+    if (field_voxel.empty()) {
+        field_density.assign((size_t) xsize * ysize * zsize, 0.0);
+        field_voxel.assign((size_t) xsize * ysize * zsize, 0);
+        field_phase.assign((size_t) xsize * ysize * zsize * FIELD_PHASES, 0.0);
+        field_factor.assign((size_t) xsize * ysize * zsize, 0.0);
+    }
+    compute_center();
+    update_hybrid_regions();
+}
+
+/**
+ * Move the boundary between agents and densities around the current tumor center
+ *
+ * Field voxels within hybrid_distance of the center are promoted to agents. Agent voxels beyond it are
+ * demoted to densities when they only contain healthy cells that are not repairing radiation damage.
+ * Nothing changes while there is no cancer cell (the center is undefined).
+ */
+void Grid::update_hybrid_regions() {
+    if (field_voxel.empty() || cell_counts[1] <= 0)
+        return;
+    for (int k = 0; k < zsize; k++) {
+        for (int i = 0; i < xsize; i++) {
+            for (int j = 0; j < ysize; j++) {
+                bool far = distance(i, j, k, center_x, center_y, center_z) > hybrid_distance;
+                if (is_field_((k * xsize + i) * ysize + j)) {
+                    if (!far)
+                        promote_voxel_(i, j, k);
+                } else if (far && cells[vox_(i, j, k)].ccell_count == 0 && cells[vox_(i, j, k)].oar_count == 0) {
+                    bool repairing = false;
+                    for (CellNode * current = cells[vox_(i, j, k)].head; current && !repairing; current = current->next)
+                        repairing = current->cell->get_state().repair > 0;
+                    if (!repairing)
+                        demote_voxel_(i, j, k);
+                }
+            }
+        }
+    }
+}
+
+/**
+ * Return the healthy-cell density of a voxel (0 for agent voxels)
+ */
+double Grid::getFieldDensity(int x, int y, int z) const {
+    int idx = (z * xsize + x) * ysize + y;
+    return is_field_(idx) ? field_density[idx] : 0.0;
+}
+
+/**
+ * Return true if the voxel is stored as a density
+ */
+bool Grid::isFieldVoxel(int x, int y, int z) const {
+    return is_field_((z * xsize + x) * ysize + y);
+}
+
+/**
+ * Number of cells of a voxel, agents plus the rounded field density (used to place newborn cells)
+ */
+int Grid::voxel_size_(int x, int y, int z) const {
+    return cells[vox_(x, y, z)].size + getPooledCount(x, y, z) + (int) lround(getFieldDensity(x, y, z));
+}
+
+/**
+ * Turn the density of a field voxel into HealthyCell agents
+ *
+ * Every cell of the cohorts becomes an agent with the stage and age of its cohort and the average efficiency
+ * factor of the voxel. The neighbor counters are not changed: the cells were already counted when the voxel was
+ * demoted.
+ */
+void Grid::promote_voxel_(int x, int y, int z) {
+    int idx = (z * xsize + x) * ysize + y;
+    double * phase = &field_phase[(size_t) idx * FIELD_PHASES];
+    double factor = field_density[idx] > 0.0 ? field_factor[idx] / field_density[idx] : 1.0;
+    int n = 0;
+    for (int p = 0; p < FIELD_PHASES; p++) {
+        char stage;
+        int age;
+        field_stage_of(p, stage, age);
+        for (long c = lround(phase[p]); c > 0; c--, n++) {
+            HealthyCell * cell = new HealthyCell(stage);
+            cell_state state = cell->get_state();
+            state.age = age;
+            state.glu_efficiency = factor * POOL_GLUCOSE_ABSORPTION;
+            state.oxy_efficiency = factor * 20.0;
+            cell->set_state(state);
+            cells[vox_(x, y, z)].add(cell, 'h', x, y, z);
+        }
+    }
+    cell_counts[0] += n;
+    field_count -= field_density[idx];
+    field_density[idx] = 0.0;
+    field_factor[idx] = 0.0;
+    std::fill(phase, phase + FIELD_PHASES, 0.0);
+    field_voxel[idx] = 0;
+}
+
+/**
+ * Replace the healthy agents of a voxel with a density
+ */
+void Grid::demote_voxel_(int x, int y, int z) {
+    int idx = (z * xsize + x) * ysize + y;
+    int n = cells[vox_(x, y, z)].size + pooled_(idx);
+    // The cells keep their position in the cycle (the pooled ones are quiescent) and their efficiency factors
+    double * phase = &field_phase[(size_t) idx * FIELD_PHASES];
+    phase[0] += pooled_(idx);
+    for (CellNode * current = cells[vox_(x, y, z)].head; current; current = current->next) {
+        cell_state state = current->cell->get_state();
+        phase[field_phase_of(state.stage, state.age)] += 1.0;
+        field_factor[idx] += state.glu_efficiency / POOL_GLUCOSE_ABSORPTION;
+    }
+    cells[vox_(x, y, z)] = CellList();
+    if (!quiescent_pool.empty()) {
+        field_factor[idx] += quiescent_pool[idx].factor_sum;
+        quiescent_pool[idx] = {0, 0, 0.0, 0.0};
+    }
+    HealthyCell::count -= n;
+    cell_counts[0] -= n;
+    field_density[idx] = n;
+    field_count += n;
+    field_voxel[idx] = 1;
+}
+
+/**
+ * Promote every field voxel closer than `radius` to the given center
+ */
+void Grid::promote_within_(double radius, double center_x, double center_y, double center_z) {
+    for (int k = 0; k < zsize; k++)
+        for (int i = 0; i < xsize; i++)
+            for (int j = 0; j < ysize; j++)
+                if (is_field_((k * xsize + i) * ysize + j) && distance(i, j, k, center_x, center_y, center_z) < radius)
+                    promote_voxel_(i, j, k);
+}
+
+/**
+ * Advance the healthy density of a field voxel by one hour
+ *
+ * Population version of HealthyCell::cycle(), applied to the cohorts of the voxel (field_phase: the number of
+ * quiescent cells, then of cells at every hour of the cell cycle). The cells take their turn in a random order
+ * and see the nutrients left by the previous ones, each consuming like a cell with the average efficiency factor
+ * of the voxel (75% of it for the quiescent ones):
+ * - the cells that find the nutrients below the critical levels die;
+ * - the quiescent cells enter gap 1 when the voxel is rich in nutrients and not crowded, the gap 1 cells fall
+ *   asleep when it is poor or crowded, the other cohorts move one hour forward;
+ * - the cells in mitosis divide: the parent restarts gap 1 and the quiescent newborn goes to one of the least
+ *   crowded neighbors like rand_min(), or, when all of them hold 5 cells or more, the division does not happen
+ *   and the parent falls asleep.
+ * When every cell sees the voxel above the quiescent levels, the order does not matter and is not drawn.
+ *
+ * @param births Newborns of every voxel, applied by add_field_births_() at the end of cycle_cells()
+ */
+void Grid::cycle_field_voxel_(int x, int y, int z, std::vector<int>& births) {
+    int idx = (z * xsize + x) * ysize + y;
+    int n = (int) lround(field_density[idx]);
+    if (n <= 0)
+        return;
+
+    // Same values as cell.cpp
+    const double glucose_absorption = 0.36, oxygen_consumption = 20.0;
+    const double critical_glucose = 6.48, critical_oxygen = 360.0;
+    const double quiescent_glucose = 17.28, quiescent_oxygen = 960.0;
+    const int critical_neighbors = 27;
+
+    double & glu = glucose[vox_(x, y, z)];
+    double & oxy = oxygen[vox_(x, y, z)];
+    double * phase = &field_phase[(size_t) idx * FIELD_PHASES];
+    bool crowded = neigh_counts[vox_(x, y, z)] + n >= critical_neighbors;
+    double per_glucose = glucose_absorption * field_factor[idx] / n;
+    double per_oxygen = oxygen_consumption * field_factor[idx] / n;
+    bool ordered = n > 1 && (glu - n * per_glucose <= quiescent_glucose || oxy - n * per_oxygen <= quiescent_oxygen);
+
+    // The cohorts hold whole numbers of cells
+    int left[FIELD_PHASES];
+    for (int p = 0; p < FIELD_PHASES; p++)
+        left[p] = (int) phase[p];
+    int next[FIELD_PHASES] = {};
+    int curr_min = 100000, counter = -1;
+    int pos[26];
+    int alive = 0;
+    int p = 0;
+    for (; alive < n; alive++) {
+        if (glu < critical_glucose || oxy < critical_oxygen)
+            break;
+        // Cohort of the cell whose turn it is
+        if (ordered) {
+            int draw = rand() % (n - alive);
+            for (p = 0; draw >= left[p]; p++)
+                draw -= left[p];
+        } else {
+            while (left[p] == 0)
+                p++;
+        }
+        left[p]--;
+
+        if (p == 0) {
+            next[!crowded && glu > quiescent_glucose && oxy > quiescent_oxygen ? 1 : 0]++;
+        } else if (p <= FIELD_GAP1_HOURS) {
+            next[crowded || glu < quiescent_glucose || oxy < quiescent_oxygen ? 0 : p + 1]++;
+        } else if (p < FIELD_PHASES - 1) {
+            next[p + 1]++;
+        } else {
+            if (counter < 0)
+                counter = min_candidates_(x, y, z, curr_min, pos);
+            if (counter > 0 && curr_min < 5) {
+                births[pos[rand() % counter]]++;
+                next[1]++;
+            } else {
+                next[0]++;
+            }
+        }
+        double rate = p == 0 ? 0.75 : 1.0;
+        glu -= rate * per_glucose;
+        oxy -= rate * per_oxygen;
+    }
+    std::copy(next, next + FIELD_PHASES, phase);
+
+    // The deaths leave room around the voxel, like the deaths of agents in cycle_cells(), and the average
+    // efficiency factor unchanged
+    if (alive < n) {
+        field_count -= n - alive;
+        field_density[idx] = alive;
+        field_factor[idx] *= (double) alive / n;
+        change_neigh_counts(x, y, z, alive - n);
+    }
+}
+
+/**
+ * Apply the newborns accumulated during cycle_cells() for the field voxels
+ *
+ * Field voxels add them to their quiescent cohort with a new efficiency factor each, agent voxels receive new
+ * quiescent HealthyCells (like the ones created in cycle_cells()) through the toAdd list.
+ */
+void Grid::add_field_births_(std::vector<int>& births, CellList * toAdd) {
+    for (size_t idx = 0; idx < births.size(); idx++) {
+        int born = births[idx];
+        if (born == 0)
+            continue;
+        if (field_voxel[idx]) {
+            field_density[idx] += born;
+            field_phase[idx * FIELD_PHASES] += born;
+            for (int c = 0; c < born; c++)
+                field_factor[idx] += draw_efficiency_factor();
+            field_count += born;
+            continue;
+        }
+        int z = idx / (xsize * ysize);
+        int rem = idx % (xsize * ysize);
+        for (int c = 0; c < born; c++)
+            toAdd->add(new HealthyCell('q'), 'h', rem / ysize, rem % ysize, z);
+    }
+}
+
+/**
+ * Enable (or disable) the pooling of quiescent healthy cells
+ *
+ * Most healthy cells spend long stretches in quiescence, where HealthyCell::cycle() only subtracts their
+ * consumption. With pooling, the quiescent healthy cells without radiation damage leave the voxel lists and are
+ * kept as per-voxel aggregates (QuiescentPool: number of cells, sum and sum of squares of their efficiency
+ * factors) advanced in O(1) per voxel by cycle_pool_(). The cells that wake up are expanded back to individual
+ * cells, and the whole pool when the voxel is irradiated. Disabling the pooling expands all the pools.
+ *
+ * @param enabled Whether the quiescent cells are pooled
+ */
+void Grid::set_quiescent_pooling(bool enabled) {
+    if (enabled) {
+        if (quiescent_pool.empty())
+            quiescent_pool.assign((size_t) xsize * ysize * zsize, {0, 0, 0.0, 0.0});
+        return;
+    }
+    for (int k = 0; k < zsize && !quiescent_pool.empty(); k++)
+        for (int i = 0; i < xsize; i++)
+            for (int j = 0; j < ysize; j++) {
+                int pooled = pooled_((k * xsize + i) * ysize + j);
+                if (pooled)
+                    expand_pool_(i, j, k, 'q', pooled);
+            }
+    quiescent_pool.clear();
+}
+
+/**
+ * Return the total number of pooled quiescent cells
+ */
+long long Grid::getPooledCount() const {
+    long long total = 0;
+    for (const QuiescentPool& pool : quiescent_pool)
+        total += pool.count;
+    return total;
+}
+
+/**
+ * Return the number of pooled quiescent cells of a voxel
+ */
+int Grid::getPooledCount(int x, int y, int z) const {
+    return pooled_((z * xsize + x) * ysize + y);
+}
+
+/**
+ * Advance the quiescent pool of a voxel by one hour
+ *
+ * Aggregate version of the quiescent branch of HealthyCell::cycle(), with every cell consuming the average
+ * efficiency of the pool. The cells are fed in turn and see the nutrients left by the previous ones: they die
+ * once the voxel is below the critical nutrient levels, the survivors consume 75% of their normal rate, and the
+ * ones that still find the voxel rich enough (and not crowded) wake up. The caller expands the woken cells to
+ * gap 1 cells with expand_pool_().
+ *
+ * @param density Neighbor counter plus the number of cells of the voxel
+ * @return The number of cells of the pool that wake up
+ */
+int Grid::cycle_pool_(int x, int y, int z, int density) {
+    QuiescentPool & pool = quiescent_pool[(z * xsize + x) * ysize + y];
+    if (pool.count == 0)
+        return 0;
+    CELLSIM_COUNT(counters.pooled_cycled, pool.count);
+
+    // Same values as cell.cpp
+    const double oxygen_consumption = 20.0;
+    const double critical_glucose = 6.48, critical_oxygen = 360.0;
+    const double quiescent_glucose = 17.28, quiescent_oxygen = 960.0;
+    const int critical_neighbors = 27;
+
+    double & glu = glucose[vox_(x, y, z)];
+    double & oxy = oxygen[vox_(x, y, z)];
+    // Consumption of the whole pool, the levels seen by its last cell are above glu - total_glucose
+    double total_glucose = 0.75 * POOL_GLUCOSE_ABSORPTION * pool.factor_sum;
+    double total_oxygen = 0.75 * oxygen_consumption * pool.factor_sum;
+    double per_glucose = total_glucose / pool.count;
+    double per_oxygen = total_oxygen / pool.count;
+
+    // Number of cells fed before the voxel drops below the critical levels
+    int alive = pool.count;
+    if (glu < critical_glucose || oxy < critical_oxygen) {
+        alive = 0;
+    } else if (glu - total_glucose < critical_glucose || oxy - total_oxygen < critical_oxygen) {
+        if (per_glucose > 0)
+            alive = (int) std::min<double>(alive, floor((glu - critical_glucose) / per_glucose) + 1);
+        if (per_oxygen > 0)
+            alive = (int) std::min<double>(alive, floor((oxy - critical_oxygen) / per_oxygen) + 1);
+    }
+
+    // Number of them that find the voxel above the quiescent levels
+    int woken = density < critical_neighbors && glu > quiescent_glucose && oxy > quiescent_oxygen ? alive : 0;
+    if (woken && (glu - total_glucose <= quiescent_glucose || oxy - total_oxygen <= quiescent_oxygen)) {
+        if (per_glucose > 0)
+            woken = (int) std::min<double>(woken, ceil((glu - quiescent_glucose) / per_glucose));
+        if (per_oxygen > 0)
+            woken = (int) std::min<double>(woken, ceil((oxy - quiescent_oxygen) / per_oxygen));
+    }
+    glu -= alive * per_glucose;
+    oxy -= alive * per_oxygen;
+
+    // The dead cells leave the efficiency distribution unchanged
+    if (alive == pool.count)
+        return woken;
+    HealthyCell::count -= pool.count - alive;
+    double kept = (double) alive / pool.count;
+    pool.factor_sum *= kept;
+    pool.factor_sqsum *= kept;
+    pool.count = alive;
+    return woken;
+}
+
+/**
+ * Turn `count` cells of the pool of a voxel back into individual HealthyCells of the given stage
+ *
+ * The efficiency factor of every new cell is drawn from a normal distribution with the mean and the standard
+ * deviation of the pool, clipped to [0, 2] like in the HealthyCell constructor (whose own draw is rescaled, so
+ * the random generator advances as if the cells were created normally). The cells left in the pool keep its
+ * distribution.
+ */
+void Grid::expand_pool_(int x, int y, int z, char stage, int count) {
+    QuiescentPool & pool = quiescent_pool[(z * xsize + x) * ysize + y];
+    int n = pool.count;
+    double mean = pool.factor_sum / n;
+    double sd = sqrt(std::max(0.0, pool.factor_sqsum / n - mean * mean));
+    // The pooled cells are already part of HealthyCell::count, the constructor adds them again
+    HealthyCell::count -= count;
+    for (int c = 0; c < count; c++) {
+        HealthyCell * cell = new HealthyCell(stage);
+        // The constructor draws its factor from N(1, 1/3)
+        double standard = (cell->get_state().glu_efficiency / POOL_GLUCOSE_ABSORPTION - 1.0) * 3.0;
+        double factor = std::max(0.0, std::min(2.0, mean + standard * sd));
+        cell->set_state({stage, 0, 0, factor * POOL_GLUCOSE_ABSORPTION, factor * 20.0});
+        cells[vox_(x, y, z)].add(cell, 'h', x, y, z);
+    }
+    if (count == n) {
+        pool = {0, 0, 0.0, 0.0};
+        return;
+    }
+    double kept = (double) (n - count) / n;
+    pool.count = n - count;
+    pool.factor_sum *= kept;
+    pool.factor_sqsum *= kept;
+}
+
+/**
+ * Reset the work counters of the grid
+ */
+void Grid::reset_counters() {
+    counters = WorkCounters();
+}
+
+/**
+ * Estimate the memory used by the per-voxel arrays of the grid (cells and list nodes excluded)
+ *
+ * @return Bytes of the voxel lists, nutrient, neighbor, field and pool arrays
+ */
+long long Grid::memory_bytes() const {
+    long long voxels = (long long) xsize * ysize * zsize;
+    long long bytes = voxels * (sizeof(CellList) + 4 * sizeof(double) + sizeof(int));
+    bytes += (field_density.size() + field_phase.size() + field_factor.size()) * sizeof(double)
+        + field_voxel.size() * sizeof(char);
+    bytes += quiescent_pool.size() * sizeof(QuiescentPool);
+    return bytes;
+}
@@ -11,9 +11,11 @@ import numpy as np
 
 from rein.agent.core import DQNAgent
 from rein.agent.train import (
+    PROFILE_MODES,
     build_discrete_actions,
     evaluate_policy,
     linear_epsilon,
+    parse_episode_range,
     resolve_device,
     run_training,
     seed_everything,
@@ -58,6 +60,14 @@ def parse_int_sequence(value: str) -> Tuple[int, ...]:
     return tuple(parts)
 
 
+def parse_profile_episodes(value: str) -> Tuple[int, int]:
+    """Parse an inclusive episode window such as '50-55'."""
+    try:
+        return parse_episode_range(value)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error)) from None
+
+
 def parse_args() -> argparse.Namespace:
     """Configure and parse command line arguments for the entry-point."""
     default_config = AIConfig()
@@ -134,6 +144,78 @@ def parse_args() -> argparse.Namespace:
         default=default_config.growth_hours,
         help="Number of growth hours applied to the environment before each episode",
     )
+    parser.add_argument(
+        "--scenario-library",
+        type=Path,
+        default=default_config.scenario_library,
+        help="Library of pre-generated initial grids (see rein/env/scenario_library.py) sampled at every reset",
+    )
+    parser.add_argument(
+        "--fidelity",
+        choices=("full", "coarse"),
+        default=default_config.fidelity,
+        help="Simulator fidelity: agent-based ('full') or per-voxel population counts ('coarse')",
+    )
+    parser.add_argument(
+        "--hybrid-distance",
+        type=float,
+        default=default_config.hybrid_distance,
+        help="Store the healthy tissue farther than this distance (voxels) from the tumor as densities (0 disables)",
+    )
+    parser.add_argument(
+        "--quiescent-pooling",
+        action="store_true",
+        default=default_config.quiescent_pooling,
+        help="Keep the quiescent healthy cells as per-voxel aggregates instead of individual cells",
+    )
+    parser.add_argument(
+        "--timing-summary-interval",
+        type=int,
+        default=default_config.timing_summary_interval,
+        help="Print the training time breakdown every N episodes (0 disables)",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=default_config.metrics_port,
+        help="Serve live training metrics in Prometheus format on http://127.0.0.1:PORT/metrics",
+    )
+    parser.add_argument(
+        "--memory-diagnostics",
+        action="store_true",
+        default=default_config.memory_diagnostics,
+        help="Sample RSS, the Python heap and the simulator allocations every episode and flag steady growth",
+    )
+    parser.add_argument(
+        "--memory-window",
+        type=int,
+        default=default_config.memory_window,
+        help="Episodes over which a steady memory growth is detected",
+    )
+    parser.add_argument(
+        "--memory-growth-threshold-mb",
+        type=float,
+        default=default_config.memory_growth_threshold_mb,
+        help="Growth over the window (MiB) that flags the RSS, the Python heap or the simulator memory",
+    )
+    parser.add_argument(
+        "--memory-top-n",
+        type=int,
+        default=default_config.memory_top_n,
+        help="Python allocation sites (tracemalloc) logged per episode",
+    )
+    parser.add_argument(
+        "--profile-episodes",
+        type=parse_profile_episodes,
+        default=default_config.profile_episodes,
+        help="Profile the episodes FIRST-LAST (inclusive), e.g. 50-55; the profile is saved next to the checkpoints",
+    )
+    parser.add_argument(
+        "--profile-mode",
+        choices=PROFILE_MODES,
+        default=default_config.profile_mode,
+        help="Profiler of the window: cprofile (.prof file) or torch (Chrome trace JSON)",
+    )
     parser.add_argument(
         "--resume",
         action="store_true",
@@ -177,6 +259,12 @@ def parse_args() -> argparse.Namespace:
 
     # Agent overrides
     parser.add_argument("--agent-gamma", type=float, default=default_config.gamma, help="Discount factor gamma")
+    parser.add_argument(
+        "--agent-n-step",
+        type=int,
+        default=default_config.n_step,
+        help="Rewards summed into each bootstrapped target (n-step returns, discounted by gamma**n)",
+    )
     parser.add_argument(
         "--agent-learning-rate",
         type=float,
@@ -233,6 +321,110 @@ def parse_args() -> argparse.Namespace:
         default=default_config.batch_size,
         help="Mini-batch size for updates",
     )
+    parser.add_argument(
+        "--updates-per-step",
+        type=float,
+        default=default_config.updates_per_step,
+        help="Gradient updates per environment step; fractions accumulate (0.25 = one update every 4 steps)",
+    )
+
+    parser.add_argument(
+        "--replay-storage",
+        choices=("memory", "memmap", "device"),
+        default=default_config.replay_storage,
+        help="Keep the replay buffer in RAM, in memory-mapped files under the agent directory, or on the device",
+    )
+    parser.add_argument(
+        "--replay-memmap-window",
+        type=int,
+        default=default_config.replay_memmap_window,
+        help="Transitions kept in RAM before being written to the memory-mapped files",
+    )
+    parser.add_argument(
+        "--replay-staging-size",
+        type=int,
+        default=default_config.replay_staging_size,
+        help="Transitions staged on the host before being copied to the 'device' replay storage",
+    )
+    parser.add_argument(
+        "--replay-checkpoint-format",
+        choices=("segments", "full"),
+        default=default_config.replay_checkpoint_format,
+        help="Append only the new transitions to segment files at every checkpoint, or save the whole buffer",
+    )
+    parser.add_argument(
+        "--replay-max-segments",
+        type=int,
+        default=default_config.replay_max_segments,
+        help="Replay checkpoint segments kept before they are compacted into one",
+    )
+    parser.add_argument(
+        "--num-envs",
+        type=int,
+        default=default_config.num_envs,
+        help="Environments stepped together, acting with one batched forward pass per tick",
+    )
+    parser.add_argument(
+        "--pipeline-max-lag",
+        type=int,
+        default=default_config.pipeline_max_lag,
+        help="Run each env step on a worker thread during the previous step's updates, acting with a policy "
+        "at most this many updates behind (0 keeps the serial loop)",
+    )
+    parser.add_argument(
+        "--actors",
+        type=int,
+        default=default_config.actors,
+        help="Actor processes running their own environment and feeding the learner (Ape-X style); 0 disables",
+    )
+    parser.add_argument(
+        "--actor-sync-interval",
+        type=int,
+        default=default_config.actor_sync_interval,
+        help="Learner updates between two publications of the policy weights to the actors",
+    )
+    parser.add_argument(
+        "--actor-epsilon",
+        type=float,
+        default=default_config.actor_epsilon,
+        help="Base of the per-actor exploration rates, base ** (1 + alpha * i / (actors - 1))",
+    )
+    parser.add_argument(
+        "--actor-epsilon-alpha",
+        type=float,
+        default=default_config.actor_epsilon_alpha,
+        help="Spread of the per-actor exploration rates",
+    )
+    parser.add_argument(
+        "--prefetch-batches",
+        type=int,
+        default=default_config.prefetch_batches,
+        help="Mini-batches sampled ahead by a background thread (pinned and copied to CUDA); 0 disables",
+    )
+    parser.add_argument(
+        "--prioritized-replay",
+        action="store_true",
+        default=default_config.prioritized_replay,
+        help="Sample transitions proportionally to their TD error (sum-tree) instead of uniformly",
+    )
+    parser.add_argument(
+        "--per-alpha",
+        type=float,
+        default=default_config.per_alpha,
+        help="Prioritization exponent (0 = uniform sampling)",
+    )
+    parser.add_argument(
+        "--per-beta-start",
+        type=float,
+        default=default_config.per_beta_start,
+        help="Initial importance-sampling exponent, annealed linearly to 1",
+    )
+    parser.add_argument(
+        "--per-beta-steps",
+        type=int,
+        default=default_config.per_beta_steps,
+        help="Updates over which the importance-sampling exponent reaches 1",
+    )
 
     # Model overrides
     parser.add_argument(
@@ -267,12 +459,30 @@ def build_config(args: argparse.Namespace) -> AIConfig:
     hidden_sizes = tuple(args.model_hidden_sizes)
     return AIConfig(
         gamma=args.agent_gamma,
+        n_step=args.agent_n_step,
         learning_rate=args.agent_learning_rate,
         batch_size=args.replay_batch_size,
+        updates_per_step=args.updates_per_step,
         buffer_size=args.replay_capacity,
         min_buffer_size=args.replay_min_size,
+        replay_storage=args.replay_storage,
+        replay_memmap_window=args.replay_memmap_window,
+        replay_staging_size=args.replay_staging_size,
+        replay_checkpoint_format=args.replay_checkpoint_format,
+        replay_max_segments=args.replay_max_segments,
+        num_envs=args.num_envs,
+        pipeline_max_lag=args.pipeline_max_lag,
+        actors=args.actors,
+        actor_sync_interval=args.actor_sync_interval,
+        actor_epsilon=args.actor_epsilon,
+        actor_epsilon_alpha=args.actor_epsilon_alpha,
+        prefetch_batches=args.prefetch_batches,
         target_update_interval=args.agent_target_update,
         hidden_sizes=hidden_sizes,
+        prioritized_replay=args.prioritized_replay,
+        per_alpha=args.per_alpha,
+        per_beta_start=args.per_beta_start,
+        per_beta_steps=args.per_beta_steps,
         gradient_clip=args.agent_gradient_clip,
         device=args.device,
         seed=args.seed,
@@ -284,6 +494,10 @@ def build_config(args: argparse.Namespace) -> AIConfig:
         max_wait=args.max_wait,
         episodes=args.episodes,
         growth_hours=args.growth_hours,
+        scenario_library=args.scenario_library,
+        fidelity=args.fidelity,
+        hybrid_distance=args.hybrid_distance,
+        quiescent_pooling=args.quiescent_pooling,
         max_steps=args.max_steps,
         epsilon_start=args.agent_epsilon_start,
         epsilon_end=args.agent_epsilon_end,
@@ -291,6 +505,14 @@ def build_config(args: argparse.Namespace) -> AIConfig:
         save_agent_path=args.save_agent_path,
         eval_episodes=args.eval_episodes,
         save_episodes=args.save_episodes,
+        timing_summary_interval=args.timing_summary_interval,
+        metrics_port=args.metrics_port,
+        memory_diagnostics=args.memory_diagnostics,
+        memory_window=args.memory_window,
+        memory_growth_threshold_mb=args.memory_growth_threshold_mb,
+        memory_top_n=args.memory_top_n,
+        profile_episodes=args.profile_episodes,
+        profile_mode=args.profile_mode,
         resume=args.resume,
         resume_from=args.resume_from,
         reward_aware_activator=args.reward_aware,
@@ -1,6 +1,6 @@
 """Agent package grouping core components, training helpers, and metrics."""
 
-from .core import DQNAgent, ReplayBuffer
+from .core import DQNAgent, MemmapReplayBuffer, PrioritizedReplayBuffer, ReplayBuffer, TensorReplayBuffer
 from .metrics import (
     EpisodeMetrics,
     plot_epsilon,
@@ -35,7 +35,10 @@ from .train import (
 
 __all__ = [
     "DQNAgent",
+    "MemmapReplayBuffer",
+    "PrioritizedReplayBuffer",
     "ReplayBuffer",
+    "TensorReplayBuffer",
     "EpisodeMetrics",
     "plot_epsilon",
     "plot_episode_rewards",
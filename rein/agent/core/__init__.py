@@ -1,6 +1,18 @@
 """Core agent components such as models and replay buffers."""
 
 from .dqn_agent import DQNAgent
+from .memmap_replay import MemmapReplayBuffer
+from .prefetch import BatchPrefetcher
+from .prioritized_replay import PrioritizedReplayBuffer, SumTree
 from .replay_buffer import ReplayBuffer
+from .tensor_replay import TensorReplayBuffer
 
-__all__ = ["DQNAgent", "ReplayBuffer"]
+__all__ = [
+    "BatchPrefetcher",
+    "DQNAgent",
+    "MemmapReplayBuffer",
+    "PrioritizedReplayBuffer",
+    "ReplayBuffer",
+    "SumTree",
+    "TensorReplayBuffer",
+]
@@ -3,7 +3,8 @@
 from __future__ import annotations
 
 import random
-from typing import List, Sequence, Tuple
+import threading
+from typing import List, Optional, Sequence, Tuple
 
 import numpy as np
 import torch
@@ -13,7 +14,11 @@ from torch.optim.lr_scheduler import ReduceLROnPlateau
 
 from ...configs.defaults import AIConfig, REDUCE_LR_ON_PLATEAU_PARAMS
 from ...model import QNetwork
+from .memmap_replay import MemmapReplayBuffer
+from .prefetch import BatchPrefetcher
+from .prioritized_replay import PrioritizedReplayBuffer
 from .replay_buffer import ReplayBuffer
+from .tensor_replay import TensorReplayBuffer
 
 
 def get_param() -> AIConfig:
@@ -55,10 +60,55 @@ class DQNAgent:
         # Optimiser for the policy network and the replay buffer backing off-policy learning.
         self.optimizer = optim.Adam(self.policy_net.parameters(), lr=self.config.learning_rate)
         self.lr_scheduler = ReduceLROnPlateau(self.optimizer, **REDUCE_LR_ON_PLATEAU_PARAMS)
-        self.replay_buffer = ReplayBuffer(self.config.buffer_size)
+        self.replay_buffer = self.build_replay_buffer()
+        # Held around every replay buffer access once batches are sampled in the background
+        self._replay_lock = threading.Lock()
+        self._prefetcher: Optional[BatchPrefetcher] = None
 
         self._step_counter = 0
 
+    def build_replay_buffer(
+        self,
+    ) -> ReplayBuffer | PrioritizedReplayBuffer | MemmapReplayBuffer | TensorReplayBuffer:
+        """Return an empty replay buffer of the kind selected by the config."""
+        storage = getattr(self.config, "replay_storage", "memory")
+        if storage not in ("memory", "memmap", "device"):
+            raise ValueError(f"Unknown replay storage {storage!r}, expected 'memory', 'memmap' or 'device'")
+        if storage != "memory" and getattr(self.config, "prioritized_replay", False):
+            raise ValueError("The prioritized replay buffer only supports the 'memory' storage")
+        n_step = int(getattr(self.config, "n_step", 1))
+        if storage == "memmap" and n_step > 1:
+            raise ValueError("n-step returns are not supported by the 'memmap' replay storage")
+        if storage == "device":
+            if getattr(self.config, "prefetch_batches", 0) > 0:
+                raise ValueError("The 'device' replay storage samples on the device, it cannot be prefetched")
+            return TensorReplayBuffer(
+                self.config.buffer_size,
+                (self.state_dim,),
+                self.device,
+                staging=self.config.replay_staging_size,
+                n_step=n_step,
+                gamma=self.config.gamma,
+            )
+        if storage == "memmap":
+            return MemmapReplayBuffer(
+                self.config.buffer_size,
+                self.config.save_agent_path / "replay_memmap",
+                (self.state_dim,),
+                window=self.config.replay_memmap_window,
+            )
+        if getattr(self.config, "prioritized_replay", False):
+            return PrioritizedReplayBuffer(
+                self.config.buffer_size,
+                alpha=self.config.per_alpha,
+                beta_start=self.config.per_beta_start,
+                beta_steps=self.config.per_beta_steps,
+                epsilon=self.config.per_epsilon,
+                n_step=n_step,
+                gamma=self.config.gamma,
+            )
+        return ReplayBuffer(self.config.buffer_size, n_step=n_step, gamma=self.config.gamma)
+
     def select_action(self, state: np.ndarray, epsilon: float) -> Tuple[int, np.ndarray]:
         """Return the action index and value following an ε-greedy policy."""
         
@@ -74,6 +124,24 @@ class DQNAgent:
             idx = int(torch.argmax(q_values, dim=1).item())
         return idx, self.actions[idx]
 
+    def select_actions(self, states: np.ndarray, epsilons: np.ndarray | float) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """Return the ε-greedy action indices and values of a batch of states.
+
+        ``epsilons`` holds one exploration rate per state (or one for all).
+        The greedy actions come from a single forward pass over the whole
+        ``(N, state_dim)`` batch, skipped when every state explores.
+        """
+        states = np.asarray(states, dtype=np.float32).reshape(-1, self.state_dim)
+        count = states.shape[0]
+        explore = np.random.random(count) < np.broadcast_to(np.asarray(epsilons, dtype=np.float64), (count,))
+        indices = np.random.randint(len(self.actions), size=count)
+        if not explore.all():
+            with torch.no_grad():
+                q_values = self.policy_net(torch.as_tensor(states, device=self.device))
+            greedy = torch.argmax(q_values, dim=1).cpu().numpy()
+            indices = np.where(explore, indices, greedy)
+        return indices, [self.actions[idx] for idx in indices]
+
     def store_transition(
         self,
         state: np.ndarray,
@@ -83,7 +151,26 @@ class DQNAgent:
         done: bool,
     ) -> None:
         """Store a transition into the replay buffer."""
-        self.replay_buffer.add(state, action_index, reward, next_state, done)
+        if self._prefetcher is None:
+            self.replay_buffer.add(state, action_index, reward, next_state, done)
+            return
+        with self._replay_lock:
+            self.replay_buffer.add(state, action_index, reward, next_state, done)
+
+    def store_transitions(
+        self,
+        states: np.ndarray,
+        action_indices: np.ndarray,
+        rewards: np.ndarray,
+        next_states: np.ndarray,
+        dones: np.ndarray,
+    ) -> None:
+        """Store the rows of stacked transition columns with a single ``add_batch`` call."""
+        if self._prefetcher is None:
+            self.replay_buffer.add_batch(states, action_indices, rewards, next_states, dones)
+            return
+        with self._replay_lock:
+            self.replay_buffer.add_batch(states, action_indices, rewards, next_states, dones)
 
     def can_update(self) -> bool:
         """Return True when the buffer has enough samples for training."""
@@ -95,11 +182,51 @@ class DQNAgent:
         if not self.can_update():
             return None
 
+        # Sample a random mini-batch whose tensors are already placed on the agent device.
+        return float(self._learn(self._next_batch()).item())
+
+    def update_many(self, count: int) -> List[float]:
+        """Run ``count`` optimization steps back to back and return their losses.
+
+        Uniform buffers draw the ``count`` batches in one ``sample`` call of
+        ``count * batch_size`` distinct transitions, shuffled and then split
+        (the memory-mapped buffer returns its draw in slot order, so
+        consecutive slices would cover narrow slot bands). A
+        prioritized buffer (whose priorities change after every step) and the
+        prefetcher still give one batch per step. The losses stay on the
+        device until the last step, so the steps are not interleaved with
+        host synchronisations.
+        """
+        if count <= 0 or not self.can_update():
+            return []
+        batch_size = self.config.batch_size
+        fused = (
+            count > 1
+            and not getattr(self.replay_buffer, "prioritized", False)
+            and int(getattr(self.config, "prefetch_batches", 0)) <= 0
+            and len(self.replay_buffer) >= count * batch_size
+        )
+        if fused:
+            draws = self.replay_buffer.sample(count * batch_size, self.device)
+            order = torch.randperm(count * batch_size, device=draws[0].device)
+            draws = tuple(column[order] for column in draws)
+            batches = [tuple(column[i * batch_size : (i + 1) * batch_size] for column in draws) for i in range(count)]
+            losses = [self._learn(batch) for batch in batches]
+        else:
+            losses = [self._learn(self._next_batch()) for _ in range(count)]
+        return torch.stack(losses).tolist()
+
+    def _learn(self, batch: Tuple) -> torch.Tensor:
+        """Take one optimization step on ``batch`` and return the detached loss."""
         # Track how many optimisation steps we have taken for periodic target syncs.
         self._step_counter += 1
-        # Sample a random mini-batch whose tensors are already placed on the agent device.
-        batch = self.replay_buffer.sample(self.config.batch_size, self.device)
-        states, actions, rewards, next_states, dones = batch
+        states, actions, rewards, next_states, dones = batch[:5]
+        extras = list(batch[5:])
+        # n-step buffers return n-step rewards and the discount of their bootstrap (gamma ** n)
+        discounts = extras.pop(0) if getattr(self.replay_buffer, "n_step", 1) > 1 else self.config.gamma
+        prioritized = getattr(self.replay_buffer, "prioritized", False)
+        if prioritized:
+            weights, indices = extras
 
         # Q(s,a) values for the sampled actions under the current policy network.
         current_q = self.policy_net(states).gather(1, actions.unsqueeze(1)).squeeze(1)
@@ -108,10 +235,17 @@ class DQNAgent:
             # Double-DQN style target: argmax with policy net, value with target net.
             next_actions = torch.argmax(self.policy_net(next_states), dim=1, keepdim=True)
             next_q = self.target_net(next_states).gather(1, next_actions).squeeze(1)
-            targets = rewards + (1.0 - dones) * self.config.gamma * next_q
+            targets = rewards + (1.0 - dones) * discounts * next_q
 
         # Huber loss is robust to outliers in bootstrapped targets.
-        loss = F.smooth_l1_loss(current_q, targets)
+        if prioritized:
+            # Importance-sampling weights correct the bias of the prioritized draw
+            loss = (weights * F.smooth_l1_loss(current_q, targets, reduction="none")).mean()
+            td_errors = (targets - current_q).detach().abs().cpu().numpy()
+            with self._replay_lock:
+                self.replay_buffer.update_priorities(indices, td_errors)
+        else:
+            loss = F.smooth_l1_loss(current_q, targets)
         self.optimizer.zero_grad()
         loss.backward()
 
@@ -124,7 +258,30 @@ class DQNAgent:
         if self._step_counter % self.config.target_update_interval == 0:
             self.sync_target_network()
 
-        return float(loss.item())
+        return loss.detach()
+
+    def _next_batch(self) -> Tuple:
+        """Return the next mini-batch, from the prefetcher when ``config.prefetch_batches`` is set."""
+        depth = int(getattr(self.config, "prefetch_batches", 0))
+        if depth <= 0:
+            return self.replay_buffer.sample(self.config.batch_size, self.device)
+        if self._prefetcher is not None and self._prefetcher.buffer is not self.replay_buffer:
+            # The buffer was replaced (e.g. restored from a checkpoint)
+            self.stop_prefetching()
+        if self._prefetcher is None:
+            self._prefetcher = BatchPrefetcher(
+                self.replay_buffer, self.config.batch_size, self.device, self._replay_lock, depth=depth
+            ).start()
+        return self._prefetcher.get()
+
+    def stop_prefetching(self) -> None:
+        """Stop the background batch prefetcher, if one is running (the next ``update`` restarts it).
+
+        Called before the buffer is read as a whole (checkpoints) and when training ends.
+        """
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+            self._prefetcher = None
 
     def step_reward_scheduler(self, average_reward: float) -> float:
         """Adjust the learning rate when the reward plateaus or decreases."""
@@ -0,0 +1,236 @@
+"""Replay buffer whose columns live in memory-mapped files."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+from .replay_buffer import Transition
+
+HEADER_NAME = "header.json"
+
+# Column name -> (dtype, per-transition shape is the state shape)
+_COLUMNS: Dict[str, Tuple[type, bool]] = {
+    "states": (np.float32, True),
+    "actions": (np.int64, False),
+    "rewards": (np.float32, False),
+    "next_states": (np.float32, True),
+    "dones": (np.float32, False),
+}
+
+
+class MemmapReplayBuffer:
+    """Fixed-size ring of transitions stored in ``np.memmap`` files under ``directory``.
+
+    Only the last ``window`` transitions are kept in RAM: ``add`` fills this
+    write-back window, which is copied to the files when it is full (or on
+    ``flush``). ``sample`` gathers the batch through the memory maps, so the
+    page cache and not the Python heap holds the buffer, and reads the rows
+    still in the window from RAM. ``flush`` also writes ``header.json`` (size
+    and ring position): checkpointing the buffer is a header flush, and
+    ``MemmapReplayBuffer.open`` reopens the files without reading them.
+
+    The files are created by the first ``add``, so building a buffer over the
+    directory of a run that is about to be resumed does not truncate it.
+    """
+
+    DEFAULT_WINDOW = 4_096
+
+    def __init__(
+        self,
+        capacity: int,
+        directory: Path | str,
+        state_shape: Sequence[int],
+        window: int = DEFAULT_WINDOW,
+    ) -> None:
+        self.capacity = int(capacity)
+        self.directory = Path(directory)
+        self.state_shape = tuple(int(dim) for dim in state_shape)
+        self.window = max(1, min(int(window), self.capacity))
+
+        self._size = 0
+        self._next = 0  # Slot written by the next add()
+        self._pending = 0  # Transitions in the window, not yet in the files
+        self._maps: Optional[Dict[str, np.memmap]] = None
+        self._window = {
+            name: np.zeros((self.window, *self._row_shape(name)), dtype=dtype) for name, (dtype, _) in _COLUMNS.items()
+        }
+
+    def _row_shape(self, name: str) -> Tuple[int, ...]:
+        return self.state_shape if _COLUMNS[name][1] else ()
+
+    def _open_maps(self, mode: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._maps = {
+            name: np.memmap(
+                self.directory / f"{name}.dat",
+                dtype=dtype,
+                mode=mode,
+                shape=(self.capacity, *self._row_shape(name)),
+            )
+            for name, (dtype, _) in _COLUMNS.items()
+        }
+
+    @classmethod
+    def open(
+        cls,
+        directory: Path | str,
+        window: int = DEFAULT_WINDOW,
+        header: Optional[Dict[str, Any]] = None,
+    ) -> "MemmapReplayBuffer":
+        """Reopen the files of a flushed buffer; ``header`` overrides ``header.json`` (e.g. from a checkpoint)."""
+        directory = Path(directory)
+        if header is None:
+            header = json.loads((directory / HEADER_NAME).read_text())
+        buffer = cls(header["capacity"], directory, header["state_shape"], window=window)
+        buffer._size = int(header["size"])
+        buffer._next = int(header["next"])
+        buffer._open_maps("r+")
+        return buffer
+
+    @property
+    def header(self) -> Dict[str, Any]:
+        return {"capacity": self.capacity, "state_shape": list(self.state_shape), "size": self._size, "next": self._next}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Transition]:
+        """Yield the stored transitions from the oldest to the newest."""
+        self._flush_window()
+        start = self._next if self._size == self.capacity else 0
+        for offset in range(self._size):
+            slot = (start + offset) % self.capacity
+            yield Transition(
+                state=np.array(self._maps["states"][slot]),
+                action=int(self._maps["actions"][slot]),
+                reward=float(self._maps["rewards"][slot]),
+                next_state=np.array(self._maps["next_states"][slot]),
+                done=bool(self._maps["dones"][slot]),
+            )
+
+    def load_state(self, arrays: Dict[str, np.ndarray]) -> None:
+        """Fill the empty buffer with stacked columns (``ReplayBuffer.to_arrays``), written straight to the files."""
+        if self._size:
+            raise ValueError("load_state expects an empty MemmapReplayBuffer")
+        count = min(len(arrays["actions"]), self.capacity)
+        if count == 0:
+            return
+        if self._maps is None:
+            self._open_maps("w+")
+        rows = slice(len(arrays["actions"]) - count, None)
+        for name, column in self._maps.items():
+            column[:count] = np.asarray(arrays[name][rows]).reshape((count, *self._row_shape(name)))
+        self._size = count
+        self._next = count % self.capacity
+
+    def add(
+        self,
+        state: np.ndarray,
+        action: int,
+        reward: float,
+        next_state: np.ndarray,
+        done: bool,
+    ) -> None:
+        """Append a transition to the write-back window, overwriting the oldest one when full."""
+        if self._maps is None:
+            self._open_maps("w+")
+        row = self._pending
+        self._window["states"][row] = np.asarray(state, dtype=np.float32).reshape(self.state_shape)
+        self._window["actions"][row] = int(action)
+        self._window["rewards"][row] = float(reward)
+        self._window["next_states"][row] = np.asarray(next_state, dtype=np.float32).reshape(self.state_shape)
+        self._window["dones"][row] = float(bool(done))
+
+        self._pending += 1
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        if self._pending == self.window:
+            self._flush_window()
+
+    def add_batch(
+        self,
+        states: np.ndarray,
+        actions: np.ndarray,
+        rewards: np.ndarray,
+        next_states: np.ndarray,
+        dones: np.ndarray,
+    ) -> None:
+        """Append the rows of stacked columns to the write-back window, in slices up to each flush."""
+        if self._maps is None:
+            self._open_maps("w+")
+        columns = {
+            "states": np.asarray(states, dtype=np.float32).reshape((-1, *self.state_shape)),
+            "actions": np.asarray(actions, dtype=np.int64),
+            "rewards": np.asarray(rewards, dtype=np.float32),
+            "next_states": np.asarray(next_states, dtype=np.float32).reshape((-1, *self.state_shape)),
+            "dones": np.asarray(dones, dtype=np.float32),
+        }
+        count = len(columns["actions"])
+        offset = 0
+        while offset < count:
+            row = self._pending
+            take = min(count - offset, self.window - row)
+            for name, values in columns.items():
+                self._window[name][row : row + take] = values[offset : offset + take]
+            self._pending += take
+            self._next = (self._next + take) % self.capacity
+            self._size = min(self._size + take, self.capacity)
+            offset += take
+            if self._pending == self.window:
+                self._flush_window()
+
+    def _flush_window(self) -> None:
+        """Copy the window to its slots of the files (at most two slices when it wraps around)."""
+        if self._pending == 0:
+            return
+        start = (self._next - self._pending) % self.capacity
+        head = min(self._pending, self.capacity - start)
+        for name, column in self._maps.items():
+            column[start : start + head] = self._window[name][:head]
+            if head < self._pending:
+                column[: self._pending - head] = self._window[name][head : self._pending]
+        self._pending = 0
+
+    def flush(self) -> Dict[str, Any]:
+        """Write the window and the header to disk and return the header."""
+        if self._maps is not None:
+            self._flush_window()
+            for column in self._maps.values():
+                column.flush()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        header = self.header
+        (self.directory / HEADER_NAME).write_text(json.dumps(header))
+        return header
+
+    def sample(self, batch_size: int, device: torch.device) -> Tuple[torch.Tensor, ...]:
+        """Sample a mini-batch and return tensors on the requested device."""
+        if self._size < batch_size:
+            raise ValueError("MemmapReplayBuffer has fewer samples than the requested batch_size")
+
+        # Draw unique indices by rejecting repeats (np.random.choice without replacement permutes
+        # the whole buffer), sorted so the gather walks the files forward
+        slots = np.unique(np.random.randint(self._size, size=batch_size))
+        while slots.size < batch_size:
+            extra = np.random.randint(self._size, size=batch_size - slots.size)
+            slots = np.unique(np.concatenate([slots, extra]))
+        columns = {name: column[slots] for name, column in self._maps.items()}
+
+        # Rows still in the write-back window are not in the files yet
+        offsets = (slots - (self._next - self._pending)) % self.capacity
+        in_window = offsets < self._pending
+        if in_window.any():
+            for name, values in columns.items():
+                values[in_window] = self._window[name][offsets[in_window]]
+
+        return (
+            torch.as_tensor(columns["states"], device=device),
+            torch.as_tensor(columns["actions"], device=device),
+            torch.as_tensor(columns["rewards"], device=device),
+            torch.as_tensor(columns["next_states"], device=device),
+            torch.as_tensor(columns["dones"], device=device),
+        )
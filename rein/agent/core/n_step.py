@@ -0,0 +1,96 @@
+"""Vectorised n-step returns over the episode boundaries stored in a replay ring."""
+
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+import torch
+
+
+def episode_starts(states: np.ndarray, next_states: np.ndarray, dones: np.ndarray) -> np.ndarray:
+    """Flag the rows that do not continue the previous one.
+
+    A row starts an episode when it is the first one, when the previous row
+    ended with ``done`` or when its state differs from the previous
+    ``next_state`` (e.g. an episode cut by ``max_steps``).
+    """
+    count = len(dones)
+    starts = np.ones(count, dtype=bool)
+    if count > 1:
+        same = np.all(states[1:].reshape(count - 1, -1) == next_states[:-1].reshape(count - 1, -1), axis=1)
+        starts[1:] = ~same | (np.asarray(dones[:-1]) != 0)
+    return starts
+
+
+def n_step_returns(
+    positions: np.ndarray,
+    start: int,
+    size: int,
+    capacity: int,
+    rewards: np.ndarray,
+    dones: np.ndarray,
+    starts: np.ndarray,
+    n_step: int,
+    gamma: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Return the n-step return of every sampled transition and where to bootstrap it.
+
+    ``positions`` count from the oldest stored transition, which lives in
+    slot ``start`` of the ring columns ``rewards``, ``dones`` and ``starts``.
+    A transition sums the discounted rewards of up to ``n_step`` following
+    transitions, stopping after a ``done``, before the start of another
+    episode and at the newest stored transition. Returns the returns, the
+    position of the last transition summed (its ``next_state`` is the
+    bootstrap state), its ``done`` flag and the bootstrap discount
+    ``gamma ** steps`` (``gamma ** n_step`` unless the chain stopped early).
+    The loop runs over the ``n_step`` offsets, each on the whole batch.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    returns = np.zeros(positions.shape, dtype=np.float64)
+    last = positions.copy()
+    steps = np.zeros(positions.shape, dtype=np.int64)
+    alive = np.ones(positions.shape, dtype=bool)
+    for offset in range(n_step):
+        slots = (start + positions + offset) % capacity
+        if offset:
+            alive &= (positions + offset < size) & ~starts[slots]
+        returns += np.where(alive, gamma**offset * rewards[slots], 0.0)
+        last = np.where(alive, positions + offset, last)
+        steps += alive
+        alive &= dones[slots] == 0
+    terminal = dones[(start + last) % capacity]
+    return (
+        returns.astype(np.float32),
+        last,
+        np.asarray(terminal, dtype=np.float32),
+        (gamma**steps).astype(np.float32),
+    )
+
+
+def n_step_returns_torch(
+    positions: torch.Tensor,
+    start: int,
+    size: int,
+    capacity: int,
+    rewards: torch.Tensor,
+    dones: torch.Tensor,
+    starts: torch.Tensor,
+    n_step: int,
+    gamma: float,
+) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+    """``n_step_returns`` on tensors, on the device of the ring columns."""
+    returns = torch.zeros(positions.shape, dtype=torch.float32, device=positions.device)
+    last = positions.clone()
+    steps = torch.zeros_like(positions)
+    alive = torch.ones(positions.shape, dtype=torch.bool, device=positions.device)
+    for offset in range(n_step):
+        slots = (start + positions + offset) % capacity
+        if offset:
+            alive &= (positions + offset < size) & ~starts[slots]
+        returns += torch.where(alive, gamma**offset * rewards[slots], 0.0)
+        last = torch.where(alive, positions + offset, last)
+        steps += alive
+        alive &= dones[slots] == 0
+    terminal = dones[(start + last) % capacity]
+    return returns, last, terminal, torch.pow(gamma, steps.to(torch.float32))
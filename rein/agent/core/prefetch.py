@@ -0,0 +1,93 @@
+"""Background sampling of replay mini-batches for the DQN learner."""
+
+from __future__ import annotations
+
+import queue
+import threading
+from typing import Any, Optional, Tuple
+
+import torch
+
+
+class BatchPrefetcher:
+    """Keep up to ``depth`` mini-batches sampled ahead by a daemon thread.
+
+    The thread samples ``buffer`` on the CPU while holding ``lock``, the lock
+    the learner also holds to add transitions and update priorities, so every
+    batch is drawn from a consistent buffer state even while the environment
+    loop keeps appending. On a CUDA ``device`` the tensors are pinned and
+    copied with ``non_blocking=True`` from the thread, so ``get`` hands over
+    batches already on the device; on the CPU they are used as sampled.
+
+    Batches are drawn before the learner consumes them: a prioritized batch
+    can miss the priority updates of the ``depth`` previous ones, and the
+    draws consume the global NumPy RNG from another thread, so the sampling
+    order is no longer reproducible from the seed.
+    """
+
+    def __init__(
+        self,
+        buffer: Any,
+        batch_size: int,
+        device: torch.device,
+        lock: threading.Lock,
+        depth: int = 2,
+    ) -> None:
+        if depth < 1:
+            raise ValueError("depth must be at least 1")
+        self.buffer = buffer
+        self.batch_size = int(batch_size)
+        self.device = device
+        self.lock = lock
+        self._pin = device.type == "cuda"
+        self._queue: "queue.Queue[Tuple[Any, ...] | BaseException]" = queue.Queue(maxsize=int(depth))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "BatchPrefetcher":
+        self._thread = threading.Thread(target=self._run, name="batch-prefetcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def _to_device(self, batch: Tuple[Any, ...]) -> Tuple[Any, ...]:
+        if not self._pin:
+            return batch
+        return tuple(
+            item.pin_memory().to(self.device, non_blocking=True) if isinstance(item, torch.Tensor) else item
+            for item in batch
+        )
+
+    def _put(self, item: Tuple[Any, ...] | BaseException) -> None:
+        # Wait for room in the queue, but give up when close() is called
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _run(self) -> None:
+        cpu = torch.device("cpu")
+        try:
+            while not self._stop.is_set():
+                with self.lock:
+                    batch = self.buffer.sample(self.batch_size, cpu)
+                self._put(self._to_device(batch))
+        except BaseException as error:  # Re-raised by get() on the training thread
+            self._put(error)
+
+    def get(self) -> Tuple[Any, ...]:
+        """Return the next batch, in the format of ``buffer.sample``, waiting for the thread if needed."""
+        item = self._queue.get()
+        if isinstance(item, BaseException):
+            raise RuntimeError("Batch prefetcher thread failed") from item
+        return item
+
+    def close(self) -> None:
+        """Stop the thread and drop the batches it left in the queue."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        while not self._queue.empty():
+            self._queue.get_nowait()
@@ -0,0 +1,323 @@
+"""Prioritized experience replay backed by a NumPy sum-tree."""
+
+from __future__ import annotations
+
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import torch
+
+from .n_step import episode_starts, n_step_returns
+from .replay_buffer import Transition
+
+
+class SumTree:
+    """Binary tree whose internal nodes hold the sum of their children, stored in a flat array.
+
+    Node ``1`` is the root, the children of node ``i`` are ``2i`` and
+    ``2i + 1`` and the ``capacity`` leaves start at ``size`` (the next power
+    of two). Both operations are batched: ``update`` rewrites the touched
+    leaves and then one level of parents at a time, ``find`` walks the whole
+    batch down the tree together, so each costs ``O(batch * log(capacity))``
+    in ``O(log(capacity))`` NumPy calls.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = int(capacity)
+        self.size = 1 << max(0, (self.capacity - 1).bit_length())
+        self.depth = self.size.bit_length() - 1
+        self.tree = np.zeros(2 * self.size, dtype=np.float64)
+
+    @property
+    def total(self) -> float:
+        return float(self.tree[1])
+
+    def get(self, indices: np.ndarray) -> np.ndarray:
+        """Return the values of the leaves ``indices``."""
+        return self.tree[np.asarray(indices) + self.size]
+
+    def update(self, indices: np.ndarray, values: np.ndarray) -> None:
+        """Set the leaves ``indices`` to ``values`` and refresh their ancestors."""
+        nodes = np.asarray(indices, dtype=np.int64) + self.size
+        self.tree[nodes] = values
+        if nodes.size == 1:
+            # Single leaf (every add()): a scalar walk is cheaper than the NumPy calls
+            node = int(nodes[0]) >> 1
+            while node:
+                self.tree[node] = self.tree[2 * node] + self.tree[2 * node + 1]
+                node >>= 1
+            return
+        for _ in range(self.depth):
+            # Shared parents are recomputed more than once, with the same result
+            nodes >>= 1
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values: np.ndarray) -> np.ndarray:
+        """Return, for every value in ``[0, total)``, the leaf whose cumulative range contains it."""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(values.shape[0], dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            go_right = values >= left_sum
+            values -= left_sum * go_right
+            nodes = left + go_right
+        return nodes - self.size
+
+
+class PrioritizedReplayBuffer:
+    """Proportional prioritized replay (Schaul et al., 2016) with a fixed capacity.
+
+    Transitions are stored column-wise in NumPy arrays used as a ring. A
+    transition is drawn with probability ``p_i ** alpha / sum(p ** alpha)``,
+    where ``p_i`` is its last absolute TD error plus ``epsilon``; new
+    transitions get the highest priority seen so far. ``sample`` splits the
+    priority mass into ``batch_size`` equal segments and draws one transition
+    in each (stratified sampling), and returns the importance-sampling weights
+    ``(N * P(i)) ** -beta`` normalised by their batch maximum, with ``beta``
+    annealed linearly from ``beta_start`` to 1 over ``beta_steps`` samples.
+    The learner feeds the new TD errors back with ``update_priorities``.
+    With ``n_step > 1`` the batch holds n-step returns, as in ``ReplayBuffer``.
+    """
+
+    prioritized = True
+
+    def __init__(
+        self,
+        capacity: int,
+        alpha: float = 0.6,
+        beta_start: float = 0.4,
+        beta_steps: int = 600_000,
+        epsilon: float = 1e-6,
+        n_step: int = 1,
+        gamma: float = 0.99,
+    ) -> None:
+        self.capacity = int(capacity)
+        self.n_step = int(n_step)
+        self.gamma = float(gamma)
+        if self.n_step < 1:
+            raise ValueError("n_step must be at least 1")
+        self.alpha = float(alpha)
+        self.beta_start = float(beta_start)
+        self.beta_steps = int(beta_steps)
+        self.epsilon = float(epsilon)
+        self.tree = SumTree(self.capacity)
+        self.max_priority = 1.0  # Highest priority ** alpha given so far
+        self.sample_calls = 0
+
+        self._size = 0
+        self._next = 0  # Slot written by the next add()
+        self.total_added = 0  # Transitions added since creation, including the overwritten ones
+        # Columns are allocated by the first add(), once the state shape is known
+        self._states: Optional[np.ndarray] = None
+        self._next_states: Optional[np.ndarray] = None
+        self._actions = np.zeros(self.capacity, dtype=np.int64)
+        self._rewards = np.zeros(self.capacity, dtype=np.float32)
+        self._dones = np.zeros(self.capacity, dtype=np.float32)
+        self._starts = np.ones(self.capacity, dtype=bool)  # Rows that do not continue the previous one
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Transition]:
+        """Yield the stored transitions from the oldest to the newest."""
+        start = self._next if self._size == self.capacity else 0
+        for offset in range(self._size):
+            slot = (start + offset) % self.capacity
+            yield Transition(
+                state=self._states[slot].copy(),
+                action=int(self._actions[slot]),
+                reward=float(self._rewards[slot]),
+                next_state=self._next_states[slot].copy(),
+                done=bool(self._dones[slot]),
+            )
+
+    def tail_arrays(self, count: int) -> Dict[str, np.ndarray]:
+        """Return the columns of the ``count`` newest transitions, from the oldest to the newest."""
+        count = min(int(count), self._size)
+        slots = (self._next - count + np.arange(count)) % self.capacity
+        if self._states is None:
+            states = next_states = np.zeros((0,), dtype=np.float32)
+        else:
+            states, next_states = self._states[slots], self._next_states[slots]
+        return {
+            "states": states,
+            "actions": self._actions[slots],
+            "rewards": self._rewards[slots],
+            "next_states": next_states,
+            "dones": self._dones[slots],
+        }
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Return the columns of every stored transition, from the oldest to the newest."""
+        return self.tail_arrays(self._size)
+
+    def load_state(self, arrays: Dict[str, np.ndarray]) -> None:
+        """Fill the empty buffer with the stacked columns returned by ``to_arrays``.
+
+        The newest ``capacity`` rows are copied into the columns in one go and
+        all get the current maximum priority, like transitions passed to ``add``.
+        """
+        if self._size:
+            raise ValueError("load_state expects an empty PrioritizedReplayBuffer")
+        count = min(len(arrays["actions"]), self.capacity)
+        if count == 0:
+            return
+        rows = slice(len(arrays["actions"]) - count, None)
+        states = np.asarray(arrays["states"][rows], dtype=np.float32)
+        if self._states is None:
+            self._states = np.zeros((self.capacity, *states.shape[1:]), dtype=np.float32)
+            self._next_states = np.zeros((self.capacity, *states.shape[1:]), dtype=np.float32)
+        self._states[:count] = states
+        self._next_states[:count] = arrays["next_states"][rows]
+        self._actions[:count] = arrays["actions"][rows]
+        self._rewards[:count] = arrays["rewards"][rows]
+        self._dones[:count] = arrays["dones"][rows]
+        self._starts[:count] = episode_starts(self._states[:count], self._next_states[:count], self._dones[:count])
+        self.tree.update(np.arange(count), np.full(count, self.max_priority))
+
+        self._size = count
+        self._next = count % self.capacity
+        self.total_added = count
+
+    @property
+    def beta(self) -> float:
+        if self.beta_steps <= 0:
+            return 1.0
+        fraction = min(1.0, self.sample_calls / float(self.beta_steps))
+        return self.beta_start + fraction * (1.0 - self.beta_start)
+
+    def add(
+        self,
+        state: np.ndarray,
+        action: int,
+        reward: float,
+        next_state: np.ndarray,
+        done: bool,
+    ) -> None:
+        """Store a transition with the current maximum priority, overwriting the oldest when full."""
+        state = np.asarray(state, dtype=np.float32)
+        if self._states is None:
+            self._states = np.zeros((self.capacity, *state.shape), dtype=np.float32)
+            self._next_states = np.zeros((self.capacity, *state.shape), dtype=np.float32)
+
+        slot = self._next
+        if self.n_step > 1:
+            previous = (slot - 1) % self.capacity
+            self._starts[slot] = (
+                self._size == 0 or bool(self._dones[previous]) or not np.array_equal(self._next_states[previous], state)
+            )
+        self._states[slot] = state
+        self._next_states[slot] = np.asarray(next_state, dtype=np.float32)
+        self._actions[slot] = int(action)
+        self._rewards[slot] = float(reward)
+        self._dones[slot] = float(bool(done))
+        self.tree.update(np.array([slot]), np.array([self.max_priority]))
+
+        self._next = (slot + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        self.total_added += 1
+
+    def add_batch(
+        self,
+        states: np.ndarray,
+        actions: np.ndarray,
+        rewards: np.ndarray,
+        next_states: np.ndarray,
+        dones: np.ndarray,
+    ) -> None:
+        """Store the rows of stacked columns in order, all with the current maximum priority."""
+        states = np.asarray(states, dtype=np.float32)
+        next_states = np.asarray(next_states, dtype=np.float32)
+        dones = np.asarray(dones, dtype=np.float32)
+        count = len(states)
+        if count == 0:
+            return
+        if self._states is None:
+            self._states = np.zeros((self.capacity, *states.shape[1:]), dtype=np.float32)
+            self._next_states = np.zeros((self.capacity, *states.shape[1:]), dtype=np.float32)
+
+        slots = (self._next + np.arange(count)) % self.capacity
+        if self.n_step > 1:
+            starts = episode_starts(states, next_states, dones)
+            previous = (self._next - 1) % self.capacity
+            starts[0] = (
+                self._size == 0
+                or bool(self._dones[previous])
+                or not np.array_equal(self._next_states[previous], states[0])
+            )
+            self._starts[slots] = starts
+        self._states[slots] = states
+        self._next_states[slots] = next_states
+        self._actions[slots] = np.asarray(actions, dtype=np.int64)
+        self._rewards[slots] = np.asarray(rewards, dtype=np.float32)
+        self._dones[slots] = dones
+        self.tree.update(slots, np.full(count, self.max_priority))
+
+        self._next = (self._next + count) % self.capacity
+        self._size = min(self._size + count, self.capacity)
+        self.total_added += count
+
+    def sample(self, batch_size: int, device: torch.device) -> Tuple[torch.Tensor, ...]:
+        """Draw a stratified mini-batch.
+
+        Returns ``states, actions, rewards, next_states, dones`` like
+        ``ReplayBuffer.sample`` (and the bootstrap discounts with
+        ``n_step > 1``), followed by the importance-sampling weights (tensor)
+        and the sampled slots (array, for ``update_priorities``).
+        """
+        if self._size < batch_size:
+            raise ValueError("PrioritizedReplayBuffer has fewer samples than the requested batch_size")
+
+        total = self.tree.total
+        segment = total / batch_size
+        values = (np.arange(batch_size) + np.random.random_sample(batch_size)) * segment
+        # Rounding can push a value past the last non-empty leaf
+        indices = np.minimum(self.tree.find(np.minimum(values, np.nextafter(total, 0.0))), self._size - 1)
+
+        probabilities = self.tree.get(indices) / total
+        weights = (self._size * probabilities) ** (-self.beta)
+        weights /= weights.max()
+        self.sample_calls += 1
+
+        if self.n_step > 1:
+            start = (self._next - self._size) % self.capacity
+            returns, last, terminal, discounts = n_step_returns(
+                (indices - start) % self.capacity,
+                start,
+                self._size,
+                self.capacity,
+                self._rewards,
+                self._dones,
+                self._starts,
+                self.n_step,
+                self.gamma,
+            )
+            return (
+                torch.as_tensor(self._states[indices], device=device),
+                torch.as_tensor(self._actions[indices], device=device),
+                torch.as_tensor(returns, device=device),
+                torch.as_tensor(self._next_states[(start + last) % self.capacity], device=device),
+                torch.as_tensor(terminal, device=device),
+                torch.as_tensor(discounts, device=device),
+                torch.as_tensor(weights, device=device, dtype=torch.float32),
+                indices,
+            )
+        return (
+            torch.as_tensor(self._states[indices], device=device),
+            torch.as_tensor(self._actions[indices], device=device),
+            torch.as_tensor(self._rewards[indices], device=device),
+            torch.as_tensor(self._next_states[indices], device=device),
+            torch.as_tensor(self._dones[indices], device=device),
+            torch.as_tensor(weights, device=device, dtype=torch.float32),
+            indices,
+        )
+
+    def update_priorities(self, indices: np.ndarray, td_errors: np.ndarray) -> None:
+        """Set the priorities of the sampled slots from their new absolute TD errors."""
+        priorities = (np.abs(np.asarray(td_errors, dtype=np.float64)) + self.epsilon) ** self.alpha
+        # A slot drawn twice in the batch keeps the value of its last draw
+        self.tree.update(indices, priorities)
+        self.max_priority = max(self.max_priority, float(priorities.max()))
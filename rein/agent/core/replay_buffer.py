@@ -2,13 +2,17 @@
 
 from __future__ import annotations
 
+import gc
 from collections import deque
 from dataclasses import dataclass
-from typing import Deque, Tuple
+from itertools import islice
+from typing import Any, Deque, Dict, Iterable, Iterator, Tuple
 
 import numpy as np
 import torch
 
+from .n_step import episode_starts, n_step_returns
+
 
 @dataclass
 class Transition:
@@ -21,17 +25,106 @@ class Transition:
     done: bool
 
 
+def stack_transitions(transitions: Iterable[Transition]) -> Dict[str, np.ndarray]:
+    """Stack transitions into the replay columns (``states``, ``actions``, ``rewards``, ``next_states``, ``dones``)."""
+    transitions = list(transitions)
+    if not transitions:
+        empty = np.zeros((0,), dtype=np.float32)
+        return {
+            "states": empty,
+            "actions": np.zeros((0,), dtype=np.int64),
+            "rewards": empty,
+            "next_states": empty,
+            "dones": empty,
+        }
+    # np.array copies a list of equally shaped rows several times faster than np.stack
+    return {
+        "states": np.array([t.state for t in transitions], dtype=np.float32),
+        "actions": np.array([t.action for t in transitions], dtype=np.int64),
+        "rewards": np.array([t.reward for t in transitions], dtype=np.float32),
+        "next_states": np.array([t.next_state for t in transitions], dtype=np.float32),
+        "dones": np.array([t.done for t in transitions], dtype=np.float32),
+    }
+
+
 class ReplayBuffer:
-    """Fixed-size buffer that stores transitions for off-policy learning."""
+    """Fixed-size buffer that stores transitions for off-policy learning.
 
-    def __init__(self, capacity: int) -> None:
+    With ``n_step > 1``, ``sample`` returns n-step returns (see
+    ``n_step_returns``): the rewards, dones and episode starts are also kept
+    in NumPy rings, so the returns are computed on the whole batch at once.
+    """
+
+    def __init__(self, capacity: int, n_step: int = 1, gamma: float = 0.99) -> None:
         self.capacity = int(capacity)
+        self.n_step = int(n_step)
+        self.gamma = float(gamma)
+        if self.n_step < 1:
+            raise ValueError("n_step must be at least 1")
         # Bounded deque drops the oldest transition once capacity is exceeded.
         self._buffer: Deque[Transition] = deque(maxlen=self.capacity)
+        # Transitions added since creation, including the overwritten ones (the ring head)
+        self.total_added = 0
+        if self.n_step > 1:
+            self._slot = 0  # Ring slot of the next add()
+            self._rewards = np.zeros(self.capacity, dtype=np.float32)
+            self._dones = np.zeros(self.capacity, dtype=np.float32)
+            self._starts = np.zeros(self.capacity, dtype=bool)
 
     def __len__(self) -> int:
         return len(self._buffer)
 
+    def __iter__(self) -> Iterator[Transition]:
+        """Yield the stored transitions from the oldest to the newest."""
+        return iter(self._buffer)
+
+    def tail_arrays(self, count: int) -> Dict[str, np.ndarray]:
+        """Return the columns of the ``count`` newest transitions, from the oldest to the newest."""
+        count = min(int(count), len(self._buffer))
+        return stack_transitions(reversed(list(islice(reversed(self._buffer), count))))
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Return the columns of every stored transition, from the oldest to the newest."""
+        return self.tail_arrays(len(self._buffer))
+
+    @classmethod
+    def from_arrays(cls, capacity: int, arrays: Dict[str, np.ndarray], **kwargs: Any) -> "ReplayBuffer":
+        """Build a buffer holding the transitions of ``arrays`` (see ``load_state``)."""
+        buffer = cls(capacity, **kwargs)
+        buffer.load_state(arrays)
+        return buffer
+
+    def load_state(self, arrays: Dict[str, np.ndarray]) -> None:
+        """Fill the empty buffer with the stacked columns returned by ``to_arrays``.
+
+        Only the newest ``capacity`` rows are kept. The transitions are built
+        over row views of the copied columns instead of going through ``add``.
+        """
+        if self._buffer:
+            raise ValueError("load_state expects an empty ReplayBuffer")
+        count = min(len(arrays["actions"]), self.capacity)
+        rows = slice(len(arrays["actions"]) - count, None)
+        # Copies, so later changes to ``arrays`` do not leak in
+        states = np.array(arrays["states"][rows], dtype=np.float32)
+        next_states = np.array(arrays["next_states"][rows], dtype=np.float32)
+        actions = np.asarray(arrays["actions"][rows], dtype=np.int64).tolist()
+        rewards = np.asarray(arrays["rewards"][rows], dtype=np.float64).tolist()
+        dones = np.asarray(arrays["dones"][rows], dtype=bool).tolist()
+        # The cyclic GC would rescan the young transitions over and over while they are created
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self._buffer.extend(map(Transition, states, actions, rewards, next_states, dones))
+        finally:
+            if gc_enabled:
+                gc.enable()
+        self.total_added = count
+        if self.n_step > 1 and count:
+            self._rewards[:count] = rewards
+            self._dones[:count] = dones
+            self._starts[:count] = episode_starts(states, next_states, self._dones[:count])
+            self._slot = count % self.capacity
+
     def add(
         self,
         state: np.ndarray,
@@ -42,24 +135,89 @@ class ReplayBuffer:
     ) -> None:
         """Append a new transition to the buffer."""
         # Store a normalized snapshot so later mutations of the original arrays do not leak in.
-        self._buffer.append(
-            Transition(
-                state=np.asarray(state, dtype=np.float32),
-                action=int(action),
-                reward=float(reward),
-                next_state=np.asarray(next_state, dtype=np.float32),
-                done=bool(done),
-            )
+        transition = Transition(
+            state=np.asarray(state, dtype=np.float32),
+            action=int(action),
+            reward=float(reward),
+            next_state=np.asarray(next_state, dtype=np.float32),
+            done=bool(done),
         )
+        if self.n_step > 1:
+            previous = self._buffer[-1] if self._buffer else None
+            slot = self._slot
+            self._rewards[slot] = transition.reward
+            self._dones[slot] = transition.done
+            self._starts[slot] = (
+                previous is None or previous.done or not np.array_equal(previous.next_state, transition.state)
+            )
+            self._slot = (slot + 1) % self.capacity
+        self._buffer.append(transition)
+        self.total_added += 1
+
+    def add_batch(
+        self,
+        states: np.ndarray,
+        actions: np.ndarray,
+        rewards: np.ndarray,
+        next_states: np.ndarray,
+        dones: np.ndarray,
+    ) -> None:
+        """Append the rows of stacked columns in order, as ``add`` would one by one."""
+        # Copies, so later changes to the arrays do not leak in
+        states = np.array(states, dtype=np.float32)
+        next_states = np.array(next_states, dtype=np.float32)
+        actions = np.asarray(actions, dtype=np.int64).tolist()
+        rewards = np.asarray(rewards, dtype=np.float64).tolist()
+        dones = np.asarray(dones, dtype=bool).tolist()
+        count = len(actions)
+        if count == 0:
+            return
+        if self.n_step > 1:
+            starts = episode_starts(states, next_states, np.asarray(dones, dtype=np.float32))
+            previous = self._buffer[-1] if self._buffer else None
+            starts[0] = previous is None or previous.done or not np.array_equal(previous.next_state, states[0])
+            slots = (self._slot + np.arange(count)) % self.capacity
+            self._rewards[slots] = rewards
+            self._dones[slots] = dones
+            self._starts[slots] = starts
+            self._slot = (self._slot + count) % self.capacity
+        self._buffer.extend(map(Transition, states, actions, rewards, next_states, dones))
+        self.total_added += count
 
     def sample(self, batch_size: int, device: torch.device) -> Tuple[torch.Tensor, ...]:
-        """Sample a mini-batch and return tensors on the requested device."""
+        """Sample a mini-batch and return tensors on the requested device.
+
+        With ``n_step > 1`` the rewards are n-step returns, ``next_states`` and
+        ``dones`` belong to the last transition of each return, and the
+        bootstrap discounts follow as a sixth tensor.
+        """
         if len(self._buffer) < batch_size:
             raise ValueError("ReplayBuffer has fewer samples than the requested batch_size")
 
         # Draw unique indices to avoid duplicate transitions within the batch.
         indices = np.random.choice(len(self._buffer), size=batch_size, replace=False)
         batch = [self._buffer[idx] for idx in indices]
+        if self.n_step > 1:
+            size = len(self._buffer)
+            returns, last, terminal, discounts = n_step_returns(
+                indices,
+                (self._slot - size) % self.capacity,
+                size,
+                self.capacity,
+                self._rewards,
+                self._dones,
+                self._starts,
+                self.n_step,
+                self.gamma,
+            )
+            return (
+                torch.as_tensor(np.stack([t.state for t in batch], axis=0), device=device),
+                torch.as_tensor([t.action for t in batch], device=device, dtype=torch.long),
+                torch.as_tensor(returns, device=device),
+                torch.as_tensor(np.stack([self._buffer[idx].next_state for idx in last], axis=0), device=device),
+                torch.as_tensor(terminal, device=device),
+                torch.as_tensor(discounts, device=device),
+            )
 
         states = torch.as_tensor(np.stack([t.state for t in batch], axis=0), device=device)
         actions = torch.as_tensor([t.action for t in batch], device=device, dtype=torch.long)
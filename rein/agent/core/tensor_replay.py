@@ -0,0 +1,250 @@
+"""Replay buffer whose columns are preallocated tensors on the agent's device."""
+
+from __future__ import annotations
+
+from typing import Dict, Iterator, Sequence, Tuple
+
+import numpy as np
+import torch
+
+from .n_step import episode_starts, n_step_returns_torch
+from .replay_buffer import Transition
+
+# Column name -> (dtype, per-transition shape is the state shape)
+_COLUMNS: Dict[str, Tuple[torch.dtype, bool]] = {
+    "states": (torch.float32, True),
+    "actions": (torch.int64, False),
+    "rewards": (torch.float32, False),
+    "next_states": (torch.float32, True),
+    "dones": (torch.float32, False),
+}
+
+
+class TensorReplayBuffer:
+    """Fixed-size ring of transitions kept as torch tensors on ``device``.
+
+    ``add`` writes into a host staging block of ``staging`` rows (pinned on
+    CUDA), which is copied to the device columns in one transfer per column
+    when it is full. ``sample`` draws the slots with ``torch.randint`` on the
+    device and gathers the batch there, so an update moves no data between
+    host and device. Transitions become sampleable once their block is
+    flushed, i.e. at most ``staging`` adds later (``sample`` flushes early
+    when the flushed rows are fewer than the batch). On the CPU this is a
+    tensor-backed ring with the same behaviour.
+
+    Slots are drawn with replacement, unlike ``ReplayBuffer``: a batch of
+    64 from tens of thousands of transitions rarely repeats one, and avoiding
+    repeats would take a permutation of the whole buffer. With ``n_step > 1``
+    the n-step returns are computed on the device as well, and stop at the
+    newest flushed row.
+    """
+
+    DEFAULT_STAGING = 256
+
+    def __init__(
+        self,
+        capacity: int,
+        state_shape: Sequence[int],
+        device: torch.device,
+        staging: int = DEFAULT_STAGING,
+        n_step: int = 1,
+        gamma: float = 0.99,
+    ) -> None:
+        self.capacity = int(capacity)
+        self.n_step = int(n_step)
+        self.gamma = float(gamma)
+        if self.n_step < 1:
+            raise ValueError("n_step must be at least 1")
+        self.state_shape = tuple(int(dim) for dim in state_shape)
+        self.device = torch.device(device)
+        self.staging = max(1, min(int(staging), self.capacity))
+        self.total_added = 0  # Transitions added since creation, including the overwritten ones
+
+        self._stored = 0  # Rows on the device
+        self._next = 0  # Device slot written by the next flushed row
+        self._pending = 0  # Rows in the staging block
+        self._columns = {
+            name: torch.zeros((self.capacity, *self._row_shape(name)), dtype=dtype, device=self.device)
+            for name, (dtype, _) in _COLUMNS.items()
+        }
+        pin = self.device.type == "cuda"
+        self._staging = {
+            name: torch.zeros((self.staging, *self._row_shape(name)), dtype=dtype, pin_memory=pin)
+            for name, (dtype, _) in _COLUMNS.items()
+        }
+        # NumPy views of the staging tensors, cheaper to write one row at a time
+        self._staging_views = {name: tensor.numpy() for name, tensor in self._staging.items()}
+        # Rows that do not continue the previous one (n-step returns stop there)
+        self._starts = torch.ones(self.capacity, dtype=torch.bool, device=self.device)
+        self._staging_starts = torch.ones(self.staging, dtype=torch.bool, pin_memory=pin)
+        self._last: Tuple[np.ndarray, bool] | None = None  # next_state and done of the newest row
+
+    def _row_shape(self, name: str) -> Tuple[int, ...]:
+        return self.state_shape if _COLUMNS[name][1] else ()
+
+    def __len__(self) -> int:
+        return min(self._stored + self._pending, self.capacity)
+
+    def __iter__(self) -> Iterator[Transition]:
+        """Yield the stored transitions from the oldest to the newest."""
+        arrays = self.to_arrays()
+        for row in range(len(arrays["actions"])):
+            yield Transition(
+                state=arrays["states"][row],
+                action=int(arrays["actions"][row]),
+                reward=float(arrays["rewards"][row]),
+                next_state=arrays["next_states"][row],
+                done=bool(arrays["dones"][row]),
+            )
+
+    def add(
+        self,
+        state: np.ndarray,
+        action: int,
+        reward: float,
+        next_state: np.ndarray,
+        done: bool,
+    ) -> None:
+        """Append a transition to the staging block, flushing it to the device when full."""
+        row = self._pending
+        state = np.asarray(state, dtype=np.float32).reshape(self.state_shape)
+        if self.n_step > 1:
+            self._staging_starts[row] = (
+                self._last is None or self._last[1] or not np.array_equal(self._last[0], state)
+            )
+            self._last = (np.array(next_state, dtype=np.float32).reshape(self.state_shape), bool(done))
+        self._staging_views["states"][row] = state
+        self._staging_views["actions"][row] = int(action)
+        self._staging_views["rewards"][row] = float(reward)
+        self._staging_views["next_states"][row] = np.asarray(next_state, dtype=np.float32).reshape(self.state_shape)
+        self._staging_views["dones"][row] = float(bool(done))
+        self._pending += 1
+        self.total_added += 1
+        if self._pending == self.staging:
+            self.flush()
+
+    def add_batch(
+        self,
+        states: np.ndarray,
+        actions: np.ndarray,
+        rewards: np.ndarray,
+        next_states: np.ndarray,
+        dones: np.ndarray,
+    ) -> None:
+        """Append the rows of stacked columns to the staging block, in slices up to each flush."""
+        states = np.asarray(states, dtype=np.float32).reshape((-1, *self.state_shape))
+        next_states = np.asarray(next_states, dtype=np.float32).reshape((-1, *self.state_shape))
+        columns = {
+            "states": states,
+            "actions": np.asarray(actions, dtype=np.int64),
+            "rewards": np.asarray(rewards, dtype=np.float32),
+            "next_states": next_states,
+            "dones": np.asarray(dones, dtype=np.float32),
+        }
+        count = len(states)
+        if count == 0:
+            return
+        if self.n_step > 1:
+            starts = episode_starts(states, next_states, columns["dones"])
+            starts[0] = self._last is None or self._last[1] or not np.array_equal(self._last[0], states[0])
+            self._last = (next_states[-1].copy(), bool(columns["dones"][-1]))
+        offset = 0
+        while offset < count:
+            row = self._pending
+            take = min(count - offset, self.staging - row)
+            for name, values in columns.items():
+                self._staging_views[name][row : row + take] = values[offset : offset + take]
+            if self.n_step > 1:
+                self._staging_starts[row : row + take] = torch.from_numpy(starts[offset : offset + take])
+            self._pending += take
+            offset += take
+            if self._pending == self.staging:
+                self.flush()
+        self.total_added += count
+
+    def flush(self) -> None:
+        """Copy the staging block to its device slots (two slices when it wraps around)."""
+        count = self._pending
+        if count == 0:
+            return
+        start = self._next
+        head = min(count, self.capacity - start)
+        for name, column in self._columns.items():
+            # Blocking copies: the staging block is overwritten by the next add()
+            column[start : start + head].copy_(self._staging[name][:head])
+            if head < count:
+                column[: count - head].copy_(self._staging[name][head:count])
+        if self.n_step > 1:
+            self._starts[start : start + head].copy_(self._staging_starts[:head])
+            if head < count:
+                self._starts[: count - head].copy_(self._staging_starts[head:count])
+        self._next = (start + count) % self.capacity
+        self._stored = min(self._stored + count, self.capacity)
+        self._pending = 0
+
+    def sample(self, batch_size: int, device: torch.device) -> Tuple[torch.Tensor, ...]:
+        """Sample a mini-batch on the buffer's device (moved to ``device`` if it differs)."""
+        if len(self) < batch_size:
+            raise ValueError("TensorReplayBuffer has fewer samples than the requested batch_size")
+        if self._stored < batch_size:
+            self.flush()
+        slots = torch.randint(self._stored, (batch_size,), device=self.device)
+        if self.n_step > 1:
+            # Slots count from 0 until the ring is full, so the oldest row is at self._next after that
+            start = self._next if self._stored == self.capacity else 0
+            positions = (slots - start) % self.capacity
+            returns, last, terminal, discounts = n_step_returns_torch(
+                positions,
+                start,
+                self._stored,
+                self.capacity,
+                self._columns["rewards"],
+                self._columns["dones"],
+                self._starts,
+                self.n_step,
+                self.gamma,
+            )
+            batch = (
+                self._columns["states"].index_select(0, slots),
+                self._columns["actions"].index_select(0, slots),
+                returns,
+                self._columns["next_states"].index_select(0, (start + last) % self.capacity),
+                terminal,
+                discounts,
+            )
+        else:
+            batch = tuple(self._columns[name].index_select(0, slots) for name in _COLUMNS)
+        if torch.device(device) != self.device:
+            batch = tuple(tensor.to(device) for tensor in batch)
+        return batch
+
+    def tail_arrays(self, count: int) -> Dict[str, np.ndarray]:
+        """Return the columns of the ``count`` newest transitions, from the oldest to the newest."""
+        self.flush()
+        count = min(int(count), self._stored)
+        slots = torch.as_tensor((self._next - count + np.arange(count)) % self.capacity, device=self.device)
+        return {name: column.index_select(0, slots).cpu().numpy() for name, column in self._columns.items()}
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Return the columns of every stored transition, from the oldest to the newest."""
+        return self.tail_arrays(len(self))
+
+    def load_state(self, arrays: Dict[str, np.ndarray]) -> None:
+        """Fill the empty buffer with stacked columns (``ReplayBuffer.to_arrays``), copied to the device in one go."""
+        if len(self):
+            raise ValueError("load_state expects an empty TensorReplayBuffer")
+        count = min(len(arrays["actions"]), self.capacity)
+        if count == 0:
+            return
+        rows = slice(len(arrays["actions"]) - count, None)
+        for name, column in self._columns.items():
+            values = torch.as_tensor(np.asarray(arrays[name][rows]), dtype=column.dtype)
+            column[:count] = values.reshape((count, *self._row_shape(name))).to(self.device)
+        states = np.asarray(arrays["states"][rows], dtype=np.float32).reshape((count, *self.state_shape))
+        next_states = np.asarray(arrays["next_states"][rows], dtype=np.float32).reshape((count, *self.state_shape))
+        dones = np.asarray(arrays["dones"][rows], dtype=np.float32)
+        self._starts[:count] = torch.as_tensor(episode_starts(states, next_states, dones)).to(self.device)
+        self._last = (next_states[-1].copy(), bool(dones[-1]))
+        self._stored = count
+        self._next = count % self.capacity
+        self.total_added = count
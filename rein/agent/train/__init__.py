@@ -9,6 +9,13 @@ from .train import (
     run_training,
     seed_everything,
 )
+from .actors import actor_epsilons, format_throughput, run_actor_training
+from .ledger import TrainingLedger
+from .memory import MemoryTracker
+from .metrics_server import MetricsServer
+from .profiling import PROFILE_MODES, EpisodeProfiler, parse_episode_range
+from .timing import EpisodeTimer, format_timing_summary
+from .vector import run_vector_training
 from .training_state import (
     TrainingProgress,
     load_training_progress,
@@ -36,6 +43,18 @@ __all__ = [
     "resolve_device",
     "run_training",
     "seed_everything",
+    "actor_epsilons",
+    "format_throughput",
+    "run_actor_training",
+    "run_vector_training",
+    "TrainingLedger",
+    "PROFILE_MODES",
+    "EpisodeProfiler",
+    "MetricsServer",
+    "MemoryTracker",
+    "parse_episode_range",
+    "EpisodeTimer",
+    "format_timing_summary",
     "TrainingProgress",
     "load_training_progress",
     "persist_training_progress",
@@ -0,0 +1,377 @@
+"""Ape-X style training: actor processes feed the replay buffer of a single learner."""
+
+from __future__ import annotations
+
+import math
+import queue
+import random
+import time
+import traceback
+from typing import Any, Dict, List, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from ..core.dqn_agent import DQNAgent
+from ..core.replay_buffer import Transition, stack_transitions
+from ...model import QNetwork
+from .ledger import TrainingLedger
+from .timing import EpisodeTimer, format_timing_summary
+from .train import CHECKPOINT_INTERVAL, build_discrete_actions, make_env, seed_everything
+
+if TYPE_CHECKING:  # pragma: no cover
+    from ...configs import AIConfig
+
+__all__ = ["actor_epsilons", "format_throughput", "run_actor_training"]
+
+
+ACTOR_CHUNK = 32  # Transitions pushed to the learner in one queue message
+QUEUE_CHUNKS_PER_ACTOR = 8  # Queued messages per actor before the actors wait for the learner
+
+
+def actor_epsilons(count: int, base: float = 0.4, alpha: float = 7.0) -> List[float]:
+    """Return the fixed exploration rate of every actor, ``base ** (1 + alpha * i / (count - 1))`` (Ape-X)."""
+    if count <= 1:
+        return [base] * count
+    return [base ** (1.0 + alpha * index / (count - 1)) for index in range(count)]
+
+
+def format_throughput(actors: int, actor_steps: int, updates: int, wall: float, replay_size: int) -> str:
+    """Summarise the actor and learner throughput of a window of ``wall`` seconds."""
+    steps_per_s = actor_steps / wall if wall > 0 else 0.0
+    updates_per_s = updates / wall if wall > 0 else 0.0
+    return (
+        f"    Throughput | {actors} actors: {steps_per_s:.2f} steps/s | "
+        f"learner: {updates_per_s:.2f} updates/s | replay: {replay_size}"
+    )
+
+
+def _put(messages: Any, stop: Any, item: Tuple[Any, ...]) -> bool:
+    """Wait for room in the queue, but give up once the learner asks the actors to stop."""
+    while not stop.is_set():
+        try:
+            messages.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _actor_main(
+    actor_id: int,
+    config: "AIConfig",
+    epsilon: float,
+    first_seed: int,
+    shared_net: QNetwork,
+    weights_lock: Any,
+    weights_version: Any,
+    messages: Any,
+    stop: Any,
+) -> None:
+    """Play episodes with a local copy of the published policy and push their transitions.
+
+    The weights are reloaded from ``shared_net`` whenever the learner bumps
+    ``weights_version``. Transitions are sent as stacked columns every
+    ``ACTOR_CHUNK`` steps and at the end of the episode, followed by an
+    ``"episode"`` message carrying the episode statistics and timings.
+    """
+    # One thread per actor: the actors and the learner already share the cores
+    torch.set_num_threads(1)
+    seed_everything(first_seed)
+    rng = random.Random(first_seed)
+    env = make_env(config)
+    try:
+        apply_growth = env.scenario_library is None or env.scenario_library.spec.growth_hours == 0
+        actions = build_discrete_actions(env.action_space, config.dose_bins, config.wait_bins)
+        state_dim = int(np.prod(env.observation_space.shape))  # type: ignore
+        net = QNetwork(state_dim, len(actions), config.hidden_sizes)
+        net.eval()
+        version = -1
+        timer = EpisodeTimer()
+
+        local_episode = 0
+        while not stop.is_set():
+            timer.reset()
+            with timer.stage("growth"):
+                state, _ = env.reset(seed=first_seed + local_episode * config.actors)
+                if apply_growth:
+                    env.growth(config.growth_hours)
+
+            chunk: List[Transition] = []
+            episode_reward = 0.0
+            steps = 0
+            info: Dict[str, object] = {}
+            for _ in range(config.max_steps):
+                with timer.stage("act"):
+                    if weights_version.value != version:
+                        with weights_lock:
+                            version = weights_version.value
+                            net.load_state_dict(shared_net.state_dict())
+                    if rng.random() < epsilon:
+                        action_idx = rng.randrange(len(actions))
+                    else:
+                        with torch.no_grad():
+                            q_values = net(torch.as_tensor(state, dtype=torch.float32).unsqueeze(0))
+                        action_idx = int(torch.argmax(q_values, dim=1).item())
+
+                with timer.stage("env"):
+                    next_state, reward, terminated, truncated, info = env.step(actions[action_idx])
+                done = terminated or truncated
+
+                chunk.append(Transition(state, action_idx, float(reward), next_state, bool(done)))
+                if len(chunk) == ACTOR_CHUNK:
+                    if not _put(messages, stop, ("transitions", actor_id, stack_transitions(chunk))):
+                        return
+                    chunk = []
+                state = next_state
+                episode_reward += reward
+                steps += 1
+                if done or stop.is_set():
+                    break
+
+            if chunk and not _put(messages, stop, ("transitions", actor_id, stack_transitions(chunk))):
+                return
+            summary = {
+                "reward": episode_reward,
+                "epsilon": epsilon,
+                "elapsed_hours": float(info.get("elapsed_hours", getattr(env, "elapsed_hours", 0))),
+                "total_dose": float(info.get("total_dose", getattr(env, "total_dose", 0.0))),
+                "timeout": bool(info.get("timeout", False)),
+                "successful": bool(info.get("successful", False)),
+                "unsuccessful": bool(info.get("unsuccessful", False)),
+                "steps": steps,
+                "policy_version": version,
+                **timer.metrics(steps),
+            }
+            if not _put(messages, stop, ("episode", actor_id, summary)):
+                return
+            local_episode += 1
+    except KeyboardInterrupt:
+        # The learner saves the pause checkpoint
+        pass
+    except BaseException:
+        _put(messages, stop, ("error", actor_id, traceback.format_exc()))
+    finally:
+        env.close()
+
+
+def _publish_weights(agent: DQNAgent, shared_net: QNetwork, weights_lock: Any, weights_version: Any) -> int:
+    """Copy the learner's policy into the shared weights, bump their version and return it."""
+    with weights_lock:
+        shared_net.load_state_dict(agent.policy_net.state_dict())
+        weights_version.value += 1
+        return weights_version.value
+
+
+def _stop_actors(processes: Sequence[Any], messages: Any, stop: Any) -> None:
+    """Ask the actors to stop and drain the queue until they exit (a blocked feeder would hang ``join``)."""
+    stop.set()
+    deadline = time.monotonic() + 30.0
+    while any(process.is_alive() for process in processes) and time.monotonic() < deadline:
+        try:
+            while True:
+                messages.get_nowait()
+        except queue.Empty:
+            pass
+        for process in processes:
+            process.join(timeout=0.05)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+            process.join()
+
+
+def run_actor_training(config: "AIConfig", device: torch.device) -> None:
+    """Train with ``config.actors`` actor processes and a learner on this process.
+
+    Every actor runs its own ``CellSimEnv`` with a fixed epsilon from
+    ``actor_epsilons`` and acts with a CPU copy of the policy, reloaded from
+    shared memory each time the learner publishes it (every
+    ``actor_sync_interval`` updates). Transitions arrive through a bounded
+    queue and are stored in the learner's replay buffer, in chunks from
+    different actors (n-step returns stop at a chunk boundary when another
+    actor's chunk came in between). The learner only calls
+    ``DQNAgent.update``, at most ``updates_per_step`` times per transition
+    received once the buffer can be sampled; the episodes are logged and checkpointed by a
+    ``TrainingLedger`` in the order they complete. The reward-aware epsilon
+    controller, the profiler, the metrics server and the memory diagnostics
+    are not used in this mode.
+    """
+    num_actors = int(config.actors)
+    seed_everything(config.seed)
+    print(f"Using device: {device} | actors: {num_actors}")
+    for option in ("profile_episodes", "metrics_port"):
+        if getattr(config, option, None) is not None:
+            print(f"{option} is ignored with --actors")
+    if getattr(config, "memory_diagnostics", False):
+        print("memory_diagnostics is ignored with --actors")
+
+    # The learner's environment only gives the spaces and runs the final evaluation
+    env = make_env(config)
+    discrete_actions = build_discrete_actions(env.action_space, config.dose_bins, config.wait_bins)
+    state_dim = int(np.prod(env.observation_space.shape))  # type: ignore
+
+    agent = DQNAgent(state_dim, discrete_actions, device, config)
+    ledger = TrainingLedger(config, agent)
+
+    updates_per_step = float(getattr(config, "updates_per_step", 1.0))
+    if updates_per_step < 0:
+        raise ValueError("updates_per_step must be non-negative")
+    sync_interval = max(1, int(getattr(config, "actor_sync_interval", 100)))
+    timing_summary_interval = int(getattr(config, "timing_summary_interval", 0))
+    report_interval = timing_summary_interval if timing_summary_interval > 0 else CHECKPOINT_INTERVAL
+    epsilons = actor_epsilons(
+        num_actors,
+        float(getattr(config, "actor_epsilon", 0.4)),
+        float(getattr(config, "actor_epsilon_alpha", 7.0)),
+    )
+
+    # Shared CPU copy of the policy, published by the learner and read by the actors
+    context = mp.get_context("spawn")
+    shared_net = QNetwork(state_dim, len(discrete_actions), config.hidden_sizes)
+    shared_net.share_memory()
+    weights_lock = context.Lock()
+    weights_version = context.Value("q", 0)
+    # Learner updates behind every published version, to log the policy lag of the episodes. The actors
+    # only move to newer versions, so the versions older than the last one reported by every actor are dropped
+    first_version = _publish_weights(agent, shared_net, weights_lock, weights_version)
+    published_updates = {first_version: 0}
+    actor_versions = [first_version] * num_actors
+    messages = context.Queue(maxsize=QUEUE_CHUNKS_PER_ACTOR * num_actors)
+    stop = context.Event()
+    processes: List[Any] = []
+
+    update_credit = 0.0
+    updates = 0
+    learn_seconds = 0.0
+    episode_losses: List[float] = []
+    episode_updates = 0
+    window_start = time.perf_counter()
+    window_steps = 0
+    window_updates = 0
+    run_start = window_start
+    run_steps = 0
+
+    try:
+        if not ledger.done:
+            for actor_id, epsilon in enumerate(epsilons):
+                process = context.Process(
+                    target=_actor_main,
+                    args=(
+                        actor_id,
+                        config,
+                        epsilon,
+                        config.seed + ledger.next_episode + actor_id,
+                        shared_net,
+                        weights_lock,
+                        weights_version,
+                        messages,
+                        stop,
+                    ),
+                    name=f"cellsim-actor-{actor_id}",
+                    daemon=True,
+                )
+                process.start()
+                processes.append(process)
+
+        while not ledger.done:
+            due = update_credit >= 1.0 and agent.can_update()
+            try:
+                message = messages.get(block=not due, timeout=None if due else 1.0)
+            except queue.Empty:
+                message = None
+                if not due:
+                    dead = [process.name for process in processes if not process.is_alive()]
+                    if dead:
+                        raise RuntimeError(f"Actor processes exited unexpectedly: {', '.join(dead)}")
+
+            if message is not None:
+                kind, actor_id, payload = message
+                if kind == "error":
+                    raise RuntimeError(f"Actor {actor_id} failed:\n{payload}")
+                if kind == "transitions":
+                    start = time.perf_counter()
+                    agent.store_transitions(
+                        payload["states"],
+                        payload["actions"],
+                        payload["rewards"],
+                        payload["next_states"],
+                        payload["dones"],
+                    )
+                    learn_seconds += time.perf_counter() - start
+                    count = len(payload["actions"])
+                    ledger.total_steps += count
+                    window_steps += count
+                    run_steps += count
+                    update_credit += updates_per_step * count
+                    if not agent.can_update():
+                        # As update_many() in the serial loop, the updates due while the buffer warms up are dropped
+                        update_credit = 0.0
+                elif kind == "episode":
+                    # Rewards and environment timings from the actor, losses, updates and learn time from the learner
+                    entry = {
+                        "reward": payload["reward"],
+                        "epsilon_start": payload["epsilon"],
+                        "epsilon_end": payload["epsilon"],
+                        "mean_loss": float(np.mean(episode_losses)) if episode_losses else math.nan,
+                        "elapsed_hours": payload["elapsed_hours"],
+                        "timeout": payload["timeout"],
+                        "successful": payload["successful"],
+                        "unsuccessful": payload["unsuccessful"],
+                        "total_dose": payload["total_dose"],
+                        "steps": payload["steps"],
+                        "updates": episode_updates,
+                        "policy_lag": updates - published_updates.get(payload["policy_version"], 0),
+                        **{key: value for key, value in payload.items() if key.endswith("_s")},
+                        "learn_s": learn_seconds,
+                    }
+                    episode = ledger.record(
+                        entry, f"actor: {actor_id:02d}", f" | policy lag: {entry['policy_lag']}"
+                    )
+                    actor_versions[actor_id] = max(actor_versions[actor_id], payload["policy_version"])
+                    oldest = min(actor_versions)
+                    published_updates = {
+                        version: behind for version, behind in published_updates.items() if version >= oldest
+                    }
+                    if episode % report_interval == 0:
+                        now = time.perf_counter()
+                        if timing_summary_interval > 0:
+                            print(format_timing_summary(ledger.episode_metrics[-timing_summary_interval:]))
+                        print(
+                            format_throughput(
+                                num_actors, window_steps, window_updates, now - window_start, len(agent.replay_buffer)
+                            )
+                        )
+                        window_start, window_steps, window_updates = now, 0, 0
+                    episode_losses = []
+                    episode_updates = 0
+                    learn_seconds = 0.0
+
+            if due:
+                start = time.perf_counter()
+                loss = agent.update()
+                learn_seconds += time.perf_counter() - start
+                update_credit -= 1.0
+                if loss is not None:
+                    ledger.losses.append(loss)
+                    episode_losses.append(loss)
+                    episode_updates += 1
+                    updates += 1
+                    window_updates += 1
+                    if updates % sync_interval == 0:
+                        published_updates[_publish_weights(agent, shared_net, weights_lock, weights_version)] = updates
+
+        _stop_actors(processes, messages, stop)
+        if processes:
+            wall = time.perf_counter() - run_start
+            print("Actor/learner run " + format_throughput(num_actors, run_steps, updates, wall, len(agent.replay_buffer)).strip())
+        ledger.finish(env)
+
+    except KeyboardInterrupt:
+        _stop_actors(processes, messages, stop)
+        ledger.pause()
+    finally:
+        _stop_actors(processes, messages, stop)
+        agent.stop_prefetching()
+        env.close()
@@ -0,0 +1,218 @@
+"""Checkpoints and episode log of the training loops that run several episodes at once."""
+
+from __future__ import annotations
+
+import math
+import time
+from pathlib import Path
+from typing import List, Optional, TYPE_CHECKING
+
+import numpy as np
+
+from .save_io import (
+    append_episode_metrics,
+    checkpoint_path_for_episode,
+    final_checkpoint_path,
+    replay_checkpoint_kwargs,
+    save_replay_buffer_checkpoint,
+    save_training_config,
+)
+from .train import CHECKPOINT_INTERVAL, METRICS_LOG_NAME, evaluate_policy, generate_training_plots
+from .training_state import (
+    load_training_progress,
+    persist_training_progress,
+    save_paused_progress,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    from ..core.dqn_agent import DQNAgent
+    from ...configs import AIConfig
+    from ...env import CellSimEnv
+
+__all__ = ["TrainingLedger"]
+
+
+class TrainingLedger:
+    """Restored progress, checkpoints and ``training_log.csv`` of a multi-episode training loop.
+
+    The actor/learner and vector-env loops complete episodes in an order
+    that does not follow their start, so episodes are numbered as they are
+    ``record``-ed. Every record is logged, printed and checkpointed like an
+    episode of ``run_training`` (every ``CHECKPOINT_INTERVAL`` episodes and
+    at the last one, through ``persist_training_progress``), so the runs
+    resume the same way. The loop owns ``total_steps`` and ``losses`` and
+    keeps them up to date.
+    """
+
+    def __init__(self, config: "AIConfig", agent: "DQNAgent") -> None:
+        self.config = config
+        self.agent = agent
+        self.checkpoint_base_path = config.save_agent_path / "checkpoints" / "agent" / "agent_checkpoint.pt"
+        self.buffer_base_path = config.save_agent_path / "checkpoints" / "replay_buffer" / "replay_buffer_checkpoint.pt"
+        self.agent_final_path = final_checkpoint_path(self.checkpoint_base_path, "agent_final")
+        self.buffer_final_path = final_checkpoint_path(self.buffer_base_path, "replay_buffer_final")
+        self.replay_checkpoint_options = replay_checkpoint_kwargs(config)
+        self.use_reward_aware = bool(getattr(config, "reward_aware_activator", False))
+
+        save_training_config(config, config.save_agent_path)
+        self.checkpoint_base_path.parent.mkdir(parents=True, exist_ok=True)
+        self.buffer_base_path.parent.mkdir(parents=True, exist_ok=True)
+
+        progress = load_training_progress(config, agent)
+        self.total_steps = progress.total_steps
+        self.episode_rewards: List[float] = progress.episode_rewards if progress.episode_rewards is not None else []
+        self.losses: List[float] = progress.losses if progress.losses is not None else []
+        self.episode_metrics: List[dict] = progress.episode_metrics if progress.episode_metrics is not None else []
+        if getattr(config, "resume", False):
+            self.metrics_log_path = progress.metrics_path or (config.save_agent_path / METRICS_LOG_NAME)
+        else:
+            self.metrics_log_path = config.save_agent_path / METRICS_LOG_NAME
+            if self.metrics_log_path.exists():
+                self.metrics_log_path.unlink()
+        self.metrics_path: Optional[Path] = self.metrics_log_path if self.metrics_log_path.exists() else None
+        self.last_checkpoint_path = progress.last_checkpoint_path
+        self.last_buffer_path = progress.last_buffer_path
+        self.next_episode = progress.start_episode
+        # Time spent writing the last row and its checkpoint, logged in the io_s of the next episode
+        self.carried_io_s = 0.0
+
+    @property
+    def done(self) -> bool:
+        """True once every configured episode has been recorded."""
+        return self.next_episode > self.config.episodes
+
+    def record(self, entry: dict, label: str, suffix: str = "") -> int:
+        """Log a completed episode under the next episode number and return that number.
+
+        ``entry`` holds the ``training_log.csv`` columns but ``episode`` and
+        ``learning_rate``. The row is appended before a checkpoint persists
+        the training progress, so the time of that append and checkpoint is
+        added to the ``io_s`` of the next recorded episode.
+        ``label`` and ``suffix`` frame the printed line (e.g. the actor or
+        env that played the episode).
+        """
+        episode = self.next_episode
+        self.episode_rewards.append(entry["reward"])
+        avg_reward = float(np.mean(self.episode_rewards[-10:]))
+        avg_loss = np.mean(self.losses[-10:]) if self.losses else math.nan
+        # Adapt the optimizer learning rate only when reward-aware scheduling is enabled.
+        current_lr = float(self.agent.optimizer.param_groups[0]["lr"])
+        if self.use_reward_aware:
+            current_lr = self.agent.step_reward_scheduler(avg_reward)
+        entry = {"episode": episode, **entry, "learning_rate": current_lr}
+        entry["io_s"] = float(entry.get("io_s") or 0.0) + self.carried_io_s
+        self.episode_metrics.append(entry)
+
+        info_str = "success" if entry["successful"] else "timeout" if entry["timeout"] else "failure"
+        print(
+            f"Episode {episode:04d} | {label} | steps: {self.total_steps:06d} | ep_steps: {entry['steps']:04d} | "
+            f"updates: {entry['updates']:03d} | reward: {entry['reward']:.3f} | avg10 reward: {avg_reward:.3f} | "
+            f"avg10 loss: {avg_loss:.5f} | lr: {current_lr:.6f} | eps: {entry['epsilon_end']:.3f} | "
+            f"elapsed_h: {entry['elapsed_hours']:04.0f} | dose: {entry['total_dose']:.2f} | {info_str}{suffix}"
+        )
+
+        start = time.perf_counter()
+        self.metrics_path = append_episode_metrics(self.metrics_log_path, (entry,))
+        if (episode % CHECKPOINT_INTERVAL == 0) or episode == self.config.episodes:
+            self._save_checkpoint(episode)
+        self.carried_io_s = time.perf_counter() - start
+        self.next_episode += 1
+        return episode
+
+    def _save_checkpoint(self, episode: int) -> None:
+        is_final_episode = episode == self.config.episodes
+        checkpoint_path = (
+            self.agent_final_path
+            if is_final_episode
+            else checkpoint_path_for_episode(self.checkpoint_base_path, episode)
+        )
+        checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        self.agent.save(str(checkpoint_path))
+        self.agent.stop_prefetching()
+        buffer_path = save_replay_buffer_checkpoint(
+            self.buffer_base_path,
+            self.agent.replay_buffer,
+            episode,
+            final_path=self.buffer_final_path if is_final_episode else None,
+            **self.replay_checkpoint_options,
+        )
+        if self.metrics_path is None:
+            self.metrics_path = self.metrics_log_path
+        self.last_checkpoint_path = checkpoint_path
+        self.last_buffer_path = buffer_path
+        self._persist(episode + 1, checkpoint_path, buffer_path, "running")
+        print(
+            "Checkpoint saved at episode "
+            f"{episode} -> model: {checkpoint_path}, buffer: {buffer_path}, metrics log: {self.metrics_log_path}"
+        )
+
+    def _persist(self, next_episode: int, checkpoint_path: Path, buffer_path: Path, status: str) -> None:
+        persist_training_progress(
+            self.config,
+            next_episode,
+            self.total_steps,
+            self.episode_rewards,
+            self.losses,
+            self.episode_metrics,
+            checkpoint_path,
+            buffer_path,
+            self.metrics_path,
+            status,
+        )
+
+    def finish(self, env: "CellSimEnv") -> None:
+        """Save the final checkpoint if none was written, evaluate on ``env``, plot and mark the run completed."""
+        if self.metrics_path is None:
+            checkpoint_path = self.agent_final_path
+            checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+            self.agent.save(str(checkpoint_path))
+            self.agent.stop_prefetching()
+            buffer_path = save_replay_buffer_checkpoint(
+                self.buffer_base_path,
+                self.agent.replay_buffer,
+                max(self.config.episodes, 0),
+                final_path=self.buffer_final_path,
+                **self.replay_checkpoint_options,
+            )
+            if self.episode_metrics:
+                self.metrics_path = append_episode_metrics(self.metrics_log_path, self.episode_metrics)
+            else:
+                self.metrics_path = self.metrics_log_path if self.metrics_log_path.exists() else None
+            self.last_checkpoint_path = checkpoint_path
+            self.last_buffer_path = buffer_path
+            self._persist(self.config.episodes + 1, checkpoint_path, buffer_path, "running")
+            print(f"Model saved to {checkpoint_path}")
+            print(f"Replay buffer saved to {buffer_path}")
+
+        if self.config.eval_episodes > 0:
+            mean_reward, success_rate = evaluate_policy(self.agent, env, self.config.eval_episodes, self.config.max_steps)
+            print(f"Final evaluation -> mean reward: {mean_reward:.3f}, success rate: {success_rate:.2%}")
+
+        if self.metrics_path is not None:
+            try:
+                generate_training_plots(self.metrics_path)
+            except Exception as plot_error:  # pragma: no cover - best-effort plotting
+                print(f"Failed to generate training plots: {plot_error}")
+
+        if self.last_checkpoint_path is not None and self.last_buffer_path is not None:
+            self._persist(self.config.episodes + 1, self.last_checkpoint_path, self.last_buffer_path, "completed")
+
+    def pause(self) -> None:
+        """Save the pause checkpoint; the episodes still running are replayed on resume."""
+        print("\nTraining interrupted by user. Saving pause checkpoint...")
+        checkpoint_path, buffer_path = save_paused_progress(
+            self.config,
+            self.agent,
+            self.buffer_base_path,
+            final_checkpoint_path(self.checkpoint_base_path, "agent_paused"),
+            final_checkpoint_path(self.buffer_base_path, "replay_buffer_paused"),
+            self.next_episode,
+            self.total_steps,
+            self.episode_rewards,
+            self.losses,
+            self.episode_metrics,
+            self.metrics_path,
+        )
+        self.last_checkpoint_path = checkpoint_path
+        self.last_buffer_path = buffer_path
+        print(f"Training paused at episode {self.next_episode}. Checkpoints saved to {checkpoint_path}")
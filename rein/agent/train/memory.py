@@ -0,0 +1,138 @@
+"""Per-episode memory sampling and growth detection for long training runs."""
+
+from __future__ import annotations
+
+import csv
+import tracemalloc
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+from .metrics_server import _resident_bytes
+
+__all__ = ["MEMORY_FIELDNAMES", "MemoryTracker"]
+
+
+# Series checked for a steady growth, all in MiB
+_WATCHED = ("rss_mb", "python_heap_mb", "sim_mb")
+
+MEMORY_FIELDNAMES: List[str] = [
+    "episode",
+    "rss_mb",
+    "python_heap_mb",
+    "python_heap_peak_mb",
+    "sim_live_cells",
+    "sim_live_nodes",
+    "sim_mb",
+    "replay_size",
+    "losses_len",
+    "episode_metrics_len",
+    "flagged",
+    "top_allocations",
+]
+
+
+def _short_location(filename: str, lineno: int) -> str:
+    parts = Path(filename).parts
+    return f"{'/'.join(parts[-2:])}:{lineno}"
+
+
+class MemoryTracker:
+    """Sample the memory of the training process once per episode.
+
+    Every sample records the resident memory, the Python heap traced by
+    ``tracemalloc`` (total, peak and the ``top_n`` allocation sites), the
+    simulator objects alive in the whole process (``Controller.stats()``:
+    cells and list nodes, with their estimated size) and the length of the
+    containers that grow with the run. A series among ``rss_mb``,
+    ``python_heap_mb`` and ``sim_mb`` is flagged when, over the last
+    ``window`` episodes, it never decreased in at least 90% of the episodes
+    and grew by more than ``threshold_mb``. The samples are appended to a CSV
+    file, and flagged series are printed.
+
+    ``tracemalloc`` slows the Python allocations down, so this is a diagnostic
+    mode rather than something to leave enabled.
+    """
+
+    def __init__(self, log_path: Path, window: int = 20, threshold_mb: float = 32.0, top_n: int = 5) -> None:
+        if window < 2:
+            raise ValueError("window must be at least 2 episodes")
+        self.log_path = Path(log_path)
+        self.window = int(window)
+        self.threshold_mb = float(threshold_mb)
+        self.top_n = int(top_n)
+        self._history: Dict[str, Deque[float]] = {name: deque(maxlen=self.window) for name in _WATCHED}
+        self._started_tracing = False
+
+    def start(self) -> "MemoryTracker":
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def close(self) -> None:
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _growing(self, name: str) -> bool:
+        values = list(self._history[name])
+        if len(values) < self.window:
+            return False
+        steps = [later >= earlier for earlier, later in zip(values, values[1:])]
+        return sum(steps) >= 0.9 * len(steps) and values[-1] - values[0] > self.threshold_mb
+
+    def sample(self, episode: int, env: Any, agent: Any, **lengths: int) -> List[str]:
+        """Record one episode and return the names of the series flagged as growing.
+
+        ``lengths`` are the sizes of the run's growing containers
+        (``losses_len``, ``episode_metrics_len``).
+        """
+        row: Dict[str, Any] = {"episode": episode, "rss_mb": _resident_bytes() / 2**20}
+
+        current, peak = tracemalloc.get_traced_memory()
+        row["python_heap_mb"] = current / 2**20
+        row["python_heap_peak_mb"] = peak / 2**20
+        tracemalloc.reset_peak()
+        if self.top_n > 0:
+            # Leave out the bookkeeping of tracemalloc itself
+            snapshot = tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+            top = snapshot.statistics("lineno")[: self.top_n]
+            row["top_allocations"] = " | ".join(
+                f"{_short_location(stat.traceback[0].filename, stat.traceback[0].lineno)}={stat.size / 1024:.0f}KiB"
+                for stat in top
+            )
+
+        ctrl = getattr(env, "ctrl", None)
+        stats: Optional[Dict[str, Any]] = ctrl.stats() if hasattr(ctrl, "stats") else None
+        if stats is not None:
+            row["sim_live_cells"] = stats["live_cells"]
+            row["sim_live_nodes"] = stats["live_nodes"]
+            row["sim_mb"] = (stats["cell_bytes"] + stats["node_bytes"]) / 2**20
+        row["replay_size"] = len(agent.replay_buffer)
+        row.update(lengths)
+
+        flagged = []
+        for name in _WATCHED:
+            if name in row:
+                self._history[name].append(float(row[name]))
+                if self._growing(name):
+                    flagged.append(name)
+        row["flagged"] = " ".join(flagged)
+        self._append(row)
+
+        if flagged:
+            growth = ", ".join(
+                f"{name} +{self._history[name][-1] - self._history[name][0]:.1f} MiB" for name in flagged
+            )
+            print(f"    Memory growth over the last {self.window} episodes: {growth} (see {self.log_path})")
+        return flagged
+
+    def _append(self, row: Dict[str, Any]) -> None:
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        file_exists = self.log_path.exists() and self.log_path.stat().st_size > 0
+        with self.log_path.open("a", newline="") as fp:
+            writer = csv.DictWriter(fp, fieldnames=MEMORY_FIELDNAMES)
+            if not file_exists:
+                writer.writeheader()
+            writer.writerow({field: row.get(field) for field in MEMORY_FIELDNAMES})
@@ -0,0 +1,121 @@
+"""Prometheus text-format endpoint exposing the state of a live training run."""
+
+from __future__ import annotations
+
+import resource
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+__all__ = ["TRAINING_METRICS", "MetricsServer"]
+
+
+# Exposed metrics: name -> (Prometheus type, help)
+TRAINING_METRICS: Dict[str, Tuple[str, str]] = {
+    "cellsim_episodes_total": ("counter", "Completed training episodes"),
+    "cellsim_env_steps_total": ("counter", "Environment steps taken"),
+    "cellsim_updates_total": ("counter", "Gradient updates of the agent"),
+    "cellsim_env_steps_per_second": ("gauge", "Environment steps per wall-clock second over the last episode"),
+    "cellsim_updates_per_second": ("gauge", "Gradient updates per wall-clock second over the last episode"),
+    "cellsim_replay_size": ("gauge", "Transitions stored in the replay buffer"),
+    "cellsim_replay_capacity": ("gauge", "Capacity of the replay buffer"),
+    "cellsim_replay_fill_ratio": ("gauge", "Replay buffer size over its capacity"),
+    "cellsim_epsilon": ("gauge", "Current exploration rate"),
+    "cellsim_learning_rate": ("gauge", "Current optimizer learning rate"),
+    "cellsim_last_loss": ("gauge", "TD loss of the last update"),
+    "cellsim_episode_reward": ("gauge", "Reward of the last episode"),
+    "cellsim_success_rate": ("gauge", "Share of successful episodes among the last 100"),
+    "cellsim_train_stage_seconds_total": ("counter", "Wall-clock time of the training loop per stage"),
+    "cellsim_sim_phase_seconds_total": ("counter", "Time spent by the simulator per phase (Controller.stats())"),
+    "process_resident_memory_bytes": ("gauge", "Resident memory size in bytes"),
+}
+
+
+def _resident_bytes() -> int:
+    """Current resident set size, read when scraped (peak RSS where /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as fp:
+            return int(fp.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _format_value(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class MetricsServer:
+    """Serve ``TRAINING_METRICS`` on ``http://<host>:<port>/metrics`` from a daemon thread.
+
+    The training thread only stores numbers in a dictionary (``set``/``inc``):
+    it never waits on the HTTP thread, which renders a copy of the samples
+    when it is scraped. Port ``0`` binds a free port (see ``port``).
+    """
+
+    def __init__(self, port: int, host: str = "127.0.0.1") -> None:
+        self._samples: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802 - http.server API
+                if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = server.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:  # Keep the training output clean
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, int(port)), Handler)
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return int(self._httpd.server_address[1])
+
+    def start(self) -> "MetricsServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        """Set a sample (a single dictionary store, safe while the server renders)."""
+        self._samples[(name, tuple(sorted(labels.items())))] = float(value)
+
+    def inc(self, name: str, amount: float, **labels: str) -> None:
+        """Add to a counter. Only the training thread writes, so the read-modify-write is not shared."""
+        key = (name, tuple(sorted(labels.items())))
+        self._samples[key] = self._samples.get(key, 0.0) + float(amount)
+
+    def render(self) -> str:
+        """Return the samples in the Prometheus text exposition format."""
+        samples = dict(self._samples)  # Atomic copy under the GIL
+        samples[("process_resident_memory_bytes", ())] = float(_resident_bytes())
+        lines = []
+        for name, (kind, help_text) in TRAINING_METRICS.items():
+            rows = sorted((labels, value) for (sample, labels), value in samples.items() if sample == name)
+            if not rows:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in rows:
+                label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+                lines.append(f"{name}{{{label_text}}} {_format_value(value)}" if labels else f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
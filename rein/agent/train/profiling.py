@@ -0,0 +1,139 @@
+"""On-demand profiling of a window of training episodes."""
+
+from __future__ import annotations
+
+import cProfile
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, ContextManager, Optional, Tuple
+
+import torch
+
+__all__ = ["PROFILE_MODES", "parse_episode_range", "EpisodeProfiler"]
+
+
+PROFILE_MODES = ("cprofile", "torch")
+
+
+def parse_episode_range(value: str) -> Tuple[int, int]:
+    """Parse ``"50-55"`` (inclusive) or ``"50"`` into a ``(first, last)`` episode pair."""
+    first, _, last = value.partition("-")
+    try:
+        bounds = (int(first), int(last or first))
+    except ValueError:
+        raise ValueError(f"Invalid episode range {value!r}, expected FIRST-LAST (e.g. 50-55)") from None
+    if bounds[0] < 1 or bounds[1] < bounds[0]:
+        raise ValueError(f"Invalid episode range {value!r}, expected 1 <= FIRST <= LAST")
+    return bounds
+
+
+class _LabelledController:
+    """Proxy of a simulator controller that labels every method call in the torch profiler trace.
+
+    The native calls (``go``, ``irradiate``, ``set_grid``...) then appear as
+    ``cell_sim.<method>`` ranges instead of being folded into their Python caller.
+    ``__class__`` is the one of the controller, so ``isinstance`` checks on
+    ``env.ctrl`` behave as without profiling.
+    """
+
+    def __init__(self, ctrl: Any) -> None:
+        object.__setattr__(self, "_ctrl", ctrl)
+
+    @property  # type: ignore[misc]
+    def __class__(self) -> type:
+        return type(self._ctrl)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._ctrl, name)
+        if not callable(attr):
+            return attr
+
+        def labelled(*args, **kwargs):
+            with torch.profiler.record_function(f"cell_sim.{name}"):
+                return attr(*args, **kwargs)
+
+        return labelled
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._ctrl, name, value)
+
+
+class EpisodeProfiler:
+    """Profile the episodes ``first`` to ``last`` (inclusive) of a training run.
+
+    With ``mode="cprofile"`` the window is written as a ``.prof`` file (open it
+    with ``pstats`` or snakeviz), the simulator bindings are reported as
+    ``rein.cell_sim.<method>`` built-ins. With ``mode="torch"`` it runs under
+    ``torch.profiler`` and is exported as a Chrome trace (``chrome://tracing``
+    or Perfetto), the training stages are labelled ``train.<stage>`` and the
+    controller calls ``cell_sim.<method>``.
+    """
+
+    def __init__(self, episodes: Tuple[int, int], mode: str, output_dir: Path, device: torch.device) -> None:
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}, expected one of {PROFILE_MODES}")
+        self.first, self.last = int(episodes[0]), int(episodes[1])
+        self.mode = mode
+        self.output_dir = Path(output_dir)
+        self.device = device
+        self._profiler: Any = None
+        self._env: Any = None
+
+    @property
+    def active(self) -> bool:
+        return self._profiler is not None
+
+    @property
+    def output_path(self) -> Path:
+        suffix = ".prof" if self.mode == "cprofile" else ".json"
+        return self.output_dir / f"profile_ep{self.first}-{self.last}_{self.mode}{suffix}"
+
+    def label(self, name: str) -> ContextManager:
+        """Label a block in the torch trace (no-op outside a torch window)."""
+        if self.active and self.mode == "torch":
+            return torch.profiler.record_function(name)
+        return nullcontext()
+
+    def begin_episode(self, episode: int, env: Any) -> None:
+        """Start profiling when ``episode`` opens the window."""
+        if self.active or not self.first <= episode <= self.last:
+            return
+        if self.mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if self.device.type == "cuda":
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self._profiler = torch.profiler.profile(activities=activities)
+            self._profiler.__enter__()
+            if getattr(env, "ctrl", None) is not None:
+                self._env = env
+                env.ctrl = _LabelledController(env.ctrl)
+        print(f"Profiling episodes {episode}-{self.last} ({self.mode})")
+
+    def end_episode(self, episode: int) -> Optional[Path]:
+        """Stop and write the profile after the last episode of the window."""
+        if self.active and episode >= self.last:
+            return self.close()
+        return None
+
+    def close(self) -> Optional[Path]:
+        """Stop an open window (also on interruption) and write its profile."""
+        if not self.active:
+            return None
+        profiler, self._profiler = self._profiler, None
+        if self._env is not None:
+            self._env.ctrl = object.__getattribute__(self._env.ctrl, "_ctrl")
+            self._env = None
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_path
+        if self.mode == "cprofile":
+            profiler.disable()
+            profiler.dump_stats(str(path))
+        else:
+            profiler.__exit__(None, None, None)
+            profiler.export_chrome_trace(str(path))
+        print(f"Profile saved to {path}")
+        return path
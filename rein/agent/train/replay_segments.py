@@ -0,0 +1,172 @@
+"""Append-only replay buffer checkpoints: column segments described by a manifest."""
+
+from __future__ import annotations
+
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from weakref import WeakKeyDictionary
+
+import numpy as np
+
+__all__ = [
+    "SEGMENTS_DIR_NAME",
+    "MANIFEST_NAME",
+    "save_replay_segments",
+    "load_replay_segments",
+    "compact_replay_segments",
+]
+
+
+SEGMENTS_DIR_NAME = "segments"
+MANIFEST_NAME = "manifest.json"
+DEFAULT_MAX_SEGMENTS = 64
+
+_COLUMN_NAMES = ("states", "actions", "rewards", "next_states", "dones")
+
+# Buffer -> id of the segment run it was saved to or restored from
+_runs: "WeakKeyDictionary[Any, str]" = WeakKeyDictionary()
+
+
+def _read_manifest(directory: Path) -> Optional[Dict[str, Any]]:
+    path = directory / MANIFEST_NAME
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def _write_manifest(directory: Path, manifest: Dict[str, Any]) -> None:
+    """Replace the manifest atomically, so a crash leaves the previous one in place."""
+    tmp_path = directory / f"{MANIFEST_NAME}.tmp"
+    tmp_path.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp_path, directory / MANIFEST_NAME)
+
+
+def _write_segment(directory: Path, run_id: str, start: int, end: int, columns: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    name = f"segment_{run_id[:8]}_{start:012d}_{end:012d}.npz"
+    with (directory / name).open("wb") as fp:
+        np.savez(fp, **columns)
+    return {"file": name, "start": start, "end": end}
+
+
+def _read_range(directory: Path, segments: List[Dict[str, Any]], start: int, end: int) -> Dict[str, np.ndarray]:
+    """Concatenate the columns of the transitions ``[start, end)`` (ids counted since the run began)."""
+    parts: Dict[str, List[np.ndarray]] = {name: [] for name in _COLUMN_NAMES}
+    covered = start
+    for segment in sorted(segments, key=lambda entry: entry["start"]):
+        if segment["end"] <= covered or segment["start"] >= end:
+            continue
+        if segment["start"] > covered:
+            break
+        path = directory / segment["file"]
+        if not path.exists():
+            raise FileNotFoundError(f"Replay segment {path} listed in the manifest is missing")
+        lo, hi = covered - segment["start"], min(end, segment["end"]) - segment["start"]
+        with np.load(path) as data:
+            for name in _COLUMN_NAMES:
+                parts[name].append(data[name][lo:hi])
+        covered = segment["start"] + hi
+    if covered < end:
+        raise FileNotFoundError(f"Replay segments in {directory} do not cover transitions {covered}-{end}")
+    return {name: np.concatenate(chunks) for name, chunks in parts.items()} if end > start else {}
+
+
+def compact_replay_segments(
+    directory: Path,
+    manifest: Optional[Dict[str, Any]] = None,
+    max_segments: int = DEFAULT_MAX_SEGMENTS,
+) -> Dict[str, Any]:
+    """Drop the segments overwritten by the ring and merge the rest when they are too many.
+
+    Segments entirely before ``valid_start`` are removed; the live ones are
+    rewritten as a single segment when there are more than ``max_segments``
+    of them or when they store more overwritten than live transitions. The
+    manifest is written before unreferenced segment files are deleted.
+    Returns the updated manifest.
+    """
+    directory = Path(directory)
+    if manifest is None:
+        manifest = _read_manifest(directory)
+        if manifest is None:
+            raise FileNotFoundError(f"No replay segment manifest in {directory}")
+    start, end = manifest["valid_start"], manifest["head"]
+    live = [segment for segment in manifest["segments"] if segment["end"] > start and segment["start"] < end]
+
+    stored = sum(segment["end"] - segment["start"] for segment in live)
+    if len(live) > 1 and (len(live) > max_segments or stored - (end - start) > end - start):
+        live = [_write_segment(directory, manifest["run_id"], start, end, _read_range(directory, live, start, end))]
+
+    manifest = {**manifest, "segments": live}
+    _write_manifest(directory, manifest)
+    referenced = {segment["file"] for segment in live}
+    for path in directory.glob("segment_*.npz"):
+        if path.name not in referenced:
+            path.unlink()
+    return manifest
+
+
+def save_replay_segments(
+    directory: Path,
+    buffer: Any,
+    max_segments: int = DEFAULT_MAX_SEGMENTS,
+) -> Dict[str, Any]:
+    """Write the transitions added to ``buffer`` since its last save as a new segment.
+
+    Transitions are identified by their position in the stream of ``add``
+    calls (``buffer.total_added`` is the ring head), so the buffer holds
+    ``[valid_start, head)`` and a segment covers ``[start, end)``. A buffer
+    that does not continue the segments in ``directory`` (new run, resumed
+    from an older checkpoint, different capacity) starts a new segment run
+    holding its whole content. Returns the manifest, which the checkpoint
+    payload stores.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    head = int(buffer.total_added)
+    valid_start = head - len(buffer)
+
+    manifest = _read_manifest(directory)
+    if (
+        manifest is None
+        or manifest["run_id"] != _runs.get(buffer)
+        or manifest["capacity"] != buffer.capacity
+        or manifest["head"] > head
+    ):
+        manifest = {"run_id": uuid.uuid4().hex, "capacity": buffer.capacity, "head": valid_start, "segments": []}
+        _runs[buffer] = manifest["run_id"]
+
+    start = max(int(manifest["head"]), valid_start)
+    segments = list(manifest["segments"])
+    if head > start:
+        segments.append(_write_segment(directory, manifest["run_id"], start, head, buffer.tail_arrays(head - start)))
+    manifest = {**manifest, "head": head, "valid_start": valid_start, "length": len(buffer), "segments": segments}
+    return compact_replay_segments(directory, manifest, max_segments=max_segments)
+
+
+def load_replay_segments(directory: Path, manifest: Dict[str, Any], buffer: Any) -> Any:
+    """Fill the empty ``buffer`` with the transitions ``[valid_start, head)`` of a checkpoint manifest.
+
+    The segments are read from the manifest in ``directory`` when it belongs
+    to the same run and still covers that range (a later save may have merged
+    the files listed by the checkpoint), otherwise from the checkpoint's own
+    manifest. Only the latest checkpoint of a run is guaranteed to load: the
+    segments of older ones may have been pruned.
+    """
+    directory = Path(directory)
+    start, end = int(manifest["valid_start"]), int(manifest["head"])
+    current = _read_manifest(directory)
+    columns: Optional[Dict[str, np.ndarray]] = None
+    if current is not None and current["run_id"] == manifest["run_id"]:
+        try:
+            columns = _read_range(directory, current["segments"], start, end)
+        except FileNotFoundError:
+            columns = None
+    if columns is None:
+        columns = _read_range(directory, manifest["segments"], start, end)
+    if end > start:
+        buffer.load_state(columns)
+    buffer.total_added = end
+    _runs[buffer] = manifest["run_id"]
+    return buffer
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import csv
 import json
+import os
 import random
 from dataclasses import asdict
 from pathlib import Path
@@ -12,7 +13,10 @@ from typing import Any, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
 import numpy as np
 import torch
 
-from ..core.replay_buffer import ReplayBuffer
+from ..core.memmap_replay import MemmapReplayBuffer
+from ..core.replay_buffer import ReplayBuffer, Transition, stack_transitions
+from .replay_segments import SEGMENTS_DIR_NAME, load_replay_segments, save_replay_segments
+from .timing import TIMING_FIELDNAMES
 
 if TYPE_CHECKING:  # pragma: no cover - only for type checking
     from ...configs import AIConfig
@@ -24,6 +28,7 @@ __all__ = [
     "collect_rng_state",
     "save_replay_buffer_checkpoint",
     "load_replay_buffer_checkpoint",
+    "replay_checkpoint_kwargs",
     "serialise_config",
     "save_training_config",
     "append_episode_metrics",
@@ -70,29 +75,22 @@ def collect_rng_state() -> Dict[str, Any]:
     return rng_state
 
 
-def _serialise_transitions(transitions: Iterable) -> List[Dict[str, Any]]:
-    """Convert replay buffer transitions into JSON/pickle-friendly structures."""
-    serialised: List[Dict[str, Any]] = []
-    for transition in transitions:
-        serialised.append(
-            {
-                "state": transition.state,
-                "action": transition.action,
-                "reward": transition.reward,
-                "next_state": transition.next_state,
-                "done": transition.done,
-            }
-        )
-    return serialised
-
-
 def save_replay_buffer_checkpoint(
     base_path: Path,
     buffer: ReplayBuffer,
     episode: int,
     final_path: Optional[Path] = None,
+    incremental: bool = False,
+    max_segments: int = 64,
 ) -> Path:
-    """Persist replay buffer contents and RNG states for the given episode."""
+    """Persist replay buffer contents and RNG states for the given episode.
+
+    A ``MemmapReplayBuffer`` is only flushed: the checkpoint records its
+    directory and header (size and ring position) instead of the transitions.
+    With ``incremental``, the transitions added since the previous save are
+    appended as a segment under ``<base_path dir>/segments`` and the
+    checkpoint records the segment manifest (see ``save_replay_segments``).
+    """
 
     checkpoint_path = final_path or checkpoint_path_for_episode(base_path, episode)
     checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
@@ -100,31 +98,86 @@ def save_replay_buffer_checkpoint(
     payload = {
         "capacity": buffer.capacity,
         "length": len(buffer),
-        "transitions": _serialise_transitions(buffer._buffer),  # Access internal deque for serialization
         "rng_state": collect_rng_state(),
     }
+    if isinstance(buffer, MemmapReplayBuffer):
+        payload["memmap"] = {"directory": str(buffer.directory.resolve()), **buffer.flush()}
+    elif incremental:
+        segments_dir = base_path.parent / SEGMENTS_DIR_NAME
+        manifest = save_replay_segments(segments_dir, buffer, max_segments=max_segments)
+        payload["segments"] = {"directory": str(segments_dir.resolve()), **manifest}
+    else:
+        # Tensors are written as raw storages, much faster than pickled arrays
+        payload["columns"] = {name: torch.from_numpy(np.ascontiguousarray(column)) for name, column in buffer.to_arrays().items()}
+        payload["total_added"] = buffer.total_added
 
     torch.save(payload, checkpoint_path)
     return checkpoint_path
 
 
-def load_replay_buffer_checkpoint(path: Path, capacity: int) -> Tuple[ReplayBuffer, Optional[Dict[str, Any]]]:
-    """Reconstruct a replay buffer and RNG state from a saved checkpoint."""
+def replay_checkpoint_kwargs(config: "AIConfig") -> Dict[str, Any]:
+    """Return the ``save_replay_buffer_checkpoint`` options selected by the config."""
+    checkpoint_format = getattr(config, "replay_checkpoint_format", "segments")
+    if checkpoint_format not in ("segments", "full"):
+        raise ValueError(f"Unknown replay checkpoint format {checkpoint_format!r}, expected 'segments' or 'full'")
+    return {
+        "incremental": checkpoint_format == "segments",
+        "max_segments": int(getattr(config, "replay_max_segments", 64)),
+    }
+
+
+def load_replay_buffer_checkpoint(
+    path: Path,
+    capacity: int,
+    buffer: Optional[ReplayBuffer] = None,
+) -> Tuple[ReplayBuffer, Optional[Dict[str, Any]]]:
+    """Reconstruct a replay buffer and RNG state from a saved checkpoint.
+
+    ``buffer`` is an empty buffer to fill (e.g. a ``PrioritizedReplayBuffer``,
+    whose transitions restart at the maximum priority), a ``ReplayBuffer`` of
+    ``capacity`` is created otherwise. The stacked columns of the payload are
+    restored with ``load_state``; a checkpoint written with per-transition
+    dicts is converted to columns once, and rewritten in place. The files of
+    a ``MemmapReplayBuffer`` checkpoint are reopened in place, without being
+    read; an incremental checkpoint is rebuilt from the columns of its
+    segments.
+    """
     # weights_only=False keeps full pickle deserialization, so trust the checkpoint source.
     payload = torch.load(path, map_location="cpu", weights_only=False)
-    transitions = payload.get("transitions", [])
-    buffer = ReplayBuffer(capacity)
-    for transition in transitions:
-        buffer.add(
-            transition["state"],
-            transition["action"],
-            transition["reward"],
-            transition["next_state"],
-            transition["done"],
+    memmap_header = payload.get("memmap")
+    if memmap_header is not None:
+        window = buffer.window if isinstance(buffer, MemmapReplayBuffer) else MemmapReplayBuffer.DEFAULT_WINDOW
+        return MemmapReplayBuffer.open(memmap_header["directory"], window=window, header=memmap_header), payload.get(
+            "rng_state"
         )
+    if buffer is None:
+        buffer = ReplayBuffer(capacity)
+    segments = payload.get("segments")
+    if segments is not None:
+        return load_replay_segments(segments["directory"], segments, buffer), payload.get("rng_state")
+    columns = payload.get("columns")
+    if columns is None:
+        columns = _convert_legacy_checkpoint(path, payload)
+    buffer.load_state({name: torch.as_tensor(column).numpy() for name, column in columns.items()})
+    buffer.total_added = int(payload.get("total_added", len(buffer)))
     return buffer, payload.get("rng_state")
 
 
+def _convert_legacy_checkpoint(path: Path, payload: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Stack the per-transition dicts of an old checkpoint and rewrite it with the columnar payload."""
+    columns = stack_transitions(Transition(**transition) for transition in payload.pop("transitions", []))
+    payload["columns"] = {name: torch.from_numpy(column) for name, column in columns.items()}
+    payload.setdefault("total_added", len(columns["actions"]))
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    try:
+        torch.save(payload, tmp_path)
+        os.replace(tmp_path, path)
+        print(f"Converted replay buffer checkpoint {path} to the columnar format")
+    except OSError as error:
+        print(f"Could not convert replay buffer checkpoint {path} to the columnar format: {error}")
+    return columns
+
+
 def serialise_config(config: "AIConfig") -> Dict[str, Any]:
     """Convert the AIConfig dataclass into a JSON-friendly dictionary."""
 
@@ -163,19 +216,30 @@ _METRICS_FIELDNAMES: List[str] = [
     "total_dose",
     "steps",
     "updates",
+    "policy_lag",
+    *TIMING_FIELDNAMES,
 ]
 
 
 def append_episode_metrics(log_path: Path, metrics: Iterable[dict]) -> Path:
-    """Append per-episode statistics to a CSV file, creating it with a header if missing."""
+    """Append per-episode statistics to a CSV file, creating it with a header if missing.
+
+    An existing file keeps its header: rows appended to a log written before
+    new columns were added (e.g. when resuming an older run) only fill the
+    columns already present.
+    """
     log_path.parent.mkdir(parents=True, exist_ok=True)
+    fieldnames = _METRICS_FIELDNAMES
     file_exists = log_path.exists() and log_path.stat().st_size > 0
+    if file_exists:
+        with log_path.open("r", newline="") as fp:
+            fieldnames = next(csv.reader(fp), None) or _METRICS_FIELDNAMES
     with log_path.open("a", newline="") as fp:
-        writer = csv.DictWriter(fp, fieldnames=_METRICS_FIELDNAMES)
+        writer = csv.DictWriter(fp, fieldnames=fieldnames)
         if not file_exists:
             writer.writeheader()
         for entry in metrics:
-            writer.writerow({field: entry.get(field) for field in _METRICS_FIELDNAMES})
+            writer.writerow({field: entry.get(field) for field in fieldnames})
     return log_path
 
 
@@ -0,0 +1,81 @@
+"""Per-episode wall-clock breakdown of the training loop."""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional, Sequence
+
+__all__ = ["TIMING_STAGES", "TIMING_FIELDNAMES", "EpisodeTimer", "format_timing_summary"]
+
+
+# Stages timed by the training loop, logged as "<stage>_s" columns
+TIMING_STAGES = ("env", "growth", "act", "learn", "io")
+TIMING_FIELDNAMES: List[str] = [f"{stage}_s" for stage in TIMING_STAGES] + ["steps_per_s"]
+
+
+class EpisodeTimer:
+    """Accumulate the time spent in every stage of one episode.
+
+    The stages are ``env`` (``env.step``), ``growth`` (``env.reset`` and the
+    initial growth), ``act`` (epsilon schedule and ``select_action``),
+    ``learn`` (``store_transition`` and ``update``) and ``io`` (checkpoints
+    and log files). In the pipelined loop, ``env`` is only the wait for the
+    worker thread once the overlapped updates are done. ``label``, when
+    set, wraps every stage in ``label("train.<stage>")`` (profiler ranges).
+
+    The episode row is logged before its checkpoint is written, so the
+    stage time measured after ``metrics`` is carried over by ``reset`` and
+    counted in the next episode.
+    """
+
+    def __init__(self) -> None:
+        self.totals: Dict[str, float] = dict.fromkeys(TIMING_STAGES, 0.0)
+        self.start = time.perf_counter()
+        self.label: Optional[Callable[[str], ContextManager]] = None
+        self._logged: Optional[Dict[str, float]] = None  # Totals returned by the last metrics() call
+
+    def reset(self) -> None:
+        """Restart the totals, keeping the time measured after ``metrics``, and the episode clock."""
+        for stage in self.totals:
+            self.totals[stage] = self.totals[stage] - self._logged[stage] if self._logged is not None else 0.0
+        self._logged = None
+        self.start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Add the duration of the ``with`` block to ``name``."""
+        start = time.perf_counter()
+        try:
+            if self.label is None:
+                yield
+            else:
+                with self.label(f"train.{name}"):
+                    yield
+        finally:
+            self.totals[name] += time.perf_counter() - start
+
+    def metrics(self, steps: int) -> Dict[str, float]:
+        """Return the stage totals and the environment steps per wall-clock second of the episode."""
+        wall = time.perf_counter() - self.start
+        self._logged = dict(self.totals)
+        values: Dict[str, float] = {f"{stage}_s": total for stage, total in self.totals.items()}
+        values["steps_per_s"] = steps / wall if wall > 0 else 0.0
+        return values
+
+
+def format_timing_summary(episode_metrics: Sequence[dict]) -> str:
+    """Summarise the stage shares and the throughput of a window of episode metrics."""
+    totals = {stage: sum(float(entry.get(f"{stage}_s") or 0.0) for entry in episode_metrics) for stage in TIMING_STAGES}
+    timed = sum(totals.values())
+    steps = sum(int(entry.get("steps") or 0) for entry in episode_metrics)
+    # Wall time of every episode, recovered from its throughput
+    wall = sum(
+        int(entry.get("steps") or 0) / float(entry["steps_per_s"])
+        for entry in episode_metrics
+        if entry.get("steps_per_s")
+    )
+    shares = " | ".join(f"{stage} {totals[stage] / timed:5.1%}" if timed > 0 else f"{stage} -" for stage in TIMING_STAGES)
+    throughput = steps / wall if wall > 0 else 0.0
+    first, last = episode_metrics[0].get("episode"), episode_metrics[-1].get("episode")
+    return f"    Timing episodes {first}-{last} | {throughput:.2f} steps/s | {timed:.1f} s timed | {shares}"
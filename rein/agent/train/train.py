@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import math
 import random
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
 
@@ -22,9 +23,14 @@ from .save_io import (
     checkpoint_path_for_episode,
     final_checkpoint_path,
     append_episode_metrics,
+    replay_checkpoint_kwargs,
     save_replay_buffer_checkpoint,
     save_training_config,
 )
+from .memory import MemoryTracker
+from .metrics_server import MetricsServer
+from .profiling import EpisodeProfiler
+from .timing import TIMING_STAGES, EpisodeTimer, format_timing_summary
 from .training_state import (
     load_training_progress,
     persist_training_progress,
@@ -39,6 +45,8 @@ if TYPE_CHECKING:  # pragma: no cover
 
 CHECKPOINT_INTERVAL = 10
 METRICS_LOG_NAME = "training_log.csv"
+MEMORY_LOG_NAME = "memory_log.csv"
+SIM_PHASES = ("fill_sources", "cycle_cells", "diffuse", "compute_center", "irradiate")
 
 
 def resolve_device(device_flag: str) -> torch.device:
@@ -285,8 +293,70 @@ def generate_training_plots(metrics_path: Path) -> None:
         print(f" - q-values: {q_values_plot}")
 
 
+def publish_episode_metrics(
+    server: MetricsServer,
+    agent: DQNAgent,
+    episode_metrics: List[dict],
+    info: Dict[str, object],
+) -> None:
+    """Publish the end-of-episode gauges and counters of the last entry of ``episode_metrics``."""
+    entry = episode_metrics[-1]
+    steps = int(entry.get("steps") or 0)
+    steps_per_s = float(entry.get("steps_per_s") or 0.0)
+    server.inc("cellsim_episodes_total", 1)
+    server.set("cellsim_env_steps_per_second", steps_per_s)
+    server.set("cellsim_updates_per_second", entry["updates"] * steps_per_s / steps if steps else 0.0)
+    server.set("cellsim_episode_reward", entry["reward"])
+    server.set("cellsim_learning_rate", entry["learning_rate"])
+    recent = episode_metrics[-100:]
+    server.set("cellsim_success_rate", sum(bool(item.get("successful")) for item in recent) / len(recent))
+
+    capacity = agent.replay_buffer.capacity
+    server.set("cellsim_replay_size", len(agent.replay_buffer))
+    server.set("cellsim_replay_capacity", capacity)
+    server.set("cellsim_replay_fill_ratio", len(agent.replay_buffer) / capacity if capacity else 0.0)
+
+    for stage in TIMING_STAGES:
+        server.inc("cellsim_train_stage_seconds_total", float(entry.get(f"{stage}_s") or 0.0), stage=stage)
+    # The simulator statistics restart at every reset: the last step covers the whole episode
+    sim_stats = info.get("sim_stats")
+    if isinstance(sim_stats, dict):
+        for phase in SIM_PHASES:
+            server.inc("cellsim_sim_phase_seconds_total", float(sim_stats.get(f"{phase}_s", 0.0)), phase=phase)
+
+
+def make_env(config: "AIConfig") -> CellSimEnv:
+    """Build the training environment described by ``config``."""
+    return CellSimEnv(
+        max_dose=config.max_dose,
+        max_wait=config.max_wait,
+        min_dose=config.min_dose,
+        min_wait=config.min_wait,
+        scenario_library=getattr(config, "scenario_library", None),
+        fidelity=getattr(config, "fidelity", "full"),
+        hybrid_distance=getattr(config, "hybrid_distance", 0.0),
+        quiescent_pooling=getattr(config, "quiescent_pooling", False),
+    )
+
+
 def run_training(config: "AIConfig", device: torch.device) -> None:
     """Run the full DQN training loop and optional evaluation."""
+    actors = int(getattr(config, "actors", 0))
+    num_envs = int(getattr(config, "num_envs", 1))
+    if actors > 0 and num_envs > 1:
+        raise ValueError("actors and num_envs > 1 are exclusive training modes")
+    # Imported here: these loops build on the helpers of this module
+    if actors > 0:
+        from .actors import run_actor_training
+
+        run_actor_training(config, device)
+        return
+    if num_envs > 1:
+        from .vector import run_vector_training
+
+        run_vector_training(config, device)
+        return
+
     # Lock reproducible behaviour using the externally provided seed.
     seed_everything(config.seed)
 
@@ -298,12 +368,9 @@ def run_training(config: "AIConfig", device: torch.device) -> None:
         print(f"CUDA device: {cuda_name}")
 
     # Iniztialize the enviroment
-    env = CellSimEnv(
-        max_dose=config.max_dose,
-        max_wait=config.max_wait,
-        min_dose=config.min_dose,
-        min_wait=config.min_wait,
-    )
+    env = make_env(config)
+    # Grids of a post-growth library already include the growth phase
+    apply_growth = env.scenario_library is None or env.scenario_library.spec.growth_hours == 0
 
     # Build the discrete action catalogue required by the DQN head.
     discrete_actions = build_discrete_actions(env.action_space, config.dose_bins, config.wait_bins)
@@ -317,6 +384,7 @@ def run_training(config: "AIConfig", device: torch.device) -> None:
     buffer_final_path = final_checkpoint_path(buffer_base_path, "replay_buffer_final")
     paused_agent_path = final_checkpoint_path(checkpoint_base_path, "agent_paused")
     paused_buffer_path = final_checkpoint_path(buffer_base_path, "replay_buffer_paused")
+    replay_checkpoint_options = replay_checkpoint_kwargs(config)
     use_reward_aware = bool(
         getattr(config, "reward_aware_activator", DEFAULT_CONFIG.reward_aware_activator)
     )
@@ -377,13 +445,71 @@ def run_training(config: "AIConfig", device: torch.device) -> None:
             decay_multiplier=config.reward_decay_multiplier,
         )
 
+    # Per-episode time spent in the environment, the growth, the policy, the learner and the I/O
+    timer = EpisodeTimer()
+    timing_summary_interval = int(getattr(config, "timing_summary_interval", 0))
+
+    # Replay ratio: fractional updates per step accumulate until a whole update is due
+    updates_per_step = float(getattr(config, "updates_per_step", 1.0))
+    if updates_per_step < 0:
+        raise ValueError("updates_per_step must be non-negative")
+    update_credit = 0.0
+
+    # Pipelined loop: the next env step runs on a worker thread (the simulator releases the GIL) while the
+    # main thread runs the updates of the previous step; the acting policy then lags by up to this many updates
+    pipeline_max_lag = int(getattr(config, "pipeline_max_lag", 0))
+    if pipeline_max_lag < 0:
+        raise ValueError("pipeline_max_lag must be non-negative")
+    env_worker: ThreadPoolExecutor | None = None
+    if pipeline_max_lag > 0:
+        env_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="env-step")
+
+    # Optional profiling window, written next to the checkpoints
+    profiler: EpisodeProfiler | None = None
+    profile_episodes = getattr(config, "profile_episodes", None)
+    if profile_episodes is not None:
+        profiler = EpisodeProfiler(
+            profile_episodes,
+            getattr(config, "profile_mode", "cprofile"),
+            config.save_agent_path / "checkpoints" / "profiles",
+            device,
+        )
+        timer.label = profiler.label
+
+    # Optional Prometheus endpoint on localhost, served from a background thread
+    metrics_server: MetricsServer | None = None
+    metrics_port = getattr(config, "metrics_port", None)
+    if metrics_port is not None:
+        metrics_server = MetricsServer(metrics_port).start()
+        metrics_server.set("cellsim_env_steps_total", total_steps)
+        metrics_server.set("cellsim_episodes_total", len(episode_metrics))
+        print(f"Serving training metrics on http://127.0.0.1:{metrics_server.port}/metrics")
+
+    # Optional per-episode memory samples (RSS, Python heap, simulator allocations)
+    memory_tracker: MemoryTracker | None = None
+    if getattr(config, "memory_diagnostics", False):
+        memory_log_path = config.save_agent_path / MEMORY_LOG_NAME
+        if not getattr(config, "resume", False) and memory_log_path.exists():
+            memory_log_path.unlink()
+        memory_tracker = MemoryTracker(
+            memory_log_path,
+            window=getattr(config, "memory_window", 20),
+            threshold_mb=getattr(config, "memory_growth_threshold_mb", 32.0),
+            top_n=getattr(config, "memory_top_n", 5),
+        ).start()
+
     try:
         for episode in range(start_episode, config.episodes + 1):
             current_episode = episode
+            if profiler is not None:
+                profiler.begin_episode(episode, env)
+            timer.reset()
 
             # Reset environment with deterministic seed and apply initial growth phase.
-            state, _ = env.reset(seed=config.seed + episode)
-            env.growth(config.growth_hours)
+            with timer.stage("growth"):
+                state, _ = env.reset(seed=config.seed + episode)
+                if apply_growth:
+                    env.growth(config.growth_hours)
 
             episode_reward = 0.0
             info: Dict[str, object] = {}
@@ -392,53 +518,82 @@ def run_training(config: "AIConfig", device: torch.device) -> None:
             episode_losses: List[float] = []
             episode_step_count = 0
             updates_this_episode = 0
+            pending_updates = 0  # Updates due but deferred while the next env step runs
+            episode_policy_lag = 0
 
             # Beginning steps
-            for _ in range(config.max_steps):
-
-                # Decay exploration rate and sample an action from the agent policy.
-                if use_reward_aware and epsilon_controller is not None:
-                    # Reward-aware controller stretches/shrinks epsilon in response to performance trends.
-                    current_epsilon = epsilon_controller.value(total_steps)
+            for step_index in range(config.max_steps):
+
+                with timer.stage("act"):
+                    # Decay exploration rate and sample an action from the agent policy.
+                    if use_reward_aware and epsilon_controller is not None:
+                        # Reward-aware controller stretches/shrinks epsilon in response to performance trends.
+                        current_epsilon = epsilon_controller.value(total_steps)
+                    else:
+                        current_epsilon = linear_epsilon(
+                            total_steps,
+                            config.epsilon_start,
+                            config.epsilon_end,
+                            config.epsilon_decay_steps,
+                        )
+                    if episode_initial_epsilon is None:
+                        episode_initial_epsilon = current_epsilon
+
+                    # Select action
+                    action_idx, action = agent.select_action(state, current_epsilon)
+                    episode_policy_lag = max(episode_policy_lag, pending_updates)
+
+                if env_worker is not None:
+                    # Step the environment on the worker thread and catch up with the deferred updates meanwhile
+                    step_future = env_worker.submit(env.step, action)
+                    with timer.stage("learn"):
+                        step_losses = agent.update_many(pending_updates)
+                        pending_updates = 0
+                    with timer.stage("env"):
+                        next_state, reward, terminated, truncated, info = step_future.result()
                 else:
-                    current_epsilon = linear_epsilon(
-                        total_steps,
-                        config.epsilon_start,
-                        config.epsilon_end,
-                        config.epsilon_decay_steps,
-                    )
-                if episode_initial_epsilon is None:
-                    episode_initial_epsilon = current_epsilon
+                    # Step the enviroment
+                    with timer.stage("env"):
+                        next_state, reward, terminated, truncated, info = env.step(action)
+                    step_losses = []
 
-                
-                # Select action
-                action_idx, action = agent.select_action(state, current_epsilon)
-                
-                # Step the enviroment
-                next_state, reward, terminated, truncated, info = env.step(action)
-                
                 # Check if done or truncated
                 done = terminated or truncated
 
-                # Push transition to replay buffer and trigger a learning step.
-                agent.store_transition(state, action_idx, reward, next_state, done)
-
-                # If replay buffer has enough samples, fetch a mini-batch, calculate Huber loss
-                # between current Q and target, updates policy network (backpropagation) and 
-                # periodically synchronizes the target network
-                loss = agent.update()
+                with timer.stage("learn"):
+                    # Push transition to replay buffer and trigger a learning step.
+                    agent.store_transition(state, action_idx, reward, next_state, done)
+
+                    # If replay buffer has enough samples, fetch mini-batches, calculate Huber loss
+                    # between current Q and target, updates policy network (backpropagation) and 
+                    # periodically synchronizes the target network. Up to pipeline_max_lag of them wait
+                    # for the next env step, except at the end of the episode
+                    update_credit += updates_per_step
+                    due_updates = int(update_credit)
+                    update_credit -= due_updates
+                    pending_updates += due_updates
+                    last_step = done or step_index == config.max_steps - 1
+                    overdue = pending_updates if last_step else max(0, pending_updates - pipeline_max_lag)
+                    step_losses += agent.update_many(overdue)
+                    pending_updates -= overdue
 
                 # Store loss and episode loss
-                if loss is not None:
+                for loss in step_losses:
                     losses.append(loss)
                     episode_losses.append(loss)
                     updates_this_episode += 1
+                if step_losses and metrics_server is not None:
+                    metrics_server.inc("cellsim_updates_total", len(step_losses))
+                    metrics_server.set("cellsim_last_loss", step_losses[-1])
 
                 # Update state, reward counter and total step counter
                 state = next_state
                 episode_reward += reward
                 total_steps += 1
                 episode_step_count += 1
+                if metrics_server is not None:
+                    metrics_server.set("cellsim_env_steps_total", total_steps)
+                    metrics_server.set("cellsim_epsilon", current_epsilon)
 
                 # If done, stop the episode
                 if done:
@@ -493,9 +648,9 @@ def run_training(config: "AIConfig", device: torch.device) -> None:
                     "total_dose": episode_total_dose,
                     "steps": episode_step_count,
                     "updates": updates_this_episode,
+                    "policy_lag": episode_policy_lag,
                 }
             )
-            metrics_path = append_episode_metrics(metrics_log_path, (episode_metrics[-1],))
 
             # Change epsilon and epsilon decay moltiplication factor (reward aware algoritm)
             reward_adjustment = (
@@ -508,6 +663,7 @@ def run_training(config: "AIConfig", device: torch.device) -> None:
                 f"reward: {episode_reward:.3f} | avg10 reward: {avg_reward:.3f} | avg10 loss: {avg_loss:.5f} | "
                 f"lr: {current_lr:.6f} | eps: {current_epsilon:.3f} | elapsed_h: {episode_elapsed_hours:04.0f} | "
                 f"dose: {episode_total_dose:.2f} | {info_str}"
+                + (f" | policy lag: {episode_policy_lag}" if env_worker is not None else "")
             )
 
             # Print information of reduced learning rate
@@ -530,46 +686,66 @@ def run_training(config: "AIConfig", device: torch.device) -> None:
                     f"effective decay steps: {effective_steps}, "
                     f"epsilon current: {current_epsilon:.3f}"
                 )
-                with epsilon_log_path.open("a", encoding="utf-8") as log_fp:
+                with timer.stage("io"), epsilon_log_path.open("a", encoding="utf-8") as log_fp:
                     log_fp.write(
                         f"{episode},{total_steps},{reason},{new_eps_mult:.6f},{new_decay:.6f},{current_epsilon:.6f},{effective_steps}\n"
                     )
             
+            # Log the episode with its timing breakdown before the progress file references it. The row
+            # and the checkpoint below are written after the breakdown: their I/O counts in the next episode
+            episode_metrics[-1].update(timer.metrics(episode_step_count))
+            with timer.stage("io"):
+                metrics_path = append_episode_metrics(metrics_log_path, (episode_metrics[-1],))
+
             # Periodically persist model, replay buffer, and metrics to disk.
             should_save_checkpoint = (episode % CHECKPOINT_INTERVAL == 0) or episode == config.episodes
             if should_save_checkpoint:
-                is_final_episode = episode == config.episodes
-                checkpoint_path = (
-                    agent_final_path if is_final_episode else checkpoint_path_for_episode(checkpoint_base_path, episode)
-                )
-                checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
-                agent.save(str(checkpoint_path))
-                buffer_path = save_replay_buffer_checkpoint(
-                    buffer_base_path,
-                    agent.replay_buffer,
-                    episode,
-                    final_path=buffer_final_path if is_final_episode else None,
-                )
-                if metrics_path is None:
-                    metrics_path = metrics_log_path
-                last_checkpoint_path = checkpoint_path
-                last_buffer_path = buffer_path
-                persist_training_progress(
-                    config,
-                    episode + 1,
-                    total_steps,
-                    episode_rewards,
-                    losses,
-                    episode_metrics,
-                    checkpoint_path,
-                    buffer_path,
-                    metrics_path,
-                    "running",
-                )
-                print(
-                    "Checkpoint saved at episode "
-                    f"{episode} -> model: {checkpoint_path}, buffer: {buffer_path}, metrics log: {metrics_log_path}"
+                with timer.stage("io"):
+                    is_final_episode = episode == config.episodes
+                    checkpoint_path = (
+                        agent_final_path if is_final_episode else checkpoint_path_for_episode(checkpoint_base_path, episode)
+                    )
+                    checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+                    agent.save(str(checkpoint_path))
+                    agent.stop_prefetching()
+                    buffer_path = save_replay_buffer_checkpoint(
+                        buffer_base_path,
+                        agent.replay_buffer,
+                        episode,
+                        final_path=buffer_final_path if is_final_episode else None,
+                        **replay_checkpoint_options,
+                    )
+                    if metrics_path is None:
+                        metrics_path = metrics_log_path
+                    last_checkpoint_path = checkpoint_path
+                    last_buffer_path = buffer_path
+                    persist_training_progress(
+                        config,
+                        episode + 1,
+                        total_steps,
+                        episode_rewards,
+                        losses,
+                        episode_metrics,
+                        checkpoint_path,
+                        buffer_path,
+                        metrics_path,
+                        "running",
+                    )
+                    print(
+                        "Checkpoint saved at episode "
+                        f"{episode} -> model: {checkpoint_path}, buffer: {buffer_path}, metrics log: {metrics_log_path}"
+                    )
+
+            if timing_summary_interval > 0 and episode % timing_summary_interval == 0:
+                print(format_timing_summary(episode_metrics[-timing_summary_interval:]))
+            if metrics_server is not None:
+                publish_episode_metrics(metrics_server, agent, episode_metrics, info)
+            if memory_tracker is not None:
+                memory_tracker.sample(
+                    episode, env, agent, losses_len=len(losses), episode_metrics_len=len(episode_metrics)
                 )
+            if profiler is not None:
+                profiler.end_episode(episode)
 
         # Guarantee at least one final checkpoint even if periodic saves were disabled.
         if metrics_path is None: # metrics_path is only set when saving a periodic checkpoint
@@ -577,11 +753,13 @@ def run_training(config: "AIConfig", device: torch.device) -> None:
             checkpoint_path = agent_final_path
             checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
             agent.save(str(checkpoint_path))
+            agent.stop_prefetching()
             buffer_path = save_replay_buffer_checkpoint(
                 buffer_base_path,
                 agent.replay_buffer,
                 final_episode,
                 final_path=buffer_final_path,
+                **replay_checkpoint_options,
             )
             if episode_metrics:
                 metrics_path = append_episode_metrics(metrics_log_path, episode_metrics)
@@ -657,5 +835,16 @@ def run_training(config: "AIConfig", device: torch.device) -> None:
         last_buffer_path = buffer_path
         print(f"Training paused at episode {current_episode}. Checkpoints saved to {checkpoint_path}")
     finally:
+        # Let an env step still running on the worker thread finish before closing the environment
+        if env_worker is not None:
+            env_worker.shutdown(wait=True)
+        agent.stop_prefetching()
+        # Write a profiling window cut short by an interruption
+        if profiler is not None:
+            profiler.close()
+        if metrics_server is not None:
+            metrics_server.close()
+        if memory_tracker is not None:
+            memory_tracker.close()
         # Clean up the environment explicitly to release resources.
         env.close()
@@ -9,6 +9,7 @@ from typing import List, Optional, Tuple, TYPE_CHECKING
 from .save_io import (
     load_replay_buffer_checkpoint,
     load_training_state,
+    replay_checkpoint_kwargs,
     restore_rng_state,
     save_replay_buffer_checkpoint,
     save_training_state,
@@ -79,6 +80,7 @@ def load_training_progress(config: "AIConfig", agent: "DQNAgent") -> TrainingPro
             replay_buffer, rng_state = load_replay_buffer_checkpoint(
                 buffer_checkpoint,
                 agent.replay_buffer.capacity,
+                buffer=agent.build_replay_buffer(),
             )
             agent.replay_buffer = replay_buffer
             progress.last_buffer_path = buffer_checkpoint
@@ -155,11 +157,13 @@ def save_paused_progress(
     """Save agent, buffer and metadata when training is paused/interrupted."""
     paused_agent_path.parent.mkdir(parents=True, exist_ok=True)
     agent.save(str(paused_agent_path))
+    agent.stop_prefetching()
     buffer_path = save_replay_buffer_checkpoint(
         buffer_base_path,
         agent.replay_buffer,
         current_episode,
         final_path=paused_buffer_path,
+        **replay_checkpoint_kwargs(config),
     )
     persist_training_progress(
         config,
@@ -0,0 +1,158 @@
+"""Training loop over a batch of environments with batched action selection."""
+
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+import numpy as np
+import torch
+
+from ..core.dqn_agent import DQNAgent
+from ...env.vector_env import CellSimVectorEnv
+from .ledger import TrainingLedger
+from .timing import EpisodeTimer, format_timing_summary
+from .train import build_discrete_actions, linear_epsilon, make_env, seed_everything
+
+if TYPE_CHECKING:  # pragma: no cover
+    from ...configs import AIConfig
+
+__all__ = ["run_vector_training"]
+
+
+@dataclass
+class _EnvEpisode:
+    """Bookkeeping of the episode running in one env of the batch."""
+
+    start: float  # perf_counter at the reset
+    epsilon_start: float
+    updates_before: int  # Learner updates and summed losses when the episode started
+    loss_sum_before: float
+    stages_before: Dict[str, float] = field(default_factory=dict)  # Stage totals when the episode started
+    reward: float = 0.0
+    steps: int = 0
+
+
+def run_vector_training(config: "AIConfig", device: torch.device) -> None:
+    """Train on ``config.num_envs`` environments stepped together.
+
+    Every tick selects the actions of all running envs with one
+    ``DQNAgent.select_actions`` forward pass (the epsilon of the linear
+    schedule, which advances by one step per transition), steps them and
+    stores their transitions with one ``store_transitions`` call, then runs
+    ``updates_per_step`` updates per stored transition. An env whose
+    episode ends is reset (seed ``config.seed`` plus the episode count) and
+    grown before the next tick. Episodes are logged by a ``TrainingLedger``
+    in the order they complete, with their own reward, steps, epsilons,
+    updates and mean loss; the stage timings are those of the ticks the
+    episode took part in. The reward-aware epsilon controller, the
+    pipelined loop, the profiler, the metrics server and the memory
+    diagnostics are not used in this mode.
+    """
+    num_envs = int(config.num_envs)
+    if int(getattr(config, "n_step", 1)) > 1:
+        # The rows of one episode are interleaved with those of the other envs in the buffer
+        raise ValueError("n-step returns need one environment per buffer (num_envs=1 with n_step > 1)")
+    seed_everything(config.seed)
+    print(f"Using device: {device} | envs: {num_envs}")
+    for option in ("profile_episodes", "metrics_port"):
+        if getattr(config, option, None) is not None:
+            print(f"{option} is ignored with num_envs > 1")
+    for option in ("memory_diagnostics", "reward_aware_activator", "pipeline_max_lag"):
+        if getattr(config, option, None):
+            print(f"{option} is ignored with num_envs > 1")
+
+    envs = CellSimVectorEnv([make_env(config) for _ in range(num_envs)])
+    discrete_actions = build_discrete_actions(envs.single_action_space, config.dose_bins, config.wait_bins)
+    state_dim = int(np.prod(envs.single_observation_space.shape))  # type: ignore
+
+    agent = DQNAgent(state_dim, discrete_actions, device, config)
+    ledger = TrainingLedger(config, agent)
+
+    updates_per_step = float(getattr(config, "updates_per_step", 1.0))
+    if updates_per_step < 0:
+        raise ValueError("updates_per_step must be non-negative")
+    update_credit = 0.0
+    timing_summary_interval = int(getattr(config, "timing_summary_interval", 0))
+
+    # Cumulative stage totals of the run; every episode logs their growth while it was running
+    timer = EpisodeTimer()
+    states = np.zeros((num_envs, state_dim), dtype=np.float32)
+    running: List[Optional[_EnvEpisode]] = [None] * num_envs
+    updates = 0
+    loss_sum = 0.0
+
+    try:
+        while not ledger.done:
+            epsilon = linear_epsilon(
+                ledger.total_steps, config.epsilon_start, config.epsilon_end, config.epsilon_decay_steps
+            )
+            # Start an episode in every idle env, as long as episodes remain to be played
+            for index in range(num_envs):
+                in_flight = sum(episode is not None for episode in running)
+                if running[index] is None and ledger.next_episode + in_flight <= config.episodes:
+                    episode = _EnvEpisode(time.perf_counter(), epsilon, updates, loss_sum, dict(timer.totals))
+                    with timer.stage("growth"):
+                        seed = config.seed + ledger.next_episode + in_flight
+                        states[index] = envs.reset_at(index, seed, config.growth_hours)
+                    running[index] = episode
+            active = [index for index, episode in enumerate(running) if episode is not None]
+
+            with timer.stage("act"):
+                action_indices, actions = agent.select_actions(states[active], np.full(len(active), epsilon))
+
+            with timer.stage("env"):
+                next_states, rewards, terminated, truncated, infos = envs.step(active, actions)
+            dones = terminated | truncated
+
+            with timer.stage("learn"):
+                agent.store_transitions(states[active], action_indices, rewards, next_states, dones)
+                update_credit += updates_per_step * len(active)
+                due_updates = int(update_credit)
+                update_credit -= due_updates
+                step_losses = agent.update_many(due_updates)
+            ledger.losses.extend(step_losses)
+            updates += len(step_losses)
+            loss_sum += float(sum(step_losses))
+            ledger.total_steps += len(active)
+
+            states[active] = next_states
+            for row, index in enumerate(active):
+                episode = running[index]
+                episode.reward += float(rewards[row])
+                episode.steps += 1
+                if not (dones[row] or episode.steps >= config.max_steps):
+                    continue
+                running[index] = None
+                info = infos[row]
+                episode_updates = updates - episode.updates_before
+                wall = time.perf_counter() - episode.start
+                entry = {
+                    "reward": episode.reward,
+                    "epsilon_start": episode.epsilon_start,
+                    "epsilon_end": epsilon,
+                    "mean_loss": (loss_sum - episode.loss_sum_before) / episode_updates if episode_updates else math.nan,
+                    "elapsed_hours": float(info.get("elapsed_hours", getattr(envs.envs[index], "elapsed_hours", 0))),
+                    "timeout": bool(info.get("timeout", False)),
+                    "successful": bool(info.get("successful", False)),
+                    "unsuccessful": bool(info.get("unsuccessful", False)),
+                    "total_dose": float(info.get("total_dose", getattr(envs.envs[index], "total_dose", 0.0))),
+                    "steps": episode.steps,
+                    "updates": episode_updates,
+                    "policy_lag": 0,
+                    **{f"{stage}_s": total - episode.stages_before[stage] for stage, total in timer.totals.items()},
+                    "steps_per_s": episode.steps / wall if wall > 0 else 0.0,
+                }
+                logged = ledger.record(entry, f"env: {index:02d}")
+                if timing_summary_interval > 0 and logged % timing_summary_interval == 0:
+                    print(format_timing_summary(ledger.episode_metrics[-timing_summary_interval:]))
+
+        ledger.finish(envs.envs[0])
+
+    except KeyboardInterrupt:
+        ledger.pause()
+    finally:
+        agent.stop_prefetching()
+        envs.close()
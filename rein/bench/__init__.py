@@ -0,0 +1,5 @@
+"""Benchmarks of the simulator and of the training loop.
+
+The modules are command line tools (``python -m rein.bench.scaling``), they
+are not imported with the package.
+"""
@@ -0,0 +1,381 @@
+"""Microbenchmarks of the hot paths with a regression check.
+
+Every benchmark prepares its own state (a grown ``Controller``, a
+``CellSimEnv``, a filled ``ReplayBuffer``, a ``DQNAgent``...), runs a few
+warm-up calls, then times ``repeat`` rounds of ``number`` calls. The report
+gives, per call, the median over the rounds, the interquartile range and
+the fastest round.
+
+The medians can be stored as a baseline and later runs compared with it:
+the script exits with status 1 when a median is slower than the baseline by
+more than ``--threshold`` (relative), so it can gate a CI job::
+
+    python -m rein.bench.microbench --update-baseline            # record bench/microbench_baseline.json
+    python -m rein.bench.microbench --threshold 0.25             # compare with it
+    python -m rein.bench.microbench --only controller.go env.step --output bench/microbench.json
+
+Baselines are machine specific: record them on the machine that runs the
+comparison.
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import json
+import platform
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+DEFAULT_BASELINE = Path("bench/microbench_baseline.json")
+
+
+@dataclass
+class Benchmark:
+    """A timed operation: ``setup()`` returns the callable to time and an optional per-round reset."""
+
+    name: str
+    setup: Callable[[], tuple]
+    number: int = 10  # Calls per round
+    repeat: int = 15  # Timed rounds
+    warmup: int = 3  # Untimed calls before the rounds
+
+
+def _grown_controller(hours: int = 100):
+    from rein import cell_sim
+
+    cell_sim.seed(0)
+    cell_sim.seed_cells(0)
+    ctrl = cell_sim.Controller(21, 21, 21, 20, 2.0, 4.0, 1000, 1)
+    for _ in range(hours):
+        ctrl.go()
+    return ctrl, ctrl.grid.clone()
+
+
+def _setup_go():
+    ctrl, snapshot = _grown_controller()
+    return ctrl.go, lambda: ctrl.set_grid(snapshot)
+
+
+def _setup_irradiate():
+    ctrl, snapshot = _grown_controller()
+    return (lambda: ctrl.irradiate(2.0)), lambda: ctrl.set_grid(snapshot)
+
+
+def _setup_env():
+    from rein.env import CellSimEnv
+
+    env = CellSimEnv()
+    env.reset(seed=0)
+    return env
+
+
+def _setup_env_reset():
+    env = _setup_env()
+    return env.reset, None
+
+
+def _setup_env_step():
+    env = _setup_env()
+    action = np.array([2.0, 24.0], dtype=np.float32)
+
+    def step():
+        _, _, terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            env.reset()
+
+    return step, env.reset
+
+
+def _random_transition(rng: np.random.Generator):
+    return rng.random(2, dtype=np.float32), int(rng.integers(9)), float(rng.random()), rng.random(2, dtype=np.float32), False
+
+
+def _filled_buffer(size: int = 10_000, capacity: int = 100_000):
+    from rein.agent import ReplayBuffer
+
+    rng = np.random.default_rng(0)
+    buffer = ReplayBuffer(capacity)
+    for _ in range(size):
+        buffer.add(*_random_transition(rng))
+    return buffer
+
+
+def _setup_replay_add():
+    from rein.agent import ReplayBuffer
+
+    rng = np.random.default_rng(0)
+    transitions = [_random_transition(rng) for _ in range(1_000)]
+    buffer = ReplayBuffer(100_000)
+    index = iter(range(10**9))
+    return (lambda: buffer.add(*transitions[next(index) % len(transitions)])), None
+
+
+def _setup_replay_sample():
+    import torch
+
+    buffer = _filled_buffer()
+    device = torch.device("cpu")
+    return (lambda: buffer.sample(64, device)), None
+
+
+@functools.lru_cache(maxsize=1)
+def _full_prioritized_buffer(capacity: int = 500_000):
+    """A ``PrioritizedReplayBuffer`` filled to capacity with random priorities (shared by the PER benchmarks)."""
+    from rein.agent import PrioritizedReplayBuffer
+
+    rng = np.random.default_rng(0)
+    buffer = PrioritizedReplayBuffer(capacity)
+    transition = _random_transition(rng)
+    for _ in range(capacity):
+        buffer.add(*transition)
+    slots = np.arange(capacity)
+    buffer.update_priorities(slots, rng.exponential(size=capacity))
+    return buffer
+
+
+def _setup_per_sample():
+    import torch
+
+    buffer = _full_prioritized_buffer()
+    device = torch.device("cpu")
+    return (lambda: buffer.sample(64, device)), None
+
+
+def _setup_memmap_sample():
+    import torch
+
+    from rein.agent import MemmapReplayBuffer
+
+    rng = np.random.default_rng(0)
+    buffer = MemmapReplayBuffer(100_000, tempfile.mkdtemp(prefix="microbench_memmap_"), (2,))
+    for _ in range(100_000):
+        buffer.add(*_random_transition(rng))
+    device = torch.device("cpu")
+    return (lambda: buffer.sample(64, device)), None
+
+
+def _setup_tensor_sample():
+    import torch
+
+    from rein.agent import TensorReplayBuffer
+
+    rng = np.random.default_rng(0)
+    device = torch.device("cpu")
+    buffer = TensorReplayBuffer(100_000, (2,), device)
+    for _ in range(100_000):
+        buffer.add(*_random_transition(rng))
+    return (lambda: buffer.sample(64, device)), None
+
+
+def _setup_per_update():
+    buffer = _full_prioritized_buffer()
+    rng = np.random.default_rng(1)
+    slots = rng.integers(buffer.capacity, size=64)
+    td_errors = rng.exponential(size=64)
+    return (lambda: buffer.update_priorities(slots, td_errors)), None
+
+
+def _agent(**overrides: Any):
+    import torch
+
+    from rein.agent import DQNAgent
+    from rein.configs.defaults import AIConfig
+
+    config = AIConfig(device="cpu", min_buffer_size=1_000, buffer_size=100_000, **overrides)
+    actions = [np.array([dose, 24.0], dtype=np.float32) for dose in np.linspace(1.0, 5.0, 9)]
+    agent = DQNAgent(2, actions, torch.device("cpu"), config)
+    agent.replay_buffer = _filled_buffer(5_000, config.buffer_size)
+    return agent
+
+
+def _setup_select_action():
+    agent = _agent()
+    state = np.array([3000.0, 10.0], dtype=np.float32)
+    return (lambda: agent.select_action(state, 0.0)), None
+
+
+def _setup_select_actions():
+    # One batched forward pass for 16 envs, to compare with 16 select_action calls
+    agent = _agent()
+    states = np.tile(np.array([3000.0, 10.0], dtype=np.float32), (16, 1))
+    epsilons = np.full(16, 0.1)
+    return (lambda: agent.select_actions(states, epsilons)), None
+
+
+def _setup_update():
+    agent = _agent()
+    return agent.update, None
+
+
+def _setup_update_many():
+    agent = _agent()
+    return (lambda: agent.update_many(4)), None
+
+
+def _setup_update_prefetch():
+    # The prefetcher thread is left running until the process exits
+    agent = _agent(prefetch_batches=2)
+    return agent.update, None
+
+
+def _checkpoint_files():
+    from rein.agent.train.save_io import save_replay_buffer_checkpoint
+
+    agent = _agent()
+    directory = Path(tempfile.mkdtemp(prefix="microbench_"))
+    agent_path = directory / "agent.pt"
+    buffer_path = directory / "buffer.pt"
+
+    def save():
+        agent.save(str(agent_path))
+        save_replay_buffer_checkpoint(buffer_path, agent.replay_buffer, 0, final_path=buffer_path)
+
+    return agent, agent_path, buffer_path, save
+
+
+def _setup_checkpoint_save():
+    *_, save = _checkpoint_files()
+    return save, None
+
+
+def _setup_checkpoint_load():
+    from rein.agent.train.save_io import load_replay_buffer_checkpoint
+
+    agent, agent_path, buffer_path, save = _checkpoint_files()
+    save()
+
+    def load():
+        agent.load(str(agent_path))
+        load_replay_buffer_checkpoint(buffer_path, agent.config.buffer_size)
+
+    return load, None
+
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    bench.name: bench
+    for bench in [
+        Benchmark("controller.go", _setup_go, number=10),
+        Benchmark("controller.irradiate", _setup_irradiate, number=1, repeat=20, warmup=1),
+        Benchmark("env.reset", _setup_env_reset, number=10),
+        Benchmark("env.step", _setup_env_step, number=5),
+        Benchmark("replay.add", _setup_replay_add, number=1_000),
+        Benchmark("replay.sample", _setup_replay_sample, number=100),
+        Benchmark("memmap.sample", _setup_memmap_sample, number=100),
+        Benchmark("tensor.sample", _setup_tensor_sample, number=100),
+        Benchmark("per.sample", _setup_per_sample, number=100),
+        Benchmark("per.update_priorities", _setup_per_update, number=100),
+        Benchmark("agent.select_action", _setup_select_action, number=200),
+        Benchmark("agent.select_actions", _setup_select_actions, number=200),
+        Benchmark("agent.update", _setup_update, number=20),
+        Benchmark("agent.update_prefetch", _setup_update_prefetch, number=20),
+        Benchmark("agent.update_many", _setup_update_many, number=5),
+        Benchmark("checkpoint.save", _setup_checkpoint_save, number=1, repeat=7, warmup=1),
+        Benchmark("checkpoint.load", _setup_checkpoint_load, number=1, repeat=7, warmup=1),
+    ]
+}
+
+
+def run_benchmark(bench: Benchmark) -> Dict[str, float]:
+    """Time one benchmark and return per-call statistics in seconds."""
+    op, reset = bench.setup()
+    for _ in range(bench.warmup):
+        op()
+
+    rounds = np.empty(bench.repeat)
+    for r in range(bench.repeat):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        for _ in range(bench.number):
+            op()
+        rounds[r] = (time.perf_counter() - start) / bench.number
+
+    q1, median, q3 = np.percentile(rounds, [25, 50, 75])
+    return {"median_s": float(median), "iqr_s": float(q3 - q1), "min_s": float(rounds.min()), "rounds": bench.repeat}
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    """Return the names of the benchmarks slower than the baseline by more than ``threshold``."""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is not None and result["median_s"] > reference["median_s"] * (1.0 + threshold):
+            regressions.append(name)
+    return regressions
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.1f} ns"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Microbenchmarks of the hot paths with a regression check")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), default=None, help="Benchmarks to run")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative slowdown of a median")
+    parser.add_argument("--repeat-scale", type=float, default=1.0, help="Multiply the rounds of every benchmark")
+    parser.add_argument("--output", type=Path, default=None, help="Optional JSON file for the results")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    names = args.only or list(BENCHMARKS)
+    baseline: Dict[str, Dict[str, float]] = {}
+    if args.baseline.exists() and not args.update_baseline:
+        baseline = json.loads(args.baseline.read_text())["results"]
+
+    results: Dict[str, Dict[str, Any]] = {}
+    print(f"{'benchmark':<22} {'median':>11} {'iqr':>11} {'min':>11} {'vs baseline':>12}")
+    for name in names:
+        bench = BENCHMARKS[name]
+        bench = Benchmark(bench.name, bench.setup, bench.number, max(3, round(bench.repeat * args.repeat_scale)), bench.warmup)
+        result = run_benchmark(bench)
+        results[name] = result
+        reference: Optional[Dict[str, float]] = baseline.get(name)
+        delta = f"{result['median_s'] / reference['median_s'] - 1.0:+11.1%}" if reference else f"{'-':>11}"
+        print(
+            f"{name:<22} {_format_time(result['median_s'])} {_format_time(result['iqr_s'])} "
+            f"{_format_time(result['min_s'])} {delta}"
+        )
+
+    machine = {"platform": platform.platform(), "python": platform.python_version(), "processor": platform.processor()}
+    payload = {"machine": machine, "results": results}
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(payload, indent=2))
+    if args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        if args.baseline.exists() and args.only:
+            # Partial runs only refresh their own entries
+            previous = json.loads(args.baseline.read_text())
+            previous["results"].update(results)
+            payload = {"machine": machine, "results": previous["results"]}
+        args.baseline.write_text(json.dumps(payload, indent=2))
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"REGRESSION (> {args.threshold:.0%} slower than {args.baseline}): {', '.join(regressions)}")
+        return 1
+    if baseline:
+        print(f"OK: no median more than {args.threshold:.0%} slower than {args.baseline}")
+    else:
+        print(f"No baseline at {args.baseline}, run with --update-baseline to record one")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""Scaling benchmark of the simulator.
+
+Every combination of grid size, initial healthy cells and number of sources
+is measured in a fresh worker process, so that the peak resident memory of
+a case is not inflated by the previous ones. For each case the suite times
+the construction of the ``Controller``, ``go()`` (per simulated hour),
+``irradiate()`` and ``set_grid()``, and records the cells cycled per second
+(``Controller.stats()``), the estimated memory of the simulator, the
+resident memory of the worker before the construction (Python and the
+imported packages) and its peak RSS. The results are written to a JSON
+file and can be rendered as scaling curves::
+
+    python -m rein.bench.scaling --sizes 21 32 64 96 128 --hours 24 --output bench/scaling.json --plot bench/scaling.png
+    python -m rein.bench.scaling --replot bench/scaling.json --plot bench/scaling.png
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import multiprocessing as mp
+import platform
+import resource
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+
+@dataclass
+class ScalingCase:
+    """Parameters of one measured configuration (cubic grids)."""
+
+    size: int = 21
+    hcells: int = 1_000
+    sources_num: int = 20
+    warmup_hours: int = 24  # Hours simulated before the timed ones
+    hours: int = 24  # Timed calls to go()
+    dose: float = 2.0
+    seed: int = 0
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of the current process, in MiB (ru_maxrss is in KiB on Linux)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if platform.system() == "Darwin" else peak / 1024.0
+
+
+def _rss_mb() -> float:
+    """Current resident set size in MiB (falls back to the peak where /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as fp:
+            pages = int(fp.read().split()[1])
+        return pages * resource.getpagesize() / 2**20
+    except OSError:
+        return _peak_rss_mb()
+
+
+def run_case(case: ScalingCase) -> Dict[str, Any]:
+    """Measure one configuration in the current process and return its results."""
+    from rein import cell_sim
+
+    baseline_rss_mb = _rss_mb()
+    cell_sim.seed(case.seed)
+    cell_sim.seed_cells(case.seed)
+    start = time.perf_counter()
+    ctrl = cell_sim.Controller(case.size, case.size, case.size, case.sources_num, 2.0, 4.0, case.hcells, 1)
+    construct_s = time.perf_counter() - start
+
+    for _ in range(case.warmup_hours):
+        ctrl.go()
+    snapshot = ctrl.grid.clone()
+
+    ctrl.reset_stats()
+    start = time.perf_counter()
+    for _ in range(case.hours):
+        ctrl.go()
+    go_s = (time.perf_counter() - start) / max(case.hours, 1)
+    stats = ctrl.stats()
+    cells = sum(ctrl.get_cell_counts())
+
+    start = time.perf_counter()
+    ctrl.irradiate(case.dose)
+    irradiate_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ctrl.set_grid(snapshot)
+    set_grid_s = time.perf_counter() - start
+
+    cycled = stats["cells_cycled"] + stats["pooled_cycled"]
+    return {
+        **asdict(case),
+        "voxels": case.size**3,
+        "cells": int(cells),
+        "construct_s": construct_s,
+        "go_s": go_s,
+        "cycle_cells_s": stats["cycle_cells_s"] / max(case.hours, 1),
+        "diffuse_s": stats["diffuse_s"] / max(case.hours, 1),
+        "irradiate_s": irradiate_s,
+        "set_grid_s": set_grid_s,
+        "cells_per_s": cycled / (go_s * case.hours) if go_s > 0 and case.hours else 0.0,
+        "estimated_mb": stats["estimated_bytes"] / 2**20,
+        "baseline_rss_mb": baseline_rss_mb,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def run_suite(cases: Sequence[ScalingCase], *, verbose: bool = True) -> List[Dict[str, Any]]:
+    """Run every case in its own worker process, one at a time (timings are not shared with other cases)."""
+    results: List[Dict[str, Any]] = []
+    ctx = mp.get_context("spawn")
+    for case in cases:
+        with ctx.Pool(processes=1) as pool:
+            result = pool.apply(run_case, (case,))
+        results.append(result)
+        if verbose:
+            print(
+                f"size {case.size:4d}  hcells {case.hcells:7d}  sources {case.sources_num:4d}  "
+                f"cells {result['cells']:8d}  go {result['go_s'] * 1e3:9.2f} ms/h  "
+                f"{result['cells_per_s'] / 1e6:6.2f} Mcells/s  peak RSS {result['peak_rss_mb']:8.1f} MiB "
+                f"(+{result['peak_rss_mb'] - result['baseline_rss_mb']:.1f})"
+            )
+    return results
+
+
+def plot_scaling(results: Sequence[Dict[str, Any]], save_to: Path | str | None = None):
+    """Plot time per hour, throughput, memory and setup costs against the number of voxels."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(2, 2, figsize=(11, 8))
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for result in results:
+        result = {**result, "simulator_rss_mb": result["peak_rss_mb"] - result.get("baseline_rss_mb", 0.0)}
+        groups.setdefault((result["hcells"], result["sources_num"]), []).append(result)
+
+    panels = [
+        (axes[0, 0], "go_s", 1e3, "go() [ms / hour]"),
+        (axes[0, 1], "cells_per_s", 1e-6, "Cells cycled [M / s]"),
+        (axes[1, 0], "simulator_rss_mb", 1.0, "Peak RSS above the baseline [MiB]"),
+        (axes[1, 1], "set_grid_s", 1e3, "set_grid() [ms]"),
+    ]
+    for (hcells, sources_num), rows in sorted(groups.items()):
+        rows = sorted(rows, key=lambda row: row["voxels"])
+        voxels = [row["voxels"] for row in rows]
+        label = f"hcells={hcells}, sources={sources_num}"
+        for ax, key, scale, _ in panels:
+            ax.plot(voxels, [row[key] * scale for row in rows], marker="o", label=label)
+        axes[1, 1].plot(
+            voxels, [row["construct_s"] * 1e3 for row in rows], marker="x", linestyle="--", label=f"construction, {label}"
+        )
+
+    for ax, _, _, ylabel in panels:
+        ax.set_xscale("log")
+        ax.set_xlabel("Voxels")
+        ax.set_ylabel(ylabel)
+        ax.grid(True, linestyle="--", linewidth=0.5, alpha=0.6)
+    for ax in (axes[0, 0], axes[1, 0], axes[1, 1]):
+        ax.set_yscale("log")
+    axes[1, 1].set_ylabel("set_grid() / construction [ms]")
+    axes[0, 0].legend(fontsize="small")
+    axes[1, 1].legend(fontsize="x-small")
+    fig.suptitle("Simulator scaling")
+    fig.tight_layout()
+
+    if save_to is not None:
+        Path(save_to).parent.mkdir(parents=True, exist_ok=True)
+        fig.savefig(Path(save_to), bbox_inches="tight")
+    return fig
+
+
+def parse_args() -> argparse.Namespace:
+    defaults = ScalingCase()
+    parser = argparse.ArgumentParser(description="Scaling benchmark of the simulator")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[21, 32, 64, 128], help="Grid sizes (cubic grids)")
+    parser.add_argument("--hcells", type=int, nargs="+", default=[defaults.hcells], help="Initial healthy cells")
+    parser.add_argument("--sources", type=int, nargs="+", default=[defaults.sources_num], help="Number of nutrient sources")
+    parser.add_argument("--warmup-hours", type=int, default=defaults.warmup_hours, help="Hours simulated before the timing")
+    parser.add_argument("--hours", type=int, default=defaults.hours, help="Timed hours")
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="Simulator seed")
+    parser.add_argument("--output", type=Path, default=Path("bench/scaling.json"), help="JSON results file")
+    parser.add_argument("--plot", type=Path, default=None, help="Optional image of the scaling curves")
+    parser.add_argument("--replot", type=Path, default=None, help="Only plot an existing results file")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.replot is not None:
+        results = json.loads(args.replot.read_text())["results"]
+    else:
+        cases = [
+            ScalingCase(
+                size=size,
+                hcells=hcells,
+                sources_num=sources,
+                warmup_hours=args.warmup_hours,
+                hours=args.hours,
+                seed=args.seed,
+            )
+            for size, hcells, sources in itertools.product(args.sizes, args.hcells, args.sources)
+        ]
+        results = run_suite(cases)
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        machine = {"platform": platform.platform(), "python": platform.python_version(), "processor": platform.processor()}
+        args.output.write_text(json.dumps({"machine": machine, "results": results}, indent=2))
+        print(f"Saved results to {args.output}")
+    if args.plot is not None:
+        plot_scaling(results, save_to=args.plot)
+        print(f"Saved scaling curves to {args.plot}")
+
+
+if __name__ == "__main__":
+    main()
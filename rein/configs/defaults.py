@@ -11,13 +11,32 @@ class AIConfig:
     """Consolidated DQN training hyper-parameters."""
 
     gamma: float = 0.995  # Discount factor
+    n_step: int = 1  # Rewards summed into each bootstrapped target (1 = one-step DQN)
     learning_rate: float = 3e-4  # Optimizer step size
     batch_size: int = 64  # Samples per training update
+    updates_per_step: float = 1.0  # Gradient updates per environment step (fractions accumulate, 0.25 = every 4 steps)
     buffer_size: int = 500_000  # Replay memory capacity
     min_buffer_size: int = 20_000  # Warm-up transitions before learning
+    replay_storage: str = "memory"  # Replay columns in RAM ("memory"), np.memmap files ("memmap") or device tensors ("device")
+    replay_memmap_window: int = 4_096  # Transitions kept in RAM before being written to the memmap files
+    replay_staging_size: int = 256  # Transitions staged on the host before a block copy to the "device" storage
+    replay_checkpoint_format: str = "segments"  # Replay checkpoints as appended segments ("segments") or full copies ("full")
+    replay_max_segments: int = 64  # Live segments before a replay checkpoint compacts them into one
+    num_envs: int = 1  # Environments stepped together, with one batched action selection per tick
+    pipeline_max_lag: int = 0  # Updates the acting policy may lag while the next env step runs on a worker thread (0 = serial loop)
+    actors: int = 0  # Actor processes feeding the learner (Ape-X style); 0 acts and learns on one thread
+    actor_sync_interval: int = 100  # Learner updates between two publications of the policy weights to the actors
+    actor_epsilon: float = 0.4  # Base of the per-actor exploration rates, base ** (1 + alpha * i / (actors - 1))
+    actor_epsilon_alpha: float = 7.0  # Spread of the per-actor exploration rates
+    prefetch_batches: int = 0  # Mini-batches sampled ahead by a background thread (0 samples inside update())
     target_update_interval: int = 2_000  # Steps between target syncs
     hidden_sizes: Tuple[int, ...] = (64, 64)  # Q-network layer widths
     gradient_clip: float | None = 10.0  # Max gradient norm (None disables)
+    prioritized_replay: bool = False  # Sample transitions by TD error (sum-tree) instead of uniformly
+    per_alpha: float = 0.6  # Priority exponent (0 = uniform)
+    per_beta_start: float = 0.4  # Initial importance-sampling exponent, annealed to 1
+    per_beta_steps: int = 600_000  # Updates over which beta reaches 1
+    per_epsilon: float = 1e-6  # Added to the absolute TD errors so no priority is zero
 
     device: str = "cuda"  # Preferred compute device
 
@@ -34,6 +53,10 @@ class AIConfig:
     episodes: int = 8_000  # Training episodes count
 
     growth_hours: int = 100  # Pre-episode growth duration
+    scenario_library: Path | None = None  # Optional library of initial grids sampled at reset
+    fidelity: str = "full"  # Simulator fidelity: "full" (agent-based) or "coarse" (population counts)
+    hybrid_distance: float = 0.0  # Healthy tissue beyond this distance from the tumor is stored as densities (0 = off)
+    quiescent_pooling: bool = False  # Keep quiescent healthy cells as per-voxel aggregates
     max_steps: int = 2_000  # Max steps per episode
     episode_timeout_hours: int = 1_600  # Simulated hours before declaring timeout
 
@@ -43,6 +66,14 @@ class AIConfig:
     save_agent_path: Path = Path("results/dqn_agent")  # Checkpoint directory
     eval_episodes: int = 10  # Greedy evaluation episodes
     save_episodes: int = 10  # Episode interval for checkpoints
+    timing_summary_interval: int = 10  # Episodes between timing summaries (0 disables)
+    profile_episodes: Tuple[int, int] | None = None  # Inclusive episode window to profile (None disables)
+    profile_mode: str = "cprofile"  # Profiler of the window: "cprofile" (.prof) or "torch" (Chrome trace)
+    metrics_port: int | None = None  # Serve Prometheus metrics on localhost at this port (None disables)
+    memory_diagnostics: bool = False  # Sample the memory every episode into memory_log.csv
+    memory_window: int = 20  # Episodes over which a steady memory growth is detected
+    memory_growth_threshold_mb: float = 32.0  # Growth over the window that flags a series (MiB)
+    memory_top_n: int = 5  # Python allocation sites logged per episode
 
     resume: bool = False  # Whether to resume training from disk
     resume_from: Path | None = None  # Optional directory for the resume checkpoint
@@ -81,7 +112,6 @@ REDUCE_LR_ON_PLATEAU_PARAMS: Dict[str, Any] = {
     "threshold_mode": "abs",
     "cooldown": 0,
     "min_lr": 1e-6,
-    "verbose": False,
 }
 
 
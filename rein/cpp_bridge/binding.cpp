@@ -1,6 +1,8 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
+#include <pybind11/numpy.h>
 #include <cstdlib>
+#include <string>
 
 // Expose private members in this TU to bind internal fields like `grid`
 #define private public
@@ -12,11 +14,110 @@
 
 namespace py = pybind11;
 
+using IntArray = py::array_t<int, py::array::c_style | py::array::forcecast>;
+using DoubleArray = py::array_t<double, py::array::c_style | py::array::forcecast>;
+
+// Check that a [z][x][y] array matches the reference shape and return its data
+template <typename T>
+static const T *checked_data(const py::array_t<T, py::array::c_style | py::array::forcecast> &arr,
+                             const py::array &ref, const std::string &name) {
+  if (arr.ndim() != 3)
+    throw py::value_error(name + " must be a 3-D array indexed [z, x, y]");
+  for (int d = 0; d < 3; ++d) {
+    if (arr.shape(d) != ref.shape(d))
+      throw py::value_error(name + " must have the same shape as healthy_counts");
+  }
+  return arr.data();
+}
+
+// Copy a contiguous [z][x][y] array of the grid into a NumPy array (same layout, one memcpy)
+template <typename T>
+static py::array_t<T> voxel_array(const Grid &grid, const T *data) {
+  return py::array_t<T>({grid.zsize, grid.xsize, grid.ysize}, data);
+}
+
+// Build a Grid in bulk from per-voxel occupancy arrays (see Grid's array constructor)
+static Grid *grid_from_arrays(IntArray healthy, IntArray cancer, py::object oar,
+                              py::object glucose, py::object oxygen,
+                              py::object sources, int sources_num,
+                              py::object seed) {
+  if (healthy.ndim() != 3)
+    throw py::value_error("healthy_counts must be a 3-D array indexed [z, x, y]");
+  int zsize = static_cast<int>(healthy.shape(0));
+  int xsize = static_cast<int>(healthy.shape(1));
+  int ysize = static_cast<int>(healthy.shape(2));
+
+  const int *cancer_data = checked_data(cancer, healthy, "cancer_counts");
+  IntArray oar_arr;
+  const int *oar_data = nullptr;
+  if (!oar.is_none()) {
+    oar_arr = oar.cast<IntArray>();
+    oar_data = checked_data(oar_arr, healthy, "oar_counts");
+  }
+
+  // Explicit source positions replace the random placement
+  IntArray source_arr;
+  if (!sources.is_none()) {
+    source_arr = sources.cast<IntArray>();
+    if (source_arr.ndim() != 2 || source_arr.shape(1) != 3)
+      throw py::value_error("sources must be an (n, 3) array of (x, y, z) positions");
+    auto pos = source_arr.unchecked<2>();
+    for (py::ssize_t s = 0; s < pos.shape(0); ++s) {
+      if (pos(s, 0) < 0 || pos(s, 0) >= xsize || pos(s, 1) < 0 ||
+          pos(s, 1) >= ysize || pos(s, 2) < 0 || pos(s, 2) >= zsize)
+        throw py::value_error("source position outside of the grid");
+    }
+    sources_num = 0;
+  }
+
+  if (!seed.is_none()) {
+    unsigned int s = seed.cast<unsigned int>();
+    std::srand(s);
+    seed_cell_generator(s);
+  }
+
+  Grid *grid = new Grid(xsize, ysize, zsize, sources_num, healthy.data(),
+                        cancer_data, oar_data);
+
+  if (!sources.is_none()) {
+    auto pos = source_arr.unchecked<2>();
+    for (py::ssize_t s = 0; s < pos.shape(0); ++s)
+      grid->getSources()->add(pos(s, 0), pos(s, 1), pos(s, 2));
+  }
+
+  DoubleArray glu_arr, oxy_arr;
+  const double *glu_data = nullptr;
+  const double *oxy_data = nullptr;
+  if (!glucose.is_none()) {
+    glu_arr = glucose.cast<DoubleArray>();
+    glu_data = checked_data(glu_arr, healthy, "glucose");
+  }
+  if (!oxygen.is_none()) {
+    oxy_arr = oxygen.cast<DoubleArray>();
+    oxy_data = checked_data(oxy_arr, healthy, "oxygen");
+  }
+  grid->set_nutrients(glu_data, oxy_data);
+  return grid;
+}
+
 PYBIND11_MODULE(cell_sim, m) {
   m.doc() = "Python bindings for the C++ cell simulation Controller";
 
   // Expose Grid minimally, focusing on deep-copy helpers
   py::class_<Grid>(m, "Grid")
+      // Bulk construction from NumPy occupancy arrays
+      .def_static("from_arrays", &grid_from_arrays, py::arg("healthy_counts"),
+                  py::arg("cancer_counts"), py::arg("oar_counts") = py::none(),
+                  py::arg("glucose") = py::none(),
+                  py::arg("oxygen") = py::none(),
+                  py::arg("sources") = py::none(),
+                  py::arg("sources_num") = 20, py::arg("seed") = py::none(),
+                  py::return_value_policy::take_ownership,
+                  "Build a Grid from per-voxel cell counts indexed [z, x, y]. "
+                  "glucose/oxygen default to the Grid initial levels; sources "
+                  "is an optional (n, 3) array of (x, y, z) positions, "
+                  "otherwise sources_num sources are placed at random. seed "
+                  "reseeds the C++ RNGs before the cells are drawn")
       // Python's copy.copy(obj)
       .def("__copy__",
            [](const Grid &self) {
@@ -31,12 +132,71 @@ PYBIND11_MODULE(cell_sim, m) {
       .def(
           "clone", [](const Grid &self) { return Grid(self); },
           "Return a deep-copied Grid")
+      // Binary snapshot of the full grid state (cells, nutrients, sources)
+      .def(
+          "to_bytes",
+          [](const Grid &self) { return py::bytes(self.serialize()); },
+          "Serialize the Grid into bytes")
+      .def_static(
+          "from_bytes",
+          [](py::bytes data) {
+            std::string_view view(data);
+            return Grid::deserialize(view.data(), view.size());
+          },
+          py::arg("data"), py::return_value_policy::take_ownership,
+          "Rebuild a Grid from the output of to_bytes()")
+      // Pickle support, used to ship grids between worker processes
+      .def(py::pickle(
+          [](const Grid &self) { return py::bytes(self.serialize()); },
+          [](py::bytes data) {
+            std::string_view view(data);
+            return Grid::deserialize(view.data(), view.size());
+          }))
       .def("get_cell_counts", &Grid::getCellCounts,
            "Return [healthy_count, cancer_count] tracked on this Grid")
       .def_property_readonly(
           "cell_counts",
           [](const Grid &self) { return self.getCellCounts(); },
-          "[healthy_count, cancer_count] for this Grid");
+          "[healthy_count, cancer_count] for this Grid")
+      // Hybrid continuum/agent mode
+      .def_property_readonly("hybrid_distance", &Grid::get_hybrid_distance,
+                             "Distance beyond which healthy tissue is stored "
+                             "as densities (0 when the mode is disabled)")
+      .def_property_readonly("field_count", &Grid::getFieldCount,
+                             "Healthy cells stored as densities")
+      .def(
+          "field_densities",
+          [](const Grid &self) {
+            py::array_t<double> out({self.zsize, self.xsize, self.ysize});
+            auto view = out.mutable_unchecked<3>();
+            for (int k = 0; k < self.zsize; ++k)
+              for (int i = 0; i < self.xsize; ++i)
+                for (int j = 0; j < self.ysize; ++j)
+                  view(k, i, j) = self.getFieldDensity(i, j, k);
+            return out;
+          },
+          "Healthy density of every voxel indexed [z, x, y] (0 for the "
+          "voxels simulated with agents)")
+      // Per-voxel arrays, copied from the contiguous buffers of the grid
+      .def(
+          "glucose",
+          [](const Grid &self) { return voxel_array(self, self.glucose); },
+          "Glucose of every voxel indexed [z, x, y] (copy)")
+      .def(
+          "oxygen",
+          [](const Grid &self) { return voxel_array(self, self.oxygen); },
+          "Oxygen of every voxel indexed [z, x, y] (copy)")
+      .def(
+          "neigh_counts",
+          [](const Grid &self) { return voxel_array(self, self.neigh_counts); },
+          "Neighbor counters of every voxel indexed [z, x, y] (copy)")
+      // Quiescent pooling
+      .def_property_readonly("quiescent_pooling", &Grid::get_quiescent_pooling,
+                             "Whether quiescent healthy cells are pooled")
+      .def_property_readonly(
+          "pooled_count",
+          [](const Grid &self) { return self.getPooledCount(); },
+          "Number of quiescent healthy cells kept in the per-voxel pools");
 
   py::class_<Controller>(m, "Controller")
       // Constructor
@@ -49,11 +209,23 @@ PYBIND11_MODULE(cell_sim, m) {
           "grid", [](Controller &self) -> Grid & { return *self.grid; },
           py::return_value_policy::reference,
           "Underlying simulation Grid object")
-      // Advance simulation by one hour
-      .def("go", &Controller::go, "Advance the simulation by one hour")
+      // Advance simulation by one hour. The simulation touches no Python
+      // object, so the GIL is released and other Python threads (e.g. the
+      // learner of the pipelined training loop) keep running meanwhile
+      .def("go", &Controller::go, py::call_guard<py::gil_scoped_release>(),
+           "Advance the simulation by one hour")
       // Replace the internal grid content via deep copy (no pointer swap)
       .def("set_grid", &Controller::set_grid, py::arg("grid"),
            "Deep-copy the given Grid into the controller's internal grid")
+      // Hybrid continuum/agent mode
+      .def("set_hybrid", &Controller::set_hybrid, py::arg("distance"),
+           "Store the healthy tissue farther than `distance` voxels from the "
+           "tumor center as densities, promoted back to agents when the "
+           "tumor or the radiation approaches (0 disables)")
+      .def("set_quiescent_pooling", &Controller::set_quiescent_pooling,
+           py::arg("enabled"),
+           "Keep the quiescent healthy cells as per-voxel aggregates, "
+           "expanded back to cells when they wake up or are irradiated")
       // Compute save intervals
       .def("get_intervals", &Controller::get_intervals, py::arg("num_hour"),
            py::arg("divisor"), "Compute tick intervals for data saving")
@@ -77,6 +249,7 @@ PYBIND11_MODULE(cell_sim, m) {
            py::arg("filename"), "Write buffered cell counts to a text file")
       // Apply radiation dose
       .def("irradiate", &Controller::irradiate, py::arg("dose"),
+           py::call_guard<py::gil_scoped_release>(),
            "Irradiate the tumor with a certain dose")
       // Treatment method: irradiate and simulate treatment cycles
       .def("test_treatment", &Controller::test_treatment, py::arg("week"),
@@ -86,10 +259,50 @@ PYBIND11_MODULE(cell_sim, m) {
       // Check and control tick variable
       .def_readwrite("tick", &Controller::tick, "Current simulation tick")
       .def("get_cell_counts", &Controller::get_cell_counts,
-           "Return [HealthyCell::count, CancerCell::count]")
+           "Return [healthy_count, cancer_count], field densities included")
+      // Per-phase timers, work counters and memory estimates
+      .def(
+          "stats",
+          [](const Controller &self) {
+            SimStats stats = self.get_stats();
+            py::dict out;
+            out["enabled"] = stats.enabled;
+            out["hours"] = stats.timers.hours;
+            out["irradiations"] = stats.timers.irradiations;
+            out["fill_sources_s"] = stats.timers.fill_sources_s;
+            out["cycle_cells_s"] = stats.timers.cycle_cells_s;
+            out["diffuse_s"] = stats.timers.diffuse_s;
+            out["compute_center_s"] = stats.timers.compute_center_s;
+            out["irradiate_s"] = stats.timers.irradiate_s;
+            out["voxels_visited"] = stats.work.voxels_visited;
+            out["voxels_irradiated"] = stats.work.voxels_irradiated;
+            out["cells_cycled"] = stats.work.cells_cycled;
+            out["pooled_cycled"] = stats.work.pooled_cycled;
+            out["cells_born"] = stats.work.cells_born;
+            out["cells_died"] = stats.work.cells_died;
+            out["cells_killed"] = stats.work.cells_killed;
+            out["live_cells"] = stats.live_cells;
+            out["live_nodes"] = stats.live_nodes;
+            out["cell_bytes"] = stats.cell_bytes;
+            out["node_bytes"] = stats.node_bytes;
+            out["grid_bytes"] = stats.grid_bytes;
+            out["estimated_bytes"] =
+                stats.cell_bytes + stats.node_bytes + stats.grid_bytes;
+            return out;
+          },
+          "Return the per-phase timers (seconds), work counters and memory "
+          "estimates accumulated since the last reset_stats()")
+      .def("reset_stats", &Controller::reset_stats,
+           "Reset the per-phase timers and the work counters")
 
       ;
 
   // For using C++ random numbers in Python
   m.def("seed", [](unsigned int s) { std::srand(s); }, "Seed the C++ RNG");
+  m.def("seed_cells", &seed_cell_generator, py::arg("seed"),
+        "Seed the C++ generator of the cells (efficiencies, radiation)");
+  m.def("angiogenesis_reference", &angiogenesis_reference, py::arg("xsize"),
+        py::arg("ysize"), py::arg("zsize"),
+        "Number of cancer cells above which the nutrient sources always "
+        "move toward the tumor on a grid of the given size");
 }
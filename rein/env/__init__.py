@@ -1,6 +1,9 @@
 """Environment package for reinforcement learning components."""
 
 from .rl_env import CellSimEnv
+from .vector_env import CellSimVectorEnv
+from .coarse import CoarseController, compare_trajectories
+from .scenario_library import ScenarioLibrary, ScenarioSpec, build_scenario_library
 from .reward import (
     RewardConsts,
     DEFAULTS,
@@ -12,6 +15,12 @@ from .reward import (
 
 __all__ = [
     "CellSimEnv",
+    "CellSimVectorEnv",
+    "CoarseController",
+    "compare_trajectories",
+    "ScenarioLibrary",
+    "ScenarioSpec",
+    "build_scenario_library",
     "RewardConsts",
     "DEFAULTS",
     "reward_k",
@@ -0,0 +1,631 @@
+"""Coarse-grained population model of the cell simulator.
+
+:class:`CoarseController` replaces the individual cells of a ``Grid`` with
+per-voxel population counts, one per cell-cycle compartment (stage and age
+in hours), and advances them with the rules of ``cell.cpp`` and
+``grid.cpp`` applied to whole populations:
+
+- nutrient sources, diffusion and the daily tumor center are the same as
+  in ``Controller::go()``;
+- a voxel feeds its cells in list order (cancer cells first) with the
+  average consumption of each type, the cells that find the nutrients
+  below the critical levels die;
+- healthy cells in gap 1 become quiescent (and quiescent cells wake up)
+  with the same nutrient and density thresholds;
+- mitosis places newborn cells with the ``rand_min`` / ``rand_adj``
+  rules, and the neighbor counters are updated like in ``cycle_cells()``
+  (deaths only);
+- radiation uses the same dose profile, oxygen modification factor and
+  LQ survival probabilities, drawn as binomials per compartment. The
+  repair delay is modelled as a stalled pool that leaves at a rate of
+  ``1 / repair_time`` per hour.
+
+It mirrors the part of the ``Controller`` API used by :class:`CellSimEnv`
+(``go``, ``irradiate``, ``get_cell_counts``, ``set_grid`` and ``tick``), so
+it can be swapped in with ``CellSimEnv(fidelity="coarse")``.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from rein import cell_sim
+
+# Constants of cell.cpp
+QUIESCENT_GLUCOSE_LEVEL = 17.28
+AVERAGE_GLUCOSE_ABSORPTION = 0.36
+AVERAGE_CANCER_GLUCOSE_ABSORPTION = 0.54
+CRITICAL_NEIGHBORS = 27
+CRITICAL_GLUCOSE_LEVEL = 6.48
+ALPHA_TUMOR, BETA_TUMOR = 0.3, 0.03
+ALPHA_NORM_TISSUE, BETA_NORM_TISSUE = 0.15, 0.03
+REPAIR_TIME = 9
+AVERAGE_OXYGEN_CONSUMPTION = 20.0
+CRITICAL_OXYGEN_LEVEL = 360.0
+QUIESCENT_OXYGEN_LEVEL = 960.0
+
+# Constants of controller.cpp / grid.cpp
+SOURCE_GLUCOSE = 130.0
+SOURCE_OXYGEN = 4500.0
+DIFFUSION_FACTOR = 0.2
+HEALTHY_BIRTH_MAX_DENSITY = 5
+
+# Compartments: gap 1 (ages 0-10), synthesis (0-7), gap 2 (0-3), mitosis and, for healthy cells, quiescence
+G1_LEN, S_LEN, G2_LEN = 11, 8, 4
+G1 = slice(0, G1_LEN)
+S = slice(G1_LEN, G1_LEN + S_LEN)
+G2 = slice(G1_LEN + S_LEN, G1_LEN + S_LEN + G2_LEN)
+M = G1_LEN + S_LEN + G2_LEN
+Q = M + 1
+CYCLE_LEN = M + 1
+HEALTHY_COMPARTMENTS = Q + 1
+CANCER_COMPARTMENTS = CYCLE_LEN
+
+# Radiosensitivity of every compartment (radio_gamma in cell.cpp)
+_GAMMA = np.empty(HEALTHY_COMPARTMENTS)
+_GAMMA[G1] = 1.0
+_GAMMA[S] = 0.75
+_GAMMA[G2] = 1.25
+_GAMMA[M] = 1.25
+_GAMMA[Q] = 0.75
+
+# Layout of a serialized Grid (see Grid::serialize in grid.cpp)
+GRID_HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S4"),
+        ("xsize", "<i4"),
+        ("ysize", "<i4"),
+        ("zsize", "<i4"),
+        ("healthy_count", "<i4"),
+        ("cancer_count", "<i4"),
+        ("sources_num", "<i4"),
+        ("padding", "<i4"),
+        ("cells_num", "<i8"),
+        ("center", "<f8", (3,)),
+    ]
+)
+CELL_RECORD_DTYPE = np.dtype(
+    [
+        ("glu_efficiency", "<f8"),
+        ("oxy_efficiency", "<f8"),
+        ("voxel", "<i4"),
+        ("age", "<i2"),
+        ("repair", "<i2"),
+        ("type", "S1"),
+        ("stage", "S1"),
+        ("padding", "V6"),
+    ]
+)
+
+# Optional trailer of a grid saved in hybrid mode, followed by the field densities, flags, cycle cohorts
+# (FIELD_PHASES per voxel: quiescent, then one per hour of the cycle) and efficiency factor sums
+HYBRID_HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S4"),
+        ("padding", "<i4"),
+        ("hybrid_distance", "<f8"),
+        ("field_count", "<f8"),
+    ]
+)
+
+FIELD_PHASES = CYCLE_LEN + 1
+
+# Quiescent pool of a voxel (QuiescentPool in grid.h), one per voxel after the b"QPL1" trailer header
+QUIESCENT_POOL_DTYPE = np.dtype(
+    [
+        ("count", "<i4"),
+        ("padding", "<i4"),
+        ("factor_sum", "<f8"),
+        ("factor_sqsum", "<f8"),
+    ]
+)
+
+# The 26 neighbor offsets (dz, dx, dy) in the order used by grid.cpp
+_OFFSETS = np.array(
+    [(dz, dx, dy) for dz in (-1, 0, 1) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (dz, dx, dy) != (0, 0, 0)]
+)
+
+
+def parse_grid_bytes(data: bytes) -> Dict[str, object]:
+    """Decode the output of ``Grid.to_bytes()`` into NumPy arrays.
+
+    Returns a dict with the grid ``shape`` (``(zsize, xsize, ysize)``), the
+    tumor ``center`` (x, y, z), ``sources`` as an ``(n, 3)`` array of
+    (x, y, z), the ``glucose``, ``oxygen`` and ``neigh_counts`` arrays, the
+    structured ``cells`` array (:data:`CELL_RECORD_DTYPE`), the
+    ``field_density`` of the healthy cells stored as densities by the hybrid
+    mode with their ``field_phase`` cohorts (last axis: quiescent, then one
+    per hour of the cycle) and the number of ``pooled`` quiescent healthy
+    cells of every voxel (zeros for the grids without those modes).
+    """
+    header = np.frombuffer(data, dtype=GRID_HEADER_DTYPE, count=1)[0]
+    if header["magic"] != b"CSG1":
+        raise ValueError("Data is not a serialized grid")
+    zsize, xsize, ysize = int(header["zsize"]), int(header["xsize"]), int(header["ysize"])
+    shape = (zsize, xsize, ysize)
+    voxels = zsize * xsize * ysize
+    offset = GRID_HEADER_DTYPE.itemsize
+
+    sources = np.frombuffer(data, dtype="<i4", count=3 * int(header["sources_num"]), offset=offset).reshape(-1, 3)
+    offset += sources.nbytes
+    glucose = np.frombuffer(data, dtype="<f8", count=voxels, offset=offset).reshape(shape)
+    offset += glucose.nbytes
+    oxygen = np.frombuffer(data, dtype="<f8", count=voxels, offset=offset).reshape(shape)
+    offset += oxygen.nbytes
+    neigh_counts = np.frombuffer(data, dtype="<i4", count=voxels, offset=offset).reshape(shape)
+    offset += neigh_counts.nbytes
+    cells = np.frombuffer(data, dtype=CELL_RECORD_DTYPE, count=int(header["cells_num"]), offset=offset)
+    offset += cells.nbytes
+    # Optional trailers: densities of the far healthy tissue (hybrid mode) and quiescent pools
+    field_density = np.zeros(shape)
+    field_phase = np.zeros(shape + (FIELD_PHASES,))
+    pooled = np.zeros(shape, dtype=np.int64)
+    while len(data) > offset:
+        magic = bytes(data[offset : offset + 4])
+        if magic == b"HYB2":
+            offset += HYBRID_HEADER_DTYPE.itemsize
+            field_density = np.frombuffer(data, dtype="<f8", count=voxels, offset=offset).reshape(shape)
+            offset += voxels * 9  # densities and field flags
+            field_phase = np.frombuffer(data, dtype="<f8", count=voxels * FIELD_PHASES, offset=offset)
+            field_phase = field_phase.reshape(shape + (FIELD_PHASES,))
+            offset += field_phase.nbytes + voxels * 8  # cohorts and efficiency factor sums
+        elif magic == b"QPL1":
+            offset += 8
+            pools = np.frombuffer(data, dtype=QUIESCENT_POOL_DTYPE, count=voxels, offset=offset)
+            pooled = pools["count"].astype(np.int64).reshape(shape)
+            offset += pools.nbytes
+        else:
+            raise ValueError("Serialized grid has an unexpected size")
+    return {
+        "shape": shape,
+        "center": tuple(float(c) for c in header["center"]),
+        "sources": sources,
+        "glucose": glucose,
+        "oxygen": oxygen,
+        "neigh_counts": neigh_counts,
+        "cells": cells,
+        "field_density": field_density,
+        "field_phase": field_phase,
+        "pooled": pooled,
+    }
+
+
+def _compartment_index(stage: np.ndarray, age: np.ndarray) -> np.ndarray:
+    """Map (stage, age) pairs of the cell records to compartment indices."""
+    index = np.full(stage.shape, Q, dtype=np.int64)
+    for code, block in ((b"1", G1), (b"s", S), (b"2", G2)):
+        mask = stage == code
+        index[mask] = block.start + np.clip(age[mask], 0, block.stop - block.start - 1)
+    index[stage == b"m"] = M
+    return index
+
+
+def _neighbor_sum(values: np.ndarray) -> np.ndarray:
+    """Sum of the 26 neighbors of every voxel over the last three axes (out of bounds voxels count as 0)."""
+    box = np.zeros(values.shape[:-3] + tuple(n + 2 for n in values.shape[-3:]), dtype=values.dtype)
+    box[..., 1:-1, 1:-1, 1:-1] = values
+    box = box[..., :-2, :, :] + box[..., 1:-1, :, :] + box[..., 2:, :, :]
+    box = box[..., :-2, :] + box[..., 1:-1, :] + box[..., 2:, :]
+    box = box[..., :-2] + box[..., 1:-1] + box[..., 2:]
+    box -= values
+    return box
+
+
+_erf = np.vectorize(math.erf, otypes=[float])
+
+
+def _conv(rad: float, x: np.ndarray) -> np.ndarray:
+    """Dose profile of grid.cpp (``conv``)."""
+    denom = 3.8
+    return _erf((rad - x) / denom) - _erf((-rad - x) / denom)
+
+
+class CoarseController:
+    """Population-count counterpart of ``cell_sim.Controller``.
+
+    The cycling compartments (gap 1, synthesis, gap 2 and mitosis) form a
+    24-hour ring: every hour each compartment moves to the next one, so the
+    ``(24, voxels)`` count arrays are rotated by updating ``phase`` instead
+    of moving data. Row ``(c + phase) % 24`` holds compartment ``c``.
+
+    Build it from an existing grid with :meth:`from_grid`; ``set_grid``
+    reloads the populations from another grid of the same size.
+    """
+
+    def __init__(self, xsize: int, ysize: int, zsize: int, seed: int | None = None) -> None:
+        self.shape = (zsize, xsize, ysize)
+        # Same volume-scaled reference as Grid::sourceMove()
+        self.angiogenesis_reference = cell_sim.angiogenesis_reference(xsize, ysize, zsize)
+        self.tick = 0
+        self.rng = np.random.default_rng(seed)
+        voxels = zsize * xsize * ysize
+
+        # Neighbor table, -1 for the out of bounds neighbors
+        k, i, j = np.unravel_index(np.arange(voxels), self.shape)
+        nk = k[:, None] + _OFFSETS[:, 0]
+        ni = i[:, None] + _OFFSETS[:, 1]
+        nj = j[:, None] + _OFFSETS[:, 2]
+        valid = (nk >= 0) & (nk < zsize) & (ni >= 0) & (ni < xsize) & (nj >= 0) & (nj < ysize)
+        self._neighbors = np.where(valid, (nk * xsize + ni) * ysize + nj, -1)
+        self._coords = np.stack([i, j, k], axis=1).astype(float)  # (x, y, z) of every voxel
+
+        self.phase = 0
+        self.healthy = np.zeros((CYCLE_LEN, voxels), dtype=np.int64)
+        self.quiescent = np.zeros(voxels, dtype=np.int64)
+        self.cancer = np.zeros((CYCLE_LEN, voxels), dtype=np.int64)
+        # Cells waiting for the repair of radiation damage (their cycle is stalled), in compartment order
+        self.healthy_repair = np.zeros((HEALTHY_COMPARTMENTS, voxels), dtype=np.int64)
+        self.cancer_repair = np.zeros((CANCER_COMPARTMENTS, voxels), dtype=np.int64)
+        self._repair_columns = np.zeros(0, dtype=np.int64)
+        # Cells per voxel, including the stalled ones
+        self.healthy_count = np.zeros(voxels, dtype=np.int64)
+        self.cancer_count = np.zeros(voxels, dtype=np.int64)
+
+        # Glucose and oxygen share one array so that they diffuse together
+        self.nutrients = np.empty((2, voxels))
+        self.glucose, self.oxygen = self.nutrients
+        self.glucose[:] = 100.0
+        self.oxygen[:] = 1000.0
+        self.neigh_counts = np.zeros(voxels, dtype=np.int64)
+        self.sources = np.zeros((0, 3), dtype=np.int64)
+        self.center = np.zeros(3)
+
+    @classmethod
+    def from_grid(cls, grid: "cell_sim.Grid", seed: int | None = None) -> "CoarseController":
+        """Create a coarse controller holding the populations of ``grid``."""
+        state = parse_grid_bytes(grid.to_bytes())
+        zsize, xsize, ysize = state["shape"]
+        ctrl = cls(xsize, ysize, zsize, seed=seed)
+        ctrl._load(state)
+        return ctrl
+
+    def seed(self, seed: int) -> None:
+        """Reseed the random generator of the model."""
+        self.rng = np.random.default_rng(seed)
+
+    def set_grid(self, grid: "cell_sim.Grid") -> None:
+        """Replace the current populations with the cells of ``grid``."""
+        state = parse_grid_bytes(grid.to_bytes())
+        if state["shape"] != self.shape:
+            raise ValueError(f"Grid shape {state['shape']} does not match the controller shape {self.shape}")
+        self._load(state)
+
+    def _load(self, state: Dict[str, object]) -> None:
+        voxels = self.glucose.size
+        cells = state["cells"]
+        index = _compartment_index(cells["stage"], cells["age"].astype(np.int64))
+        repairing = cells["repair"] > 0
+
+        def histogram(kind: bytes, mask: np.ndarray, size: int) -> np.ndarray:
+            selected = (cells["type"] == kind) & mask
+            flat = np.minimum(index[selected], size - 1) * voxels + cells["voxel"][selected]
+            return np.bincount(flat, minlength=size * voxels).reshape(size, voxels).astype(np.int64)
+
+        healthy = histogram(b"h", ~repairing, HEALTHY_COMPARTMENTS)
+        # The cohorts of the hybrid field voxels (whole numbers of cells) join the compartments of their
+        # position in the cycle, the pooled cells the quiescent populations
+        field = np.rint(state["field_phase"].reshape(voxels, FIELD_PHASES).T).astype(np.int64)
+        self.phase = 0
+        self.healthy = healthy[:CYCLE_LEN] + field[1:]
+        self.quiescent = healthy[Q] + field[0] + state["pooled"].ravel()
+        self.cancer = histogram(b"c", ~repairing, CANCER_COMPARTMENTS)
+        self.healthy_repair = histogram(b"h", repairing, HEALTHY_COMPARTMENTS)
+        self.cancer_repair = histogram(b"c", repairing, CANCER_COMPARTMENTS)
+        self._repair_columns = np.unique(cells["voxel"][repairing]).astype(np.int64)
+        self.healthy_count = self.healthy.sum(0) + self.quiescent + self.healthy_repair.sum(0)
+        self.cancer_count = self.cancer.sum(0) + self.cancer_repair.sum(0)
+
+        self.glucose[:] = state["glucose"].ravel()
+        self.oxygen[:] = state["oxygen"].ravel()
+        self.neigh_counts = state["neigh_counts"].ravel().astype(np.int64)
+        self.sources = state["sources"].astype(np.int64).copy()
+        self.center = np.array(state["center"], dtype=float)
+
+    def _rows(self, compartments: slice | int | np.ndarray) -> np.ndarray | int:
+        """Rows of the cycling arrays holding the given compartments."""
+        if isinstance(compartments, slice):
+            compartments = np.arange(compartments.start, compartments.stop)
+        return (compartments + self.phase) % CYCLE_LEN
+
+    # --- Observations ---
+
+    def compartments(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Healthy ``(25, voxels)`` and cancer ``(24, voxels)`` counts in compartment order, stalled cells included."""
+        order = self._rows(np.arange(CYCLE_LEN))
+        healthy = np.vstack([self.healthy[order], self.quiescent[None]]) + self.healthy_repair
+        cancer = self.cancer[order] + self.cancer_repair
+        return healthy, cancer
+
+    def voxel_sizes(self) -> np.ndarray:
+        """Number of cells of every voxel (flat ``[z][x][y]`` order)."""
+        return self.healthy_count + self.cancer_count
+
+    def get_cell_counts(self) -> List[int]:
+        """Return ``[healthy_count, cancer_count]`` like ``Controller.get_cell_counts``."""
+        return [int(self.healthy_count.sum()), int(self.cancer_count.sum())]
+
+    def clear_tempDataTab(self) -> None:
+        """No buffered voxel data is kept by the coarse model."""
+
+    def clear_tempCellCounts(self) -> None:
+        """No buffered counts are kept by the coarse model."""
+
+    # --- Dynamics ---
+
+    def go(self) -> None:
+        """Advance the populations by one hour (same phases as ``Controller::go``)."""
+        self.fill_sources(SOURCE_GLUCOSE, SOURCE_OXYGEN)
+        self.cycle_cells()
+        self.diffuse(DIFFUSION_FACTOR)
+        self.tick += 1
+        if self.tick % 24 == 0:
+            self.compute_center()
+
+    def fill_sources(self, glu: float, oxy: float) -> None:
+        """Add nutrients at every source and move each source once a day on average."""
+        zsize, xsize, ysize = self.shape
+        x, y, z = self.sources.T
+        voxels = (z * xsize + x) * ysize + y
+        np.add.at(self.glucose, voxels, glu)
+        np.add.at(self.oxygen, voxels, oxy)
+
+        cancer = int(self.cancer_count.sum())
+        for n in np.flatnonzero(self.rng.random(len(self.sources)) < 1.0 / 24.0):
+            x, y, z = (int(v) for v in self.sources[n])
+            if self.rng.random() < cancer / self.angiogenesis_reference:
+                # Movement toward the tumor center
+                cx, cy, cz = self.center
+                x += 1 if x < cx else (-1 if x > cx else 0)
+                y += 1 if y < cy else (-1 if y > cy else 0)
+                z += 1 if z < cz else (-1 if z > cz else 0)
+            else:
+                neighbors = self._neighbors[voxels[n]]
+                target = int(self.rng.choice(neighbors[neighbors >= 0]))
+                z, rem = divmod(target, xsize * ysize)
+                x, y = divmod(rem, ysize)
+            self.sources[n] = (x, y, z)
+
+    def _feed(self, pools: Tuple[np.ndarray, ...], count: np.ndarray, per_cell_glucose, per_cell_oxygen) -> None:
+        """Kill the cells that find the voxel nutrients below the critical levels and consume the rest.
+
+        ``pools`` are the arrays holding the cells (last axis over voxels) and
+        ``count`` their total per voxel, both updated in place.
+        """
+        occupied = np.flatnonzero(count)
+        glucose, oxygen = self.glucose[occupied], self.oxygen[occupied]
+        per_glucose = per_cell_glucose[occupied] if np.ndim(per_cell_glucose) else per_cell_glucose
+        per_oxygen = per_cell_oxygen[occupied] if np.ndim(per_cell_oxygen) else per_cell_oxygen
+        fed = np.minimum(
+            np.floor((glucose - CRITICAL_GLUCOSE_LEVEL) / per_glucose) + 1,
+            np.floor((oxygen - CRITICAL_OXYGEN_LEVEL) / per_oxygen) + 1,
+        )
+        ok = (glucose >= CRITICAL_GLUCOSE_LEVEL) & (oxygen >= CRITICAL_OXYGEN_LEVEL)
+        fed = np.where(ok, np.minimum(fed, count[occupied]), 0).astype(np.int64)
+
+        starving = fed < count[occupied]
+        if starving.any():
+            columns = occupied[starving]
+            keep = fed[starving] / count[columns]
+            total = np.zeros(columns.size, dtype=np.int64)
+            for pool in pools:
+                if pool.ndim == 1:
+                    pool[columns] = self.rng.binomial(pool[columns], keep)
+                    total += pool[columns]
+                else:
+                    pool[:, columns] = self.rng.binomial(pool[:, columns], keep)
+                    total += pool[:, columns].sum(0)
+            count[columns] = total
+        self.glucose[occupied] -= count[occupied] * per_glucose
+        self.oxygen[occupied] -= count[occupied] * per_oxygen
+
+    def _remove_dead(self, before: np.ndarray) -> None:
+        """Update the neighbor counters for the cells that died since ``before`` was measured."""
+        dead = before - self.voxel_sizes()
+        columns = np.flatnonzero(dead)
+        if columns.size:
+            neighbors = self._neighbors[columns]
+            valid = neighbors >= 0
+            deaths = np.broadcast_to(dead[columns, None], neighbors.shape)
+            self.neigh_counts -= np.bincount(
+                neighbors[valid], weights=deaths[valid], minlength=dead.size
+            ).astype(np.int64)
+
+    def _place(self, sources: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """Pick a random candidate neighbor for every birth event."""
+        keys = self.rng.random(candidates.shape)
+        keys[~candidates] = -1.0
+        choice = keys.argmax(axis=1)
+        return self._neighbors[sources, choice]
+
+    def cycle_cells(self) -> None:
+        """Advance every population by one hour of its cell cycle."""
+        voxels = self.glucose.size
+        sizes = self.voxel_sizes()
+        density = self.neigh_counts + sizes
+
+        # Cancer cells are first in the voxel lists, so they are fed first
+        self._feed(
+            (self.cancer, self.cancer_repair),
+            self.cancer_count,
+            AVERAGE_CANCER_GLUCOSE_ABSORPTION,
+            AVERAGE_OXYGEN_CONSUMPTION,
+        )
+        # Quiescent healthy cells consume 75% of the nutrients
+        quiescent = self.quiescent + self.healthy_repair[Q]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weight = 1.0 - 0.25 * quiescent / self.healthy_count
+        poor = (
+            (self.glucose < QUIESCENT_GLUCOSE_LEVEL)
+            | (density >= CRITICAL_NEIGHBORS)
+            | (self.oxygen < QUIESCENT_OXYGEN_LEVEL)
+        )
+        good = (
+            (self.glucose > QUIESCENT_GLUCOSE_LEVEL)
+            & (density < CRITICAL_NEIGHBORS)
+            & (self.oxygen > QUIESCENT_OXYGEN_LEVEL)
+        )
+        self._feed(
+            (self.healthy, self.quiescent, self.healthy_repair),
+            self.healthy_count,
+            weight * AVERAGE_GLUCOSE_ABSORPTION,
+            weight * AVERAGE_OXYGEN_CONSUMPTION,
+        )
+        self._remove_dead(sizes)
+
+        # Every cycling compartment moves to the next one, mitosis goes back to gap 1
+        healthy_births = self.healthy[self._rows(M)].copy()
+        cancer_births = self.cancer[self._rows(M)].copy()
+        self.phase = (self.phase - 1) % CYCLE_LEN
+
+        # Healthy gap 1 cells in poor conditions become quiescent, quiescent ones wake up in good conditions
+        poor = np.flatnonzero(poor & (self.healthy_count > 0))
+        if poor.size:
+            rows = self._rows(np.arange(G1.start + 1, G1.stop + 1))[:, None]
+            self.quiescent[poor] += self.healthy[rows, poor].sum(0)
+            self.healthy[rows, poor] = 0
+        good = np.flatnonzero(good & (self.quiescent > 0))
+        self.healthy[self._rows(G1.start), good] += self.quiescent[good]
+        self.quiescent[good] = 0
+
+        # Healthy newborns go to the least populated neighbors with less than 5 cells, otherwise the parent sleeps
+        sizes = self.voxel_sizes()
+        events = np.repeat(np.arange(voxels), healthy_births)
+        if events.size:
+            neighbors = self._neighbors[events]
+            neighbor_sizes = np.where(neighbors >= 0, sizes[neighbors], np.iinfo(np.int64).max)
+            minimum = neighbor_sizes.min(axis=1)
+            placed = minimum < HEALTHY_BIRTH_MAX_DENSITY
+            targets = self._place(events[placed], neighbor_sizes[placed] == minimum[placed, None])
+            sleeping = np.bincount(events[~placed], minlength=voxels)
+            self.healthy[self._rows(G1.start)] -= sleeping
+            self.quiescent += sleeping
+            newborn = np.bincount(targets, minlength=voxels)
+            self.quiescent += newborn
+            self.healthy_count += newborn
+
+        # Cancer newborns go to a random neighbor
+        events = np.repeat(np.arange(voxels), cancer_births)
+        if events.size:
+            targets = self._place(events, self._neighbors[events] >= 0)
+            newborn = np.bincount(targets, minlength=voxels)
+            self.cancer[self._rows(G1.start)] += newborn
+            self.cancer_count += newborn
+        # As in Grid::addToGrid the newborn cells are not added to the neighbor counters
+
+        if self._repair_columns.size:
+            self._repair()
+
+    def _repair(self) -> None:
+        """Release the cells whose radiation damage has been repaired."""
+        columns = self._repair_columns
+        rows = self._rows(np.arange(CYCLE_LEN))[:, None]
+        remaining = np.zeros(columns.size, dtype=np.int64)
+        for stalled, active in ((self.healthy_repair, self.healthy), (self.cancer_repair, self.cancer)):
+            block = stalled[:, columns]
+            waiting = np.nonzero(block)
+            released = np.zeros_like(block)
+            released[waiting] = self.rng.binomial(block[waiting], 1.0 / REPAIR_TIME)
+            block -= released
+            stalled[:, columns] = block
+            remaining += block.sum(0)
+            active[rows, columns] += released[:CYCLE_LEN]
+            if stalled is self.healthy_repair:
+                self.quiescent[columns] += released[Q]
+        self._repair_columns = columns[remaining > 0]
+
+    def diffuse(self, diff_factor: float) -> None:
+        """Spread a fraction of the nutrients of every voxel equally to its 26 neighbors."""
+        values = self.nutrients.reshape((2,) + self.shape)
+        spread = _neighbor_sum(values)
+        spread *= diff_factor / 26.0
+        values *= 1.0 - diff_factor
+        values += spread
+
+    def compute_center(self) -> None:
+        """Average position of the cancer cells (NaN without cancer cells, like the C++ division by zero)."""
+        total = self.cancer_count.sum()
+        if total == 0:
+            self.center = np.full(3, np.nan)
+        else:
+            self.center = (self._coords * self.cancer_count[:, None]).sum(0) / total
+
+    def irradiate(self, dose: float) -> None:
+        """Irradiate the tumor with the dose profile of ``Grid::irradiate``."""
+        self.compute_center()
+        if dose == 0 or not self.cancer_count.any():
+            return
+        # tumor_radius() receives the center truncated to integers
+        int_center = np.trunc(self.center)
+        radius = float(np.sqrt(((self._coords[self.cancer_count > 0] - int_center) ** 2).sum(1)).max())
+        radius = max(radius, 3.0)
+
+        dist = np.sqrt(((self._coords - self.center) ** 2).sum(1))
+        sizes = self.voxel_sizes()
+        hit = np.flatnonzero((sizes > 0) & (dist < 3 * radius))
+        multiplicator = dose / _conv(14.0, np.zeros(1))[0]
+        oxygen = self.oxygen[hit] / 100.0
+        omf = (oxygen * 3.0 + 3.0) / (oxygen + 3.0) / 3.0
+        local_dose = multiplicator * _conv(14.0, dist[hit] * 10.0 / radius) * omf
+        # Surviving cells start repairing (repair += round(2 U repair_time) > 0) when the dose exceeds 0.5 Gy
+        damage_probability = np.where(local_dose > 0.5, 1.0 - 1.0 / (4 * REPAIR_TIME), 0.0)
+
+        order = self._rows(np.arange(CYCLE_LEN))[:, None]
+        healthy = np.vstack([self.healthy[order, hit], self.quiescent[None, hit]])
+        cancer = self.cancer[order, hit]
+        for active, stalled, count, alpha, beta in (
+            (healthy, self.healthy_repair, self.healthy_count, ALPHA_NORM_TISSUE, BETA_NORM_TISSUE),
+            (cancer, self.cancer_repair, self.cancer_count, ALPHA_TUMOR, BETA_TUMOR),
+        ):
+            gamma = _GAMMA[: active.shape[0], None]
+            survival = np.exp(gamma * (-(alpha * local_dose) - beta * local_dose**2))
+            survivors = self.rng.binomial(active, survival)
+            damaged = self.rng.binomial(survivors, damage_probability)
+            active[:] = survivors - damaged
+            stalled[:, hit] = self.rng.binomial(stalled[:, hit], survival) + damaged
+            count[hit] = active.sum(0) + stalled[:, hit].sum(0)
+
+        self.healthy[order, hit] = healthy[:CYCLE_LEN]
+        self.quiescent[hit] = healthy[Q]
+        self.cancer[order, hit] = cancer
+        self._repair_columns = np.union1d(self._repair_columns, hit)
+        self._remove_dead(sizes)
+
+
+def compare_trajectories(
+    grid: "cell_sim.Grid",
+    hours: int,
+    dose_every: int = 24,
+    dose: float = 2.0,
+    seed: int = 0,
+) -> Dict[str, np.ndarray]:
+    """Run the agent-based and the coarse model from the same grid and record the counts every hour.
+
+    A ``dose`` is delivered every ``dose_every`` hours (``dose_every=0``
+    disables the radiation). Returns the ``(hours + 1, 2)`` arrays of
+    ``[healthy, cancer]`` counts of both models.
+    """
+    ctrl = cell_sim.Controller(*_grid_shape(grid), 0, 0.0, 0.0, 0, 0)
+    ctrl.set_grid(grid)
+    cell_sim.seed(seed & 0xFFFFFFFF)
+    cell_sim.seed_cells(seed & 0xFFFFFFFF)
+    coarse = CoarseController.from_grid(grid, seed=seed)
+
+    full_counts = [ctrl.get_cell_counts()]
+    coarse_counts = [coarse.get_cell_counts()]
+    for hour in range(1, hours + 1):
+        for model in (ctrl, coarse):
+            if dose_every and hour % dose_every == 0:
+                model.irradiate(dose)
+            model.go()
+        full_counts.append(ctrl.get_cell_counts())
+        coarse_counts.append(coarse.get_cell_counts())
+    return {"full": np.asarray(full_counts), "coarse": np.asarray(coarse_counts)}
+
+
+def _grid_shape(grid: "cell_sim.Grid") -> Tuple[int, int, int]:
+    """Return ``(xsize, ysize, zsize)`` of a grid."""
+    header = np.frombuffer(grid.to_bytes()[: GRID_HEADER_DTYPE.itemsize], dtype=GRID_HEADER_DTYPE)[0]
+    return int(header["xsize"]), int(header["ysize"]), int(header["zsize"])
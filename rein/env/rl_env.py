@@ -7,6 +7,8 @@ environment for controllin radiation treatment.
 from __future__ import annotations
 
 import copy
+from pathlib import Path
+
 import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
@@ -14,7 +16,11 @@ import numpy as np
 from rein import cell_sim
 from rein.configs.defaults import DEFAULT_CONFIG
 
+from .coarse import CoarseController
 from .reward import reward_kd, terminal_reward_kd
+from .scenario_library import ScenarioLibrary
+
+FIDELITIES = ("full", "coarse")
 
 
 class CellSimEnv(gym.Env):
@@ -39,6 +45,10 @@ class CellSimEnv(gym.Env):
         max_wait: int = 24,
         min_dose: float = 0.0,
         min_wait: int = 0,
+        scenario_library: ScenarioLibrary | str | Path | None = None,
+        fidelity: str = "full",
+        hybrid_distance: float = 0.0,
+        quiescent_pooling: bool = False,
     ) -> None:
         """Create the simulation controller and define spaces.
 
@@ -60,6 +70,23 @@ class CellSimEnv(gym.Env):
             Maximum number of hours to advance the simulation after dosing.
         min_wait : int
             Minimum number of hours to advance the simulation after dosing.
+        scenario_library : ScenarioLibrary, str or Path, optional
+            Library of pre-generated initial grids (or its path). When set,
+            every reset loads one of its grids instead of ``reset_grid``.
+        fidelity : {"full", "coarse"}
+            ``"full"`` simulates every cell with ``cell_sim.Controller``;
+            ``"coarse"`` advances per-voxel population counts with
+            :class:`~rein.env.coarse.CoarseController`, initialised from the
+            same grids.
+        hybrid_distance : float
+            With ``fidelity="full"``, healthy tissue farther than this many
+            voxels from the tumor center is simulated as per-voxel densities
+            and turned back into cells when the tumor or the radiation
+            approaches (``Controller.set_hybrid``). ``0`` disables it; the
+            observed counts include the cells stored as densities.
+        quiescent_pooling : bool
+            With ``fidelity="full"``, keep the quiescent healthy cells as
+            per-voxel aggregates (``Controller.set_quiescent_pooling``).
         """
 
         # super().__init__()
@@ -67,6 +94,16 @@ class CellSimEnv(gym.Env):
         # Environment starts open; used by close() idempotency
         self._closed: bool = False
 
+        if fidelity not in FIDELITIES:
+            raise ValueError(f"fidelity must be one of {FIDELITIES}, got {fidelity!r}")
+        self.fidelity = fidelity
+        if hybrid_distance > 0 and fidelity != "full":
+            raise ValueError("hybrid_distance requires fidelity='full'")
+        self.hybrid_distance = float(hybrid_distance)
+        if quiescent_pooling and fidelity != "full":
+            raise ValueError("quiescent_pooling requires fidelity='full'")
+        self.quiescent_pooling = bool(quiescent_pooling)
+
         # Simulator controller
         self.ctrl = cell_sim.Controller(
             xsize,
@@ -78,6 +115,10 @@ class CellSimEnv(gym.Env):
             hcells,
             ccells,
         )
+        if self.hybrid_distance > 0:
+            self.ctrl.set_hybrid(self.hybrid_distance)
+        if self.quiescent_pooling:
+            self.ctrl.set_quiescent_pooling(True)
 
         # Action is (dose, wait_hours)
         if min_dose > max_dose:
@@ -109,15 +150,36 @@ class CellSimEnv(gym.Env):
         # Create a deep-copied snapshot of the current grid for resets
         self.reset_grid = copy.deepcopy(self.ctrl.grid)
 
+        # The coarse model starts from the populations of the same grid
+        if self.fidelity == "coarse":
+            self.ctrl = CoarseController.from_grid(self.reset_grid)
+
+        # Optional library of initial grids sampled at reset time (closed on close() only if opened here)
+        self._owns_library = scenario_library is not None and not isinstance(scenario_library, ScenarioLibrary)
+        if self._owns_library:
+            scenario_library = ScenarioLibrary(scenario_library)
+        if scenario_library is not None:
+            spec = scenario_library.spec
+            if (spec.xsize, spec.ysize, spec.zsize) != (xsize, ysize, zsize):
+                raise ValueError(
+                    f"Scenario library grids are {spec.xsize}x{spec.ysize}x{spec.zsize}, "
+                    f"the environment expects {xsize}x{ysize}x{zsize}"
+                )
+        self.scenario_library = scenario_library
+        self.scenario: int | None = None
+
     def reset(self, *, seed: int | None = None, options: dict | None = None):
         """Reset the simulator state and return initial observation.
 
         Actions performed:
         - Reset the controller's hour tick counter (`ctrl.tick = 0`).
-        - Restore the grid snapshot with `ctrl.set_grid(self.reset_grid)`.
+        - Restore the grid snapshot with `ctrl.set_grid(self.reset_grid)`,
+          or, with a scenario library, load the grid ``options["scenario"]``
+          (sampled with ``np_random`` when not given).
         - Clear controller temporary buffers (voxel and counts).
         - Reset environment bookkeeping (elapsed hours, dose, prev counts).
-        - Optionally reseed RNG when ``seed`` is provided.
+        - Optionally reseed RNG when ``seed`` is provided (the C++ one and,
+          with ``fidelity="coarse"``, the one of the coarse model).
 
         Returns a tuple ``(observation, info)`` as per Gym API.
         """
@@ -133,6 +195,8 @@ class CellSimEnv(gym.Env):
                 cell_sim.seed(int(seed) & 0xFFFFFFFF)
             except Exception:
                 pass
+            if self.fidelity == "coarse":
+                self.ctrl.seed(int(seed))
 
         # Restore simulator state
         try:
@@ -143,12 +207,28 @@ class CellSimEnv(gym.Env):
             if hasattr(self.ctrl, "clear_tempCellCounts"):
                 self.ctrl.clear_tempCellCounts()
 
-            # Restore the grid to the saved initial snapshot
-            self.ctrl.set_grid(self.reset_grid)
+            if self.scenario_library is not None:
+                # Load one of the pre-generated initial grids
+                scenario = (options or {}).get("scenario")
+                if scenario is None:
+                    scenario = int(self.np_random.integers(len(self.scenario_library)))
+                self.scenario = int(scenario)
+                self.ctrl.set_grid(self.scenario_library.load(self.scenario))
+                if self.hybrid_distance > 0:
+                    self.ctrl.set_hybrid(self.hybrid_distance)
+                if self.quiescent_pooling:
+                    self.ctrl.set_quiescent_pooling(True)
+            else:
+                # Restore the grid to the saved initial snapshot
+                self.ctrl.set_grid(self.reset_grid)
         except Exception as e:
             # If anything goes wrong, surface a clear error
             raise RuntimeError(f"Failed to reset simulator: {e}")
 
+        # Simulator timers and work counters are reported per episode
+        if hasattr(self.ctrl, "reset_stats"):
+            self.ctrl.reset_stats()
+
         # Read fresh counts from the restored grid
         counts = self.ctrl.get_cell_counts()
 
@@ -165,6 +245,7 @@ class CellSimEnv(gym.Env):
             "timeout": False,
             "elapsed_hours": self.elapsed_hours,
             "total_dose": self.total_dose,
+            "scenario": self.scenario,
         }
         return observation, info
 
@@ -242,6 +323,9 @@ class CellSimEnv(gym.Env):
             "elapsed_hours": self.elapsed_hours,
             "total_dose": float(self.total_dose),
         }
+        # Timers, work counters and memory estimates of the simulator since the reset
+        if hasattr(self.ctrl, "stats"):
+            info["sim_stats"] = self.ctrl.stats()
 
         # Update previous counts for next step
         self.prev_counts = (healthy, cancer)
@@ -267,6 +351,9 @@ class CellSimEnv(gym.Env):
             except Exception:
                 pass
 
+        if self._owns_library and self.scenario_library is not None:
+            self.scenario_library.close()
+
         # Note: Do not set self.ctrl/reset_grid to None to avoid
         # Optional attribute warnings from static checkers (Pylance).
         # Actual resource release will occur when the env is GC'ed.
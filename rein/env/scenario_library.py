@@ -0,0 +1,246 @@
+"""Library of pre-generated initial grids for :class:`CellSimEnv`.
+
+Building a grid (and growing the tumor before the treatment) is too slow
+to be done at every reset, so the initial conditions are generated once,
+in parallel worker processes, and stored in a single indexed file:
+
+``MAGIC | grid 0 | grid 1 | ... | metadata (JSON) | index | footer``
+
+Every grid is the output of ``cell_sim.Grid.to_bytes()``. The index holds
+one ``(offset, length)`` pair of unsigned 64-bit integers per grid and the
+footer stores the position of the metadata and of the index, so that a
+single grid can be read without loading the rest of the file.
+
+The library can be built from the command line::
+
+    python -m rein.env.scenario_library scenarios.lib --count 2000 --growth-hours 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import multiprocessing as mp
+import struct
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from rein import cell_sim
+
+MAGIC = b"CSLIB001"
+# meta_offset, meta_length, index_offset, count, magic
+FOOTER = struct.Struct("<QQQQ8s")
+
+
+@dataclass
+class ScenarioSpec:
+    """Parameters used to generate every grid of a library."""
+
+    xsize: int = 21
+    ysize: int = 21
+    zsize: int = 21
+    sources_num: int = 20
+    cradius: float = 2.0
+    hradius: float = 4.0
+    hcells: int = 1_000
+    ccells: int = 1
+    growth_hours: int = 0  # Hours simulated after the creation of each grid
+    seed: int = 0  # Grid ``i`` is generated with seed ``seed + i``
+
+
+def _generate_scenario(task: Tuple[ScenarioSpec, int]) -> Tuple[bytes, List[int]]:
+    """Create (and optionally grow) one grid in a worker process."""
+    spec, index = task
+    seed = (spec.seed + index) & 0xFFFFFFFF
+    cell_sim.seed(seed)
+    cell_sim.seed_cells(seed)
+    ctrl = cell_sim.Controller(
+        spec.xsize,
+        spec.ysize,
+        spec.zsize,
+        spec.sources_num,
+        spec.cradius,
+        spec.hradius,
+        spec.hcells,
+        spec.ccells,
+    )
+    for _ in range(spec.growth_hours):
+        ctrl.go()
+    grid = ctrl.grid
+    return grid.to_bytes(), list(grid.cell_counts)
+
+
+def build_scenario_library(
+    path: str | Path,
+    count: int,
+    spec: ScenarioSpec | None = None,
+    workers: int | None = None,
+    chunksize: int = 4,
+) -> Path:
+    """Generate ``count`` initial grids in parallel and store them in ``path``.
+
+    Parameters
+    ----------
+    path : str or Path
+        Destination file, overwritten if it exists.
+    count : int
+        Number of grids to generate.
+    spec : ScenarioSpec, optional
+        Grid and growth parameters; the defaults match :class:`AIConfig`.
+    workers : int, optional
+        Number of worker processes (defaults to the number of CPUs). With
+        ``workers=1`` the grids are generated in the current process.
+    chunksize : int
+        Number of grids sent to a worker at a time.
+
+    Returns
+    -------
+    Path
+        The path of the written library.
+    """
+    if count <= 0:
+        raise ValueError("count must be positive")
+    spec = spec if spec is not None else ScenarioSpec()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tasks = [(spec, i) for i in range(count)]
+    index = np.zeros((count, 2), dtype="<u8")
+    cell_counts: List[List[int]] = []
+
+    def write_all(results) -> None:
+        offset = len(MAGIC)
+        for i, (blob, counts) in enumerate(results):
+            fp.write(blob)
+            index[i] = (offset, len(blob))
+            offset += len(blob)
+            cell_counts.append(counts)
+
+    with path.open("wb") as fp:
+        fp.write(MAGIC)
+        if workers == 1:
+            write_all(map(_generate_scenario, tasks))
+        else:
+            # Results are written in order as soon as they arrive, only one grid per worker is kept in memory
+            with mp.Pool(processes=workers) as pool:
+                write_all(pool.imap(_generate_scenario, tasks, chunksize=chunksize))
+
+        metadata = {"count": count, "spec": asdict(spec), "cell_counts": cell_counts}
+        meta_blob = json.dumps(metadata).encode("utf-8")
+        meta_offset = fp.tell()
+        fp.write(meta_blob)
+        index_offset = fp.tell()
+        fp.write(index.tobytes())
+        fp.write(FOOTER.pack(meta_offset, len(meta_blob), index_offset, count, MAGIC))
+    return path
+
+
+class ScenarioLibrary:
+    """Read-only, lazily loaded view of a scenario library file.
+
+    The file is memory-mapped: opening a library only reads its index and
+    metadata, and every grid is deserialized on demand by :meth:`load`.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._fp = self.path.open("rb")
+        try:
+            self._mm = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._fp.close()
+            raise ValueError(f"Empty scenario library: {self.path}") from None
+
+        if len(self._mm) < len(MAGIC) + FOOTER.size or self._mm[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a scenario library: {self.path}")
+        meta_offset, meta_length, index_offset, count, magic = FOOTER.unpack_from(
+            self._mm, len(self._mm) - FOOTER.size
+        )
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Truncated scenario library: {self.path}")
+
+        self.metadata: Dict[str, Any] = json.loads(self._mm[meta_offset : meta_offset + meta_length])
+        self.spec = ScenarioSpec(**self.metadata["spec"])
+        self._index = np.frombuffer(self._mm, dtype="<u8", count=2 * count, offset=index_offset).reshape(count, 2)
+
+    def __len__(self) -> int:
+        return int(self._index.shape[0])
+
+    def __enter__(self) -> "ScenarioLibrary":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def raw(self, index: int) -> bytes:
+        """Return the serialized grid stored at ``index``."""
+        if not -len(self) <= index < len(self):
+            raise IndexError(f"Scenario index {index} out of range for {len(self)} scenarios")
+        offset, length = (int(v) for v in self._index[index])
+        return self._mm[offset : offset + length]
+
+    def load(self, index: int) -> "cell_sim.Grid":
+        """Deserialize the grid stored at ``index``."""
+        return cell_sim.Grid.from_bytes(self.raw(index))
+
+    def cell_counts(self, index: int) -> Tuple[int, int]:
+        """Return the ``(healthy, cancer)`` counts of a stored grid without loading it."""
+        healthy, cancer = self.metadata["cell_counts"][index]
+        return int(healthy), int(cancer)
+
+    def close(self) -> None:
+        """Release the memory map and the file handle."""
+        # The index is a view on the map, drop it first or the map cannot be closed
+        self._index = np.zeros((0, 2), dtype="<u8")
+        mm = getattr(self, "_mm", None)
+        if mm is not None and not mm.closed:
+            mm.close()
+        self._fp.close()
+
+
+def parse_args() -> argparse.Namespace:
+    """Command line options of the library builder."""
+    defaults = ScenarioSpec()
+    parser = argparse.ArgumentParser(description="Generate a library of initial grids for CellSimEnv")
+    parser.add_argument("output", type=Path, help="Destination library file")
+    parser.add_argument("--count", type=int, default=1_000, help="Number of grids to generate")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all CPUs)")
+    parser.add_argument("--growth-hours", type=int, default=defaults.growth_hours, help="Growth hours applied to every grid")
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="Seed of the first grid")
+    parser.add_argument("--xsize", type=int, default=defaults.xsize, help="Grid size along X axis")
+    parser.add_argument("--ysize", type=int, default=defaults.ysize, help="Grid size along Y axis")
+    parser.add_argument("--zsize", type=int, default=defaults.zsize, help="Grid size along Z axis")
+    parser.add_argument("--sources-num", type=int, default=defaults.sources_num, help="Number of nutrient sources")
+    parser.add_argument("--cradius", type=float, default=defaults.cradius, help="Initial cancer radius")
+    parser.add_argument("--hradius", type=float, default=defaults.hradius, help="Initial healthy radius")
+    parser.add_argument("--hcells", type=int, default=defaults.hcells, help="Number of healthy cells")
+    parser.add_argument("--ccells", type=int, default=defaults.ccells, help="Number of cancer cells")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    spec = ScenarioSpec(
+        xsize=args.xsize,
+        ysize=args.ysize,
+        zsize=args.zsize,
+        sources_num=args.sources_num,
+        cradius=args.cradius,
+        hradius=args.hradius,
+        hcells=args.hcells,
+        ccells=args.ccells,
+        growth_hours=args.growth_hours,
+        seed=args.seed,
+    )
+    path = build_scenario_library(args.output, args.count, spec, workers=args.workers)
+    print(f"Saved {args.count} scenarios to {path}")
+
+
+if __name__ == "__main__":
+    main()
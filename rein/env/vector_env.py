@@ -0,0 +1,61 @@
+"""Several ``CellSimEnv`` stepped together by the vectorised training loop."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .rl_env import CellSimEnv
+
+
+class CellSimVectorEnv:
+    """``num_envs`` independent ``CellSimEnv`` stepped as one batch.
+
+    Unlike gymnasium's vector envs there is no automatic reset: every reset
+    is followed by the growth phase, and the training loop decides when and
+    with which seed each env starts an episode (``reset_at``). ``step``
+    advances the envs listed in ``indices`` (those with a running episode)
+    one after the other and stacks their results.
+    """
+
+    def __init__(self, envs: Sequence[CellSimEnv]) -> None:
+        if not envs:
+            raise ValueError("CellSimVectorEnv needs at least one environment")
+        self.envs: List[CellSimEnv] = list(envs)
+        self.num_envs = len(self.envs)
+        self.single_observation_space = self.envs[0].observation_space
+        self.single_action_space = self.envs[0].action_space
+
+    def reset_at(self, index: int, seed: int | None, growth_hours: int) -> np.ndarray:
+        """Reset env ``index`` with ``seed``, run its growth phase and return the first observation."""
+        env = self.envs[index]
+        state, _ = env.reset(seed=seed)
+        # Grids of a post-growth library already include the growth phase
+        if env.scenario_library is None or env.scenario_library.spec.growth_hours == 0:
+            env.growth(growth_hours)
+        return state
+
+    def step(
+        self,
+        indices: Sequence[int],
+        actions: Sequence[np.ndarray],
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, List[Dict[str, Any]]]:
+        """Step env ``indices[k]`` with ``actions[k]``.
+
+        Returns the stacked observations, rewards, terminated and truncated
+        flags (one row per index) and the list of info dicts.
+        """
+        results = [self.envs[index].step(action) for index, action in zip(indices, actions)]
+        observations, rewards, terminated, truncated, infos = zip(*results)
+        return (
+            np.stack(observations).astype(np.float32, copy=False),
+            np.asarray(rewards, dtype=np.float32),
+            np.asarray(terminated, dtype=bool),
+            np.asarray(truncated, dtype=bool),
+            list(infos),
+        )
+
+    def close(self) -> None:
+        for env in self.envs:
+            env.close()
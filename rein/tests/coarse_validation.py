@@ -0,0 +1,95 @@
+"""Validation report of the coarse-grained simulator against the agent-based one.
+
+Both models start from the same grids (grown with the agent-based model),
+then follow the same schedule: ``growth`` hours without radiation and a
+daily dose afterwards. The report prints, at regular checkpoints, the mean
+healthy and cancer counts of both models over several seeds with their
+relative error, and the wall-clock time of each model.
+
+    python -m rein.tests.coarse_validation --seeds 5 --growth 100 --treatment 240 --csv coarse.csv
+"""
+
+import argparse
+import csv
+import time
+
+import numpy as np
+
+from rein import cell_sim
+from rein.env.coarse import CoarseController
+
+
+def run_model(ctrl, hours, growth, dose):
+    """Advance ``ctrl`` for ``hours`` and return the per-hour counts and the elapsed time."""
+    counts = [ctrl.get_cell_counts()]
+    start = time.perf_counter()
+    for hour in range(1, hours + 1):
+        if hour > growth and (hour - growth) % 24 == 0:
+            ctrl.irradiate(dose)
+        ctrl.go()
+        counts.append(ctrl.get_cell_counts())
+    return np.asarray(counts, dtype=float), time.perf_counter() - start
+
+
+def validate(args):
+    hours = args.growth + args.treatment
+    full_runs, coarse_runs = [], []
+    full_time = coarse_time = 0.0
+    for seed in range(args.seeds):
+        cell_sim.seed(seed)
+        cell_sim.seed_cells(seed)
+        ctrl = cell_sim.Controller(args.size, args.size, args.size, 20, 2.0, 4.0, args.hcells, 1)
+        for _ in range(args.pre_growth):
+            ctrl.go()
+        grid = ctrl.grid
+
+        # Same initial grid for both models
+        coarse = CoarseController.from_grid(grid, seed=seed)
+        counts, elapsed = run_model(ctrl, hours, args.growth, args.dose)
+        full_runs.append(counts)
+        full_time += elapsed
+        counts, elapsed = run_model(coarse, hours, args.growth, args.dose)
+        coarse_runs.append(counts)
+        coarse_time += elapsed
+
+    full = np.mean(full_runs, axis=0)
+    coarse = np.mean(coarse_runs, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        error = np.abs(coarse - full) / full
+
+    rows = []
+    print(f"{'hour':>6} {'full H':>10} {'coarse H':>10} {'err H':>7} {'full C':>10} {'coarse C':>10} {'err C':>7}")
+    for hour in range(0, hours + 1, args.every):
+        rows.append([hour, *full[hour], *coarse[hour], *error[hour]])
+        print(
+            f"{hour:6d} {full[hour, 0]:10.1f} {coarse[hour, 0]:10.1f} {error[hour, 0]:7.1%} "
+            f"{full[hour, 1]:10.1f} {coarse[hour, 1]:10.1f} {error[hour, 1]:7.1%}"
+        )
+    print(f"\nAgent-based model: {full_time / args.seeds:.3f} s per run ({full_time / args.seeds / hours * 1e3:.2f} ms/h)")
+    print(f"Coarse model:      {coarse_time / args.seeds:.3f} s per run ({coarse_time / args.seeds / hours * 1e3:.2f} ms/h)")
+    print(f"Speed-up:          {full_time / coarse_time:.2f}x")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as fp:
+            writer = csv.writer(fp)
+            writer.writerow(["hour", "full_healthy", "full_cancer", "coarse_healthy", "coarse_cancer", "error_healthy", "error_cancer"])
+            writer.writerows(rows)
+        print(f"Saved report to {args.csv}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare the coarse and the agent-based simulator")
+    parser.add_argument("--seeds", type=int, default=5, help="Number of runs averaged per model")
+    parser.add_argument("--size", type=int, default=21, help="Grid size along every axis")
+    parser.add_argument("--hcells", type=int, default=1_000, help="Initial healthy cells")
+    parser.add_argument("--pre-growth", type=int, default=100, help="Hours grown with the agent-based model before the comparison")
+    parser.add_argument("--growth", type=int, default=100, help="Compared hours without radiation")
+    parser.add_argument("--treatment", type=int, default=240, help="Compared hours with a daily dose")
+    parser.add_argument("--dose", type=float, default=2.0, help="Daily dose (Gy)")
+    parser.add_argument("--every", type=int, default=24, help="Hours between two report rows")
+    parser.add_argument("--csv", default=None, help="Optional CSV output path")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    validate(parse_args())
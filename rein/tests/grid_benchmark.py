@@ -0,0 +1,89 @@
+"""Per-tick cost of the simulator at several grid sizes.
+
+For every size the grid is grown for ``--warmup`` hours, then the script
+times ``--hours`` calls to ``Controller.go()`` (total and per phase, from
+``Controller.stats()``) and the deep copy of the grid used by
+``Controller.set_grid()`` at every environment reset.
+
+``--save`` writes the results to a JSON file. ``--baseline`` reads such a
+file, e.g. written with an extension built from an earlier commit, and
+prints the speedup of every measure against it.
+
+    python -m rein.tests.grid_benchmark --sizes 21 64 --save before.json  # previous build
+    python -m rein.tests.grid_benchmark --sizes 21 64 --baseline before.json
+"""
+
+import argparse
+import copy
+import json
+import time
+
+from rein import cell_sim
+
+
+def bench(size, args):
+    cell_sim.seed(args.seed)
+    cell_sim.seed_cells(args.seed)
+    ctrl = cell_sim.Controller(size, size, size, 20, 2.0, 4.0, args.hcells, 1)
+    for _ in range(args.warmup):
+        ctrl.go()
+
+    ctrl.reset_stats()
+    start = time.perf_counter()
+    for _ in range(args.hours):
+        ctrl.go()
+    tick = (time.perf_counter() - start) / args.hours
+    stats = ctrl.stats()
+
+    start = time.perf_counter()
+    for _ in range(args.copies):
+        ctrl.set_grid(copy.deepcopy(ctrl.grid))
+    copy_time = (time.perf_counter() - start) / args.copies
+
+    return {
+        "tick_ms": tick * 1e3,
+        "cycle_ms": stats["cycle_cells_s"] / args.hours * 1e3,
+        "diffuse_ms": stats["diffuse_s"] / args.hours * 1e3,
+        "copy_ms": copy_time * 1e3,
+        "cells": sum(ctrl.get_cell_counts()),
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Per-tick cost of the simulator")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[21, 64], help="Grid sizes (cubic grids)")
+    parser.add_argument("--hcells", type=int, default=1_000, help="Initial healthy cells")
+    parser.add_argument("--seed", type=int, default=0, help="Simulator seed")
+    parser.add_argument("--warmup", type=int, default=100, help="Hours grown before the measure")
+    parser.add_argument("--hours", type=int, default=50, help="Timed hours")
+    parser.add_argument("--copies", type=int, default=10, help="Timed grid copies")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to compare with")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fp:
+            baseline = json.load(fp)
+
+    measures = ("tick_ms", "cycle_ms", "diffuse_ms", "copy_ms")
+    print(f"{'size':>5} {'cells':>7} {'tick ms':>8} {'cycle ms':>9} {'diffuse ms':>11} {'copy ms':>8}")
+    results = {}
+    for size in args.sizes:
+        r = results[str(size)] = bench(size, args)
+        print(
+            f"{size:5d} {r['cells']:7d} {r['tick_ms']:8.2f} {r['cycle_ms']:9.2f} "
+            f"{r['diffuse_ms']:11.2f} {r['copy_ms']:8.2f}"
+        )
+        base = baseline.get(str(size))
+        if base is not None:
+            # Speedup of every measure: baseline time / current time
+            speedups = [base[m] / r[m] if r[m] > 0 else float("nan") for m in measures]
+            print(f"{'':5} {base['cells']:7d} " + " ".join(f"{v:{w}.2f}x" for v, w in zip(speedups, (7, 8, 10, 7))))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fp:
+            json.dump(results, fp, indent=2)
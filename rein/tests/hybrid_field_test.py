@@ -0,0 +1,105 @@
+"""Trajectory comparison between the agent simulation and the hybrid continuum/agent mode.
+
+Every seed is simulated from the same initial grid with agents only and,
+for every ``--distances`` value, with ``Controller.set_hybrid(distance)``:
+tumor growth followed by a daily dose. The mean healthy and cancer counts
+of every hybrid version must not differ from the agent ones: at every
+checkpoint, a two-sided Welch test of the difference of the means has to
+pass at the ``--alpha`` level, Bonferroni-corrected over the checkpoints
+and the two cell types (the statistic is compared to the normal quantile).
+
+    python -m rein.tests.hybrid_field_test --seeds 24 --distances 4 8
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from rein import cell_sim
+
+
+def run(seed, distance, args):
+    """Simulate one trajectory and return the counts at every checkpoint and the elapsed time."""
+    cell_sim.seed(seed)
+    cell_sim.seed_cells(seed)
+    ctrl = cell_sim.Controller(args.size, args.size, args.size, 20, 2.0, 4.0, args.hcells, 1)
+    if distance > 0:
+        ctrl.set_hybrid(distance)
+
+    counts = [ctrl.get_cell_counts()]
+    start = time.perf_counter()
+    for hour in range(1, args.growth + args.treatment + 1):
+        if hour > args.growth and (hour - args.growth) % 24 == 0:
+            ctrl.irradiate(args.dose)
+        ctrl.go()
+        if hour % args.every == 0:
+            counts.append(ctrl.get_cell_counts())
+    elapsed = time.perf_counter() - start
+
+    # The field must survive a save / restore
+    data = ctrl.grid.to_bytes()
+    assert cell_sim.Grid.from_bytes(data).to_bytes() == data
+    return np.asarray(counts, dtype=float), elapsed
+
+
+def simulate(distance, args):
+    runs = [run(seed, distance, args) for seed in range(args.seeds)]
+    return np.asarray([counts for counts, _ in runs]), sum(elapsed for _, elapsed in runs) / args.seeds
+
+
+def welch(a, b):
+    """Welch statistic of the difference of the means of b and a (first axis: samples)."""
+    diff = b.mean(0) - a.mean(0)
+    stderr = np.sqrt(a.var(0, ddof=1) / len(a) + b.var(0, ddof=1) / len(b))
+    # Identical samples (e.g. the initial grid) only match if the means are equal
+    return np.where(stderr > 0, diff / np.where(stderr > 0, stderr, 1.0), np.where(diff == 0, 0.0, np.inf))
+
+
+def compare(args):
+    agents, agents_time = simulate(0.0, args)
+    # Bonferroni correction over the checkpoints and the two cell types
+    limit = statistics.NormalDist().inv_cdf(1 - args.alpha / (2 * agents[0].size))
+    print(f"Largest allowed |Welch statistic|: {limit:.2f}")
+    ok = True
+    for distance in args.distances:
+        hybrid, hybrid_time = simulate(distance, args)
+        stat = welch(agents, hybrid)
+        within = np.abs(stat) <= limit
+
+        print(f"\nHybrid distance {distance:g}")
+        print(f"{'hour':>6} {'agents H':>9} {'hybrid H':>9} {'stat':>6} {'agents C':>9} {'hybrid C':>9} {'stat':>6}")
+        for row in range(agents.shape[1]):
+            flag = "" if within[row].all() else "  <-- different"
+            print(
+                f"{row * args.every:6d} {agents[:, row, 0].mean():9.1f} {hybrid[:, row, 0].mean():9.1f} "
+                f"{stat[row, 0]:6.2f} {agents[:, row, 1].mean():9.1f} {hybrid[:, row, 1].mean():9.1f} "
+                f"{stat[row, 1]:6.2f}{flag}"
+            )
+        print(f"Agents: {agents_time:.3f} s per run, hybrid: {hybrid_time:.3f} s per run")
+        ok = ok and bool(within.all())
+    return ok
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare trajectories of the agent and hybrid modes")
+    parser.add_argument("--seeds", type=int, default=24, help="Runs per version")
+    parser.add_argument("--size", type=int, default=21, help="Grid size along every axis")
+    parser.add_argument("--hcells", type=int, default=1_000, help="Initial healthy cells")
+    parser.add_argument("--distances", type=float, nargs="+", default=[4.0, 8.0], help="Hybrid distances to compare")
+    parser.add_argument("--growth", type=int, default=200, help="Hours of growth before the treatment")
+    parser.add_argument("--treatment", type=int, default=240, help="Hours of treatment (one dose per day)")
+    parser.add_argument("--dose", type=float, default=2.0, help="Daily dose (Gy)")
+    parser.add_argument("--every", type=int, default=24, help="Hours between two checkpoints")
+    parser.add_argument("--alpha", type=float, default=0.01, help="Significance level of the comparison")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    if compare(parse_args()):
+        print("\nOK: the hybrid trajectories match the agent ones")
+    else:
+        print("\nFAILED: the hybrid trajectories differ from the agent ones")
+        sys.exit(1)
@@ -0,0 +1,124 @@
+"""Trajectory comparison between the per-cell simulation and the quiescent pooling.
+
+Every seed is simulated twice from the same initial grid, with and without
+``Controller.set_quiescent_pooling(True)``: tumor growth followed by a
+daily dose. The mean healthy, cancer and quiescent healthy (pooled or not)
+counts of the two versions must not differ: at every checkpoint, a
+two-sided Welch test of the difference of the means has to pass at the
+``--alpha`` level, Bonferroni-corrected over the checkpoints and the three
+counts (the statistic is compared to the normal quantile). The time spent
+in ``cycle_cells()`` is reported when the extension is built with
+``CELLSIM_STATS``.
+
+    python -m rein.tests.quiescent_pooling_test --seeds 24
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from rein import cell_sim
+from rein.env.coarse import parse_grid_bytes
+
+
+def checkpoint(ctrl):
+    """Healthy, cancer and quiescent healthy counts of the grid, with the serialized grid."""
+    data = ctrl.grid.to_bytes()
+    state = parse_grid_bytes(data)
+    cells = state["cells"]
+    quiescent = np.count_nonzero((cells["type"] == b"h") & (cells["stage"] == b"q")) + state["pooled"].sum()
+    return [*ctrl.get_cell_counts(), quiescent], data
+
+
+def run(seed, pooling, args):
+    """Simulate one trajectory and return the counts at every checkpoint, the elapsed and cycle_cells() times."""
+    cell_sim.seed(seed)
+    cell_sim.seed_cells(seed)
+    ctrl = cell_sim.Controller(args.size, args.size, args.size, 20, 2.0, 4.0, args.hcells, 1)
+    if pooling:
+        ctrl.set_quiescent_pooling(True)
+    ctrl.reset_stats()
+
+    counts = [checkpoint(ctrl)[0]]
+    elapsed = 0.0
+    for hour in range(1, args.growth + args.treatment + 1):
+        start = time.perf_counter()
+        if hour > args.growth and (hour - args.growth) % 24 == 0:
+            ctrl.irradiate(args.dose)
+        ctrl.go()
+        elapsed += time.perf_counter() - start
+        if hour % args.every == 0:
+            row, data = checkpoint(ctrl)
+            counts.append(row)
+
+    # The pools must survive a save / restore
+    assert cell_sim.Grid.from_bytes(data).to_bytes() == data
+    return np.asarray(counts, dtype=float), elapsed, ctrl.stats()["cycle_cells_s"]
+
+
+def welch(a, b):
+    """Welch statistic of the difference of the means of b and a (first axis: samples)."""
+    diff = b.mean(0) - a.mean(0)
+    stderr = np.sqrt(a.var(0, ddof=1) / len(a) + b.var(0, ddof=1) / len(b))
+    # Identical samples (e.g. the initial grid) only match if the means are equal
+    return np.where(stderr > 0, diff / np.where(stderr > 0, stderr, 1.0), np.where(diff == 0, 0.0, np.inf))
+
+
+def compare(args):
+    cells, pooled = [], []
+    cells_time = np.zeros(2)
+    pooled_time = np.zeros(2)
+    for seed in range(args.seeds):
+        counts, *times = run(seed, False, args)
+        cells.append(counts)
+        cells_time += times
+        counts, *times = run(seed, True, args)
+        pooled.append(counts)
+        pooled_time += times
+    cells, pooled = np.asarray(cells), np.asarray(pooled)
+    cells_time /= args.seeds
+    pooled_time /= args.seeds
+
+    # Bonferroni correction over the checkpoints and the three counts
+    limit = statistics.NormalDist().inv_cdf(1 - args.alpha / (2 * cells[0].size))
+    stat = welch(cells, pooled)
+    ok = np.abs(stat) <= limit
+
+    print(f"Largest allowed |Welch statistic|: {limit:.2f}")
+    header = "".join(f" {'cells ' + name:>9} {'pooled ' + name:>9} {'stat':>6}" for name in "HCQ")
+    print(f"{'hour':>6}{header}")
+    for row in range(cells.shape[1]):
+        flag = "" if ok[row].all() else "  <-- different"
+        values = "".join(
+            f" {cells[:, row, col].mean():9.1f} {pooled[:, row, col].mean():9.1f} {stat[row, col]:6.2f}"
+            for col in range(cells.shape[2])
+        )
+        print(f"{row * args.every:6d}{values}{flag}")
+    print(f"\nPer-cell: {cells_time[0]:.3f} s per run, pooled: {pooled_time[0]:.3f} s per run")
+    if cells_time[1] > 0:
+        print(f"cycle_cells(): per-cell {cells_time[1]:.3f} s per run, pooled: {pooled_time[1]:.3f} s per run")
+    return bool(ok.all())
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare trajectories with and without quiescent pooling")
+    parser.add_argument("--seeds", type=int, default=24, help="Runs per version")
+    parser.add_argument("--size", type=int, default=21, help="Grid size along every axis")
+    parser.add_argument("--hcells", type=int, default=1_000, help="Initial healthy cells")
+    parser.add_argument("--growth", type=int, default=200, help="Hours of growth before the treatment")
+    parser.add_argument("--treatment", type=int, default=240, help="Hours of treatment (one dose per day)")
+    parser.add_argument("--dose", type=float, default=2.0, help="Daily dose (Gy)")
+    parser.add_argument("--every", type=int, default=24, help="Hours between two checkpoints")
+    parser.add_argument("--alpha", type=float, default=0.01, help="Significance level of the comparison")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    if compare(parse_args()):
+        print("OK: the pooled trajectories match the per-cell ones")
+    else:
+        print("FAILED: the pooled trajectories differ from the per-cell ones")
+        sys.exit(1)
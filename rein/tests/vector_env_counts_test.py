@@ -0,0 +1,115 @@
+"""Check that the environments of a ``CellSimVectorEnv`` keep their own cell counts.
+
+Two environments are stepped with different actions (one only waits, the
+other is irradiated at every step), first alone and then interleaved in a
+``CellSimVectorEnv``. The C++ random generators are process-wide, so they
+are reseeded before every growth phase and every step with a value that
+depends on the environment and the step only. Each environment must then
+observe exactly the same counts whether it runs alone or next to the other:
+any count shared between the two simulators makes the trajectories differ.
+
+    python -m rein.tests.vector_env_counts_test --steps 10
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from rein import cell_sim
+from rein.env import CellSimEnv, CellSimVectorEnv
+
+
+def reseed(value):
+    cell_sim.seed(value)
+    cell_sim.seed_cells(value)
+
+
+def make_env(index, args):
+    reseed(1_000 * index)
+    return CellSimEnv(
+        xsize=args.size,
+        ysize=args.size,
+        zsize=args.size,
+        hcells=args.hcells,
+        min_dose=0.0,
+        max_dose=args.dose,
+        min_wait=args.wait,
+        max_wait=args.wait,
+    )
+
+
+def action(index, args):
+    """The first env only waits, the second one is irradiated before waiting."""
+    return np.array([0.0 if index == 0 else args.dose, float(args.wait)], dtype=np.float32)
+
+
+def start(envs, position, index, args):
+    """Reset and grow env ``index``, stored at ``position`` in ``envs``."""
+    reseed(1_000 * index + 1)
+    return envs.reset_at(position, 1_000 * index + 1, args.growth)
+
+
+def step(envs, position, index, tick, args):
+    reseed(1_000 * index + 2 + tick)
+    observations, *_ = envs.step([position], [action(index, args)])
+    return observations[0]
+
+
+def alone(index, args):
+    """Counts observed by env ``index`` when it is the only one of its vector env."""
+    envs = CellSimVectorEnv([make_env(index, args)])
+    try:
+        counts = [start(envs, 0, index, args)]
+        counts += [step(envs, 0, index, tick, args) for tick in range(args.steps)]
+    finally:
+        envs.close()
+    return np.asarray(counts)
+
+
+def together(args):
+    """Counts observed by the two envs stepped one after the other in the same vector env."""
+    envs = CellSimVectorEnv([make_env(0, args), make_env(1, args)])
+    try:
+        counts = [[start(envs, 0, 0, args)], [start(envs, 1, 1, args)]]
+        for tick in range(args.steps):
+            counts[0].append(step(envs, 0, 0, tick, args))
+            counts[1].append(step(envs, 1, 1, tick, args))
+    finally:
+        envs.close()
+    return [np.asarray(env_counts) for env_counts in counts]
+
+
+def main(args):
+    interleaved = together(args)
+    ok = True
+    for index in range(2):
+        reference = alone(index, args)
+        print(f"env {index}: alone {reference[-1].tolist()} | interleaved {interleaved[index][-1].tolist()}")
+        if not np.array_equal(reference, interleaved[index]):
+            first = int(np.argmax(np.any(reference != interleaved[index], axis=1)))
+            print(f"  differs from step {first}: {reference[first].tolist()} != {interleaved[index][first].tolist()}")
+            ok = False
+    if np.array_equal(interleaved[0], interleaved[1]):
+        print("The two envs followed the same trajectory, the check is not conclusive")
+        ok = False
+    return ok
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Independence of the cell counts of a CellSimVectorEnv")
+    parser.add_argument("--size", type=int, default=21, help="Grid size along every axis")
+    parser.add_argument("--hcells", type=int, default=1_000, help="Initial healthy cells")
+    parser.add_argument("--growth", type=int, default=150, help="Hours of growth after every reset")
+    parser.add_argument("--steps", type=int, default=10, help="Steps of every env")
+    parser.add_argument("--dose", type=float, default=2.0, help="Dose of the irradiated env (Gy)")
+    parser.add_argument("--wait", type=int, default=12, help="Hours after every action")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    if main(parse_args()):
+        print("OK: every env keeps its own cell counts")
+    else:
+        print("FAILED: the envs share their cell counts")
+        sys.exit(1)